@@ -0,0 +1,419 @@
+import argparse
+import asyncio
+import csv
+import functools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+DB_PATH = Path(__file__).parents[1] / "db"
+CONVERSATIONS_PATH = Path(__file__).parents[1] / "bench" / "conversations.jsonl"
+
+Row = dict[str, Any]
+
+
+def load_conversations(path: Path = CONVERSATIONS_PATH) -> list[Row]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_customers(count: int, seed: int = 0) -> list[Row]:
+    """Clientes fictícios com CPF único e score espalhado por todas as faixas."""
+    rng = random.Random(seed)
+    first = date(1950, 1, 1)
+    return [
+        {
+            "cpf": f"{10_000_000_000 + i:011d}",
+            "data_nascimento": (first + timedelta(days=rng.randrange(20_000))).isoformat(),
+            "nome": f"Cliente {i:06d}",
+            "limite_atual": f"{rng.randrange(1, 50) * 1000:.2f}",
+            "score": str(rng.randrange(1000)),
+        }
+        for i in range(count)
+    ]
+
+
+def write_database(path: Path, customers: Sequence[Row]) -> None:
+    """Monta um `db/` com os clientes sintéticos e as faixas de score reais."""
+    from customers import USER_FIELDS  # noqa: PLC0415
+    from storage import LIMIT_REQUEST_FIELDS  # noqa: PLC0415
+
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / "users.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=USER_FIELDS)
+        writer.writeheader()
+        writer.writerows(customers)
+    shutil.copy(DB_PATH / "score_limite.csv", path / "score_limite.csv")
+    with open(path / "solicitacoes_aumento_limite.csv", "w", encoding="utf-8") as f:
+        f.write(",".join(LIMIT_REQUEST_FIELDS) + "\n")
+
+
+def fill(text: str, customer: Row) -> str:
+    for key, value in customer.items():
+        text = text.replace(f"{{{key}}}", str(value))
+    return text
+
+
+class TimedStorage:
+    """Proxy do backend que mede o tempo de cada operação chamada pelas tools."""
+
+    def __init__(self, storage: Any) -> None:
+        self._storage = storage
+        self._timings: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._storage, name)
+        if not callable(attr) or name in ("transaction", "customer_lock"):
+            return attr
+
+        @functools.wraps(attr)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._timings.setdefault(name, []).append(elapsed)
+
+        return timed
+
+    def summary(self) -> dict[str, Row]:
+        with self._lock:
+            timings = {name: list(values) for name, values in self._timings.items()}
+        return {
+            name: {
+                "calls": len(values),
+                "mean_ms": _ms(statistics.fmean(values)),
+                "max_ms": _ms(max(values)),
+                "total_ms": _ms(sum(values)),
+            }
+            for name, values in sorted(timings.items())
+        }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _pct(values: Sequence[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return _ms(ordered[min(len(ordered) - 1, int(q * len(ordered)))])
+
+
+def _histogram_delta(
+    after: dict[Any, tuple[int, float]], before: dict[Any, tuple[int, float]]
+) -> dict[str, tuple[int, float]]:
+    delta = {}
+    for labels, (count, total) in after.items():
+        old_count, old_total = before.get(labels, (0, 0.0))
+        if count > old_count:
+            delta[dict(labels).popitem()[1]] = (count - old_count, total - old_total)
+    return delta
+
+
+@dataclass
+class BenchResult:
+    customers: int
+    sessions: int
+    storage: str
+    conversations: int = 0
+    turns: int = 0
+    errors: int = 0
+    setup_s: float = 0.0
+    duration_s: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    nodes: dict[str, tuple[int, float]] = field(default_factory=dict)
+    tools: dict[str, tuple[int, float]] = field(default_factory=dict)
+    storage_ops: dict[str, Row] = field(default_factory=dict)
+    fast_path_served: int = 0
+    llm_cache_hits: int = 0
+
+    def summary(self) -> Row:
+        """Resumo por ponto da matriz; tempos por turno são médias.
+
+        `graph_overhead_ms_per_turn` é o tempo do turno fora de qualquer nó:
+        despacho do LangGraph, checkpointer e espera por thread livre.
+        """
+        data = asdict(self)
+        for key in ("latencies", "nodes", "tools", "storage_ops"):
+            del data[key]
+
+        turns = self.turns or 1
+        node_total = sum(total for _, total in self.nodes.values())
+        return data | {
+            "turns_per_s": round(self.turns / self.duration_s, 1) if self.duration_s else 0,
+            "turn_mean_ms": _ms(statistics.fmean(self.latencies)) if self.latencies else None,
+            "turn_p50_ms": _pct(self.latencies, 0.50),
+            "turn_p95_ms": _pct(self.latencies, 0.95),
+            "turn_p99_ms": _pct(self.latencies, 0.99),
+            "graph_overhead_ms_per_turn": _ms(max(sum(self.latencies) - node_total, 0) / turns),
+            "nodes": {
+                name: {
+                    "calls": count,
+                    "mean_ms": _ms(total / count),
+                    "per_turn_ms": _ms(total / turns),
+                }
+                for name, (count, total) in sorted(self.nodes.items())
+            },
+            "tools": {
+                name: {"calls": count, "mean_ms": _ms(total / count)}
+                for name, (count, total) in sorted(self.tools.items())
+            },
+            "storage_io": self.storage_ops,
+        }
+
+
+async def replay(
+    graph: Any,
+    thread_id: str,
+    conversation: Row,
+    customer: Row,
+    result: BenchResult,
+) -> None:
+    """Reproduz uma conversa gravada, um turno por vez, como o servidor faria."""
+    from langchain_core.messages import HumanMessage, SystemMessage  # noqa: PLC0415
+    from langchain_core.runnables import RunnableConfig  # noqa: PLC0415
+
+    from prompts import SYSTEM_PROMPT  # noqa: PLC0415
+
+    config = RunnableConfig(configurable={"thread_id": thread_id})
+    for i, turn in enumerate(conversation["turns"]):
+        messages = [HumanMessage(fill(turn["user"], customer))]
+        if i == 0:
+            messages.insert(0, SystemMessage(SYSTEM_PROMPT))
+
+        started = time.perf_counter()
+        try:
+            await graph.ainvoke({"messages": messages}, config)
+        except Exception:  # noqa: BLE001
+            result.errors += 1
+            continue
+        result.latencies.append(time.perf_counter() - started)
+        result.turns += 1
+    result.conversations += 1
+
+
+async def run_point(
+    customers: int,
+    sessions: int,
+    conversations: Sequence[Row],
+    workdir: Path,
+    backend: str = "csv",
+    rounds: int = 1,
+    seed: int = 0,
+) -> BenchResult:
+    """Um ponto da matriz: base com `customers` clientes e `sessions`
+    conversas simultâneas (repetidas `rounds` vezes por sessão)."""
+    import intents  # noqa: PLC0415
+    from graph import build_graph  # noqa: PLC0415
+    from metrics import NODE_SECONDS, TOOL_SECONDS  # noqa: PLC0415
+    from response_cache import get_response_cache  # noqa: PLC0415
+    from storage import CsvStorage, SqliteStorage, import_csv, set_storage  # noqa: PLC0415
+    from tools import TOOLS  # noqa: PLC0415
+
+    result = BenchResult(customers=customers, sessions=sessions, storage=backend)
+
+    started = time.perf_counter()
+    db_path = workdir / f"db_{customers}_{sessions}"
+    base = synthetic_customers(customers, seed)
+    write_database(db_path, base)
+    if backend == "sqlite":
+        import_csv(db_path, db_path / "bank.sqlite3")
+        storage = TimedStorage(SqliteStorage(db_path / "bank.sqlite3"))
+    else:
+        storage = TimedStorage(CsvStorage(db_path))
+    # Carrega a base antes de medir (o índice por CPF fica em memória)
+    storage.get_user(base[0]["cpf"])
+    storage._timings.clear()  # noqa: SLF001
+    set_storage(storage)  # type: ignore[arg-type]
+
+    graph = build_graph()
+    rng = random.Random(seed)
+    chosen = rng.sample(base, min(sessions, customers))
+    result.setup_s = round(time.perf_counter() - started, 3)
+
+    cache = get_response_cache(TOOLS)
+    if cache is not None:
+        cache.clear()
+    nodes_before, tools_before = NODE_SECONDS.totals(), TOOL_SECONDS.totals()
+    served_before = intents.FAST_PATH_STATS.served
+    cache_before = cache.stats.hits + cache.stats.semantic_hits if cache is not None else 0
+
+    async def session(i: int) -> None:
+        customer = chosen[i % len(chosen)]
+        for r in range(rounds):
+            conversation = conversations[(i + r) % len(conversations)]
+            await replay(graph, f"bench-{i}-{r}", conversation, customer, result)
+
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=max(4, min(sessions, 256))) as executor:
+        loop.set_default_executor(executor)
+        started = time.perf_counter()
+        await asyncio.gather(*(session(i) for i in range(sessions)))
+        result.duration_s = round(time.perf_counter() - started, 3)
+
+    result.nodes = _histogram_delta(NODE_SECONDS.totals(), nodes_before)
+    result.tools = _histogram_delta(TOOL_SECONDS.totals(), tools_before)
+    result.storage_ops = storage.summary()
+    result.fast_path_served = intents.FAST_PATH_STATS.served - served_before
+    if cache is not None:
+        result.llm_cache_hits = cache.stats.hits + cache.stats.semantic_hits - cache_before
+    set_storage(None)
+    return result
+
+
+def run_bulk_point(
+    customers: int,
+    rows: int,
+    chunk_size: int,
+    workdir: Path,
+    backend: str = "csv",
+    seed: int = 0,
+) -> Row:
+    """Vazão do aumento de limite em lote (`limits.py`) sobre a mesma base
+    sintética, com `chunk_size` pedidos por transação."""
+    from limits import LimitRequest, bulk_limit_increase  # noqa: PLC0415
+    from storage import CsvStorage, SqliteStorage, import_csv  # noqa: PLC0415
+
+    db_path = workdir / f"bulk_{customers}_{chunk_size}"
+    base = synthetic_customers(customers, seed)
+    write_database(db_path, base)
+    if backend == "sqlite":
+        import_csv(db_path, db_path / "bank.sqlite3")
+        storage: Any = SqliteStorage(db_path / "bank.sqlite3")
+    else:
+        storage = CsvStorage(db_path)
+    storage.get_user(base[0]["cpf"])
+
+    rng = random.Random(seed)
+    requests = (
+        LimitRequest(i + 2, rng.choice(base)["cpf"], float(rng.randrange(1, 60) * 1000))
+        for i in range(rows)
+    )
+    summary = bulk_limit_increase(requests, storage, chunk_size=chunk_size)
+    return {"customers": customers, "chunk_size": chunk_size, "storage": backend} | (
+        summary.as_dict()
+    )
+
+
+def configure(conversations_path: Path, fx_port: int, token_delay: float) -> None:
+    """Ambiente do benchmark; precisa rodar antes de importar o grafo."""
+    os.environ["BANK_METRICS"] = "1"
+    os.environ["BANK_LLM_PROVIDER"] = "scripted"
+    os.environ["BANK_FAKE_SCRIPT"] = str(conversations_path)
+    os.environ["BANK_FAKE_TOKEN_DELAY"] = str(token_delay)
+    os.environ["BANK_FX_URL"] = f"http://127.0.0.1:{fx_port}/json/last"
+    os.environ.setdefault("BANK_CHECKPOINT_PATH", "")
+
+
+def _ints(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+async def run(args: argparse.Namespace) -> Row:
+    from loadtest import start_fx_stub  # noqa: PLC0415
+
+    fx_stub = start_fx_stub()
+    configure(args.conversations, fx_stub.server_port, args.token_delay)
+    conversations = load_conversations(args.conversations)
+    workdir = Path(tempfile.mkdtemp(prefix="bank_bench_"))
+
+    results = []
+    bulk = []
+    try:
+        for customers in args.customers:
+            for chunk_size in args.bulk_chunk if args.bulk_rows else []:
+                bulk.append(
+                    run_bulk_point(
+                        customers,
+                        args.bulk_rows,
+                        chunk_size,
+                        workdir,
+                        backend=args.storage,
+                        seed=args.seed,
+                    )
+                )
+            for sessions in args.sessions:
+                point = await run_point(
+                    customers,
+                    sessions,
+                    conversations,
+                    workdir,
+                    backend=args.storage,
+                    rounds=args.rounds,
+                    seed=args.seed,
+                )
+                results.append(point.summary())
+    finally:
+        fx_stub.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "llm_concurrency": os.getenv("BANK_LLM_CONCURRENCY", "4"),
+            "llm_queue_timeout": os.getenv("BANK_LLM_QUEUE_TIMEOUT", "30"),
+            "fast_path": os.getenv("BANK_FAST_PATH", "1"),
+            "response_cache_size": os.getenv("BANK_RESPONSE_CACHE_SIZE", "512"),
+        },
+        "config": {
+            "conversations": str(args.conversations),
+            "storage": args.storage,
+            "rounds": args.rounds,
+            "token_delay": args.token_delay,
+            "seed": args.seed,
+            "bulk_rows": args.bulk_rows,
+        },
+        "results": results,
+        "bulk": bulk,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark offline: reproduz conversas gravadas no grafo, sem Ollama nem rede"
+    )
+    parser.add_argument("--conversations", type=Path, default=CONVERSATIONS_PATH)
+    parser.add_argument(
+        "--customers", type=_ints, default=[1000, 10000, 100000], help="ex.: 1000,100000"
+    )
+    parser.add_argument("--sessions", type=_ints, default=[1, 10, 100, 1000], help="ex.: 1,100")
+    parser.add_argument("--storage", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--rounds", type=int, default=1, help="conversas por sessão")
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--bulk-rows", type=int, default=10_000, help="pedidos do aumento em lote (0 desliga)"
+    )
+    parser.add_argument(
+        "--bulk-chunk", type=_ints, default=[500], help="pedidos por transação, ex.: 1,500"
+    )
+    parser.add_argument("--output", type=Path, help="grava o JSON neste arquivo")
+    args = parser.parse_args()
+
+    report = json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns)
+) WITHOUT ROWID;
+"""
+UPSERT_CHECKPOINT = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+    "checkpoint_type, checkpoint, metadata_type, metadata, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_CHECKPOINT = (
+    "SELECT checkpoint_type, checkpoint, metadata_type, metadata FROM checkpoints "
+    "WHERE thread_id = ? AND checkpoint_ns = ?"
+)
+
+PendingKey = tuple[Any, str]
+
+logger = logging.getLogger(__name__)
+
+# Lote que falha no SQLite (ex.: banco travado) volta para a fila algumas
+# vezes antes de ser descartado, para `flush()` não esperar para sempre
+WRITE_ATTEMPTS = 3
+WRITE_RETRY_DELAY = 0.5
+
+
+class BoundedSaver(InMemorySaver):
+    """Checkpointer em memória com limites e persistência assíncrona opcional.
+
+    - Mantém só os `keep_last` checkpoints mais recentes de cada thread.
+    - Remove da memória as threads ociosas (LRU acima de `max_threads` ou
+      sem acesso há mais de `idle_ttl` segundos).
+    - Com `path`, grava o checkpoint mais recente de cada thread em SQLite
+      numa thread de fundo (fora do caminho da requisição) e restaura a
+      thread do disco quando ela volta depois de evictada ou de um restart.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        keep_last: int = 3,
+        max_threads: int = 10_000,
+        idle_ttl: float | None = 3600.0,
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.keep_last = max(1, keep_last)
+        self.max_threads = max_threads
+        self.idle_ttl = idle_ttl
+
+        self._lock = threading.RLock()
+        self._last_access: OrderedDict[Any, float] = OrderedDict()
+        self._versions: dict[tuple[Any, str, str], dict[str, Any]] = {}
+        self._blob_keys: dict[PendingKey, set[tuple[Any, str, str, Any]]] = {}
+        self.counters = {
+            "evictions": 0,
+            "restores": 0,
+            "pruned": 0,
+            "writes": 0,
+            "write_errors": 0,
+        }
+        self._write_latencies: deque[float] = deque(maxlen=1000)
+
+        self._pending: dict[PendingKey, tuple[Checkpoint, CheckpointMetadata]] = {}
+        self._cond = threading.Condition()
+        self._writing = False
+        self._closed = False
+        self._writer: threading.Thread | None = None
+        # A conexão é compartilhada entre o escritor e as leituras/remoções
+        # feitas nas threads das requisições
+        self._db_lock = threading.Lock()
+
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            self._writer = threading.Thread(
+                target=self._write_loop, name="checkpoint_writer", daemon=True
+            )
+            self._writer.start()
+
+    # API do BaseCheckpointSaver (as versões async do InMemorySaver delegam a estas)
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            if not self.storage.get(thread_id, {}).get(checkpoint_ns):
+                self._restore(thread_id, checkpoint_ns)
+            self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+        with self._lock:
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            key = (thread_id, checkpoint_ns)
+            self._versions[(*key, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+            self._blob_keys.setdefault(key, set()).update(
+                (thread_id, checkpoint_ns, channel, version)
+                for channel, version in new_versions.items()
+            )
+            self._prune(thread_id, checkpoint_ns)
+            self._touch(thread_id)
+            self._evict()
+
+        if self._writer is not None:
+            with self._cond:
+                # Só o checkpoint mais recente de cada thread vai para o disco
+                self._pending[key] = (checkpoint, metadata)
+                self._cond.notify()
+
+        return saved
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._forget(thread_id)
+        if self.path is not None:
+            with self._cond:
+                # Um lote em gravação pode conter a thread ou voltar para a
+                # fila após uma falha; a remoção espera por ele
+                self._cond.wait_for(lambda: not self._writing)
+                for key in [k for k in self._pending if k[0] == thread_id]:
+                    del self._pending[key]
+                with self._db_lock:
+                    self._db.execute(
+                        "DELETE FROM checkpoints WHERE thread_id = ?", (str(thread_id),)
+                    )
+
+    # Limites de memória
+
+    def _touch(self, thread_id: Any) -> None:
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._last_access:
+            thread_id, last = next(iter(self._last_access.items()))
+            expired = self.idle_ttl is not None and now - last > self.idle_ttl
+            if len(self._last_access) <= self.max_threads and not expired:
+                break
+            self._forget(thread_id)
+            self.counters["evictions"] += 1
+
+    def _forget(self, thread_id: Any) -> None:
+        super().delete_thread(thread_id)
+        self._last_access.pop(thread_id, None)
+        for key in [k for k in self._versions if k[0] == thread_id]:
+            del self._versions[key]
+        for key in [k for k in self._blob_keys if k[0] == thread_id]:
+            del self._blob_keys[key]
+
+    def _prune(self, thread_id: Any, checkpoint_ns: str) -> None:
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.keep_last:
+            return
+
+        # IDs de checkpoint (uuid6) são ordenáveis pelo tempo
+        for checkpoint_id in sorted(checkpoints)[: -self.keep_last]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self._versions.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self.counters["pruned"] += 1
+
+        referenced = {
+            (thread_id, checkpoint_ns, channel, version)
+            for checkpoint_id in checkpoints
+            for channel, version in self._versions.get(
+                (thread_id, checkpoint_ns, checkpoint_id), {}
+            ).items()
+        }
+        blob_keys = self._blob_keys.get((thread_id, checkpoint_ns), set())
+        for blob_key in blob_keys - referenced:
+            self.blobs.pop(blob_key, None)
+        blob_keys &= referenced
+
+    # Persistência
+
+    def _restore(self, thread_id: Any, checkpoint_ns: str) -> None:
+        if self.path is None:
+            return
+
+        with self._cond:
+            pending = self._pending.get((thread_id, checkpoint_ns))
+        if pending is not None:
+            checkpoint, metadata = pending
+        else:
+            with self._db_lock:
+                row = self._db.execute(
+                    SELECT_CHECKPOINT, (str(thread_id), checkpoint_ns)
+                ).fetchone()
+            if row is None:
+                return
+            checkpoint = self.serde.loads_typed((row[0], row[1]))
+            metadata = self.serde.loads_typed((row[2], row[3]))
+
+        config = RunnableConfig(
+            configurable={"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        )
+        InMemorySaver.put(self, config, checkpoint, metadata, checkpoint["channel_versions"])
+        self._versions[(thread_id, checkpoint_ns, checkpoint["id"])] = dict(
+            checkpoint["channel_versions"]
+        )
+        self._blob_keys[(thread_id, checkpoint_ns)] = {
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in checkpoint["channel_versions"].items()
+        }
+        self.counters["restores"] += 1
+
+    def _write_loop(self) -> None:
+        attempts = 0
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                batch, self._pending = self._pending, {}
+                self._writing = True
+                self._db_lock.acquire()
+
+            started = time.perf_counter()
+            rows = 0
+            retry = False
+            try:
+                rows = self._write_batch(batch)
+            except sqlite3.Error:
+                attempts += 1
+                retry = attempts < WRITE_ATTEMPTS
+                logger.exception(
+                    "Falha ao gravar %d checkpoints (tentativa %d)", len(batch), attempts
+                )
+            except Exception:
+                # Erro de serialização: tentar de novo daria o mesmo resultado
+                logger.exception("Falha ao serializar %d checkpoints; descartados", len(batch))
+            finally:
+                self._db_lock.release()
+            elapsed = time.perf_counter() - started
+
+            with self._cond:
+                if rows:
+                    attempts = 0
+                    self._write_latencies.append(elapsed / rows)
+                    self.counters["writes"] += rows
+                else:
+                    self.counters["write_errors"] += 1
+                    if not retry:
+                        attempts = 0
+                if retry and not self._closed:
+                    # Checkpoints mais novos que chegaram no meio têm prioridade
+                    self._pending = batch | self._pending
+                self._writing = False
+                self._cond.notify_all()
+                if retry and not self._closed:
+                    self._cond.wait(WRITE_RETRY_DELAY)
+
+    def _write_batch(self, batch: dict[PendingKey, tuple[Checkpoint, CheckpointMetadata]]) -> int:
+        rows = []
+        for (thread_id, checkpoint_ns), (checkpoint, metadata) in batch.items():
+            checkpoint_type, checkpoint_bytes = self.serde.dumps_typed(checkpoint)
+            metadata_type, metadata_bytes = self.serde.dumps_typed(metadata)
+            rows.append(
+                (
+                    str(thread_id),
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    checkpoint_type,
+                    checkpoint_bytes,
+                    metadata_type,
+                    metadata_bytes,
+                    time.time(),
+                )
+            )
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany(UPSERT_CHECKPOINT, rows)
+            self._db.execute("COMMIT")
+        except BaseException:
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Espera as gravações pendentes chegarem ao disco."""
+        if self._writer is None:
+            return True
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._writing, timeout
+            )
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._db.close()
+        self._writer = None
+
+    # Métricas
+
+    def session_bytes(self, thread_id: Any) -> int:
+        """Bytes serializados que a thread ocupa em memória."""
+        with self._lock:
+            size = sum(
+                len(checkpoint[1]) + len(metadata[1])
+                for namespace in self.storage.get(thread_id, {}).values()
+                for checkpoint, metadata, _ in namespace.values()
+            )
+            size += sum(
+                len(value[1])
+                for key, value in self.blobs.items()
+                if key[0] == thread_id
+            )
+            size += sum(
+                len(write[2][1])
+                for key, writes in self.writes.items()
+                if key[0] == thread_id
+                for write in writes.values()
+            )
+            return size
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            threads = list(self._last_access)
+            checkpoints = sum(
+                len(namespace)
+                for thread in self.storage.values()
+                for namespace in thread.values()
+            )
+        sizes = [self.session_bytes(thread_id) for thread_id in threads]
+        with self._cond:
+            latencies = sorted(self._write_latencies)
+            pending = len(self._pending)
+
+        return self.counters | {
+            "threads_in_memory": len(threads),
+            "checkpoints_in_memory": checkpoints,
+            "bytes_in_memory": sum(sizes),
+            "bytes_per_session_avg": round(sum(sizes) / len(sizes)) if sizes else 0,
+            "bytes_per_session_max": max(sizes, default=0),
+            "pending_writes": pending,
+            "write_latency_ms_avg": round(1000 * sum(latencies) / len(latencies), 3)
+            if latencies
+            else None,
+            "write_latency_ms_p95": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 3)
+            if latencies
+            else None,
+        }
+
+
+def load_checkpointer() -> BoundedSaver:
+    """Checkpointer configurado por `BANK_CHECKPOINT_PATH` (SQLite; vazio =
+    só memória), `BANK_CHECKPOINT_KEEP`, `BANK_CHECKPOINT_MAX_THREADS` e
+    `BANK_CHECKPOINT_IDLE_TTL` (segundos, 0 desativa)."""
+    path = os.getenv("BANK_CHECKPOINT_PATH")
+    idle_ttl = float(os.getenv("BANK_CHECKPOINT_IDLE_TTL", "3600"))
+    return BoundedSaver(
+        path=Path(path) if path else None,
+        keep_last=int(os.getenv("BANK_CHECKPOINT_KEEP", "3")),
+        max_threads=int(os.getenv("BANK_CHECKPOINT_MAX_THREADS", "10000")),
+        idle_ttl=idle_ttl or None,
+    )
@@ -0,0 +1,198 @@
+import os
+import threading
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+
+from metrics import register_collector
+from state import State
+
+
+@dataclass(frozen=True)
+class ContextConfig:
+    """Orçamento de tokens do histórico enviado ao modelo.
+
+    - `summary_trigger`: acima deste total, os turnos antigos viram resumo.
+    - `max_tokens`: teto do prompt; turnos recentes excedentes são descartados.
+    - `keep_turns`: quantos turnos recentes ficam sempre na íntegra.
+    """
+
+    max_tokens: int = 8000
+    summary_trigger: int = 6000
+    keep_turns: int = 3
+    summary_max_chars: int = 3000
+
+    @classmethod
+    def from_env(cls) -> "ContextConfig":
+        return cls(
+            max_tokens=int(os.getenv("BANK_CONTEXT_MAX_TOKENS", str(cls.max_tokens))),
+            summary_trigger=int(
+                os.getenv("BANK_CONTEXT_SUMMARY_TRIGGER", str(cls.summary_trigger))
+            ),
+            keep_turns=int(os.getenv("BANK_CONTEXT_KEEP_TURNS", str(cls.keep_turns))),
+        )
+
+
+@dataclass(slots=True)
+class ContextStats:
+    llm_calls: int = 0
+    summaries: int = 0
+    messages_pruned: int = 0
+    tokens_sent: int = 0
+    tokens_saved: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+CONTEXT_STATS = ContextStats()
+_stats_lock = threading.Lock()
+register_collector("context", CONTEXT_STATS.as_dict)
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    return count_tokens_approximately(messages)
+
+
+def split_turns(
+    messages: Sequence[BaseMessage],
+) -> tuple[list[BaseMessage], list[list[BaseMessage]]]:
+    """Separa as mensagens fixas iniciais (system) dos turnos, que começam
+    sempre em uma HumanMessage. Cortar só nessas fronteiras mantém cada
+    tool call junto da sua ToolMessage."""
+    pinned: list[BaseMessage] = []
+    turns: list[list[BaseMessage]] = []
+
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            turns.append([message])
+        elif turns:
+            turns[-1].append(message)
+        else:
+            pinned.append(message)
+
+    return pinned, turns
+
+
+def _clip(text: str, limit: int = 240) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else f"{text[: limit - 1]}…"
+
+
+def summarize_turn(turn: Sequence[BaseMessage]) -> str:
+    """Resumo extrativo de um turno (sem chamar o LLM)."""
+    lines = []
+    for message in turn:
+        if isinstance(message, HumanMessage):
+            lines.append(f"- Cliente: {_clip(message.text)}")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"  - Tool {message.name or 'desconhecida'} ({message.status})")
+        elif isinstance(message, AIMessage) and message.text:
+            lines.append(f"  - Assistente: {_clip(message.text)}")
+    return "\n".join(lines)
+
+
+def context_message(state: State) -> SystemMessage | None:
+    """Mensagem com os dados do cliente autenticado e o resumo dos turnos
+    antigos, enviada logo antes do turno atual."""
+    parts = []
+
+    user = state.get("authenticated_user")
+    if user:
+        parts.append(
+            "Cliente JÁ AUTENTICADO (não peça CPF e data de nascimento novamente): "
+            f"nome={user.get('nome')}, cpf={user.get('cpf')}, "
+            f"data_nascimento={user.get('data_nascimento')}"
+        )
+
+    summary = state.get("summary")
+    if summary:
+        parts.append(f"Resumo da conversa anterior:\n{summary}")
+
+    if not parts:
+        return None
+    return SystemMessage("\n\n".join(parts))
+
+
+def manage_context(state: State, settings: ContextConfig | None = None) -> State:
+    """Nó que mantém o histórico dentro do orçamento antes de `call_llm`.
+
+    Os turnos mais antigos são removidos do estado (e do checkpoint) e
+    substituídos por um resumo acumulado.
+    """
+    settings = settings or ContextConfig.from_env()
+    messages = list(state["messages"])
+
+    if count_tokens(messages) <= settings.summary_trigger:
+        return {}
+
+    _, turns = split_turns(messages)
+    old_turns = turns[: -settings.keep_turns] if settings.keep_turns else turns
+    if not old_turns:
+        return {}
+
+    removed = [message for turn in old_turns for message in turn]
+    new_lines = "\n".join(summarize_turn(turn) for turn in old_turns)
+    summary = "\n".join(filter(None, [state.get("summary", ""), new_lines]))
+    if len(summary) > settings.summary_max_chars:
+        summary = "…\n" + summary[-settings.summary_max_chars :].split("\n", 1)[-1]
+
+    previous_summary = count_tokens([SystemMessage(state.get("summary", ""))])
+    added_summary = count_tokens([SystemMessage(summary)])
+    pruned = count_tokens(removed) - (added_summary - previous_summary)
+
+    with _stats_lock:
+        CONTEXT_STATS.summaries += 1
+        CONTEXT_STATS.messages_pruned += len(removed)
+
+    return {
+        "messages": [RemoveMessage(id=message.id) for message in removed if message.id],
+        "summary": summary,
+        "pruned_tokens": state.get("pruned_tokens", 0) + max(0, pruned),
+    }
+
+
+def build_prompt(state: State, settings: ContextConfig | None = None) -> list[BaseMessage]:
+    """Mensagens efetivamente enviadas ao modelo neste passo.
+
+    O contexto variável (cliente autenticado e resumo) entra depois do
+    histórico estável, logo antes do turno atual: quando o resumo muda, o
+    prefixo em cache KV (system prompt e turnos anteriores) continua valendo.
+    """
+    settings = settings or ContextConfig.from_env()
+    pinned, turns = split_turns(state["messages"])
+    extra = context_message(state)
+    context = [extra] if extra is not None else []
+
+    # Se ainda estourar o teto, descarta turnos recentes mais antigos,
+    # preservando sempre o turno atual
+    budget = settings.max_tokens - count_tokens(pinned + context)
+    kept: list[list[BaseMessage]] = []
+    dropped_tokens = 0
+    for i, turn in enumerate(reversed(turns)):
+        cost = count_tokens(turn)
+        if kept and cost > budget:
+            dropped_tokens = sum(count_tokens(t) for t in turns[: len(turns) - i])
+            break
+        kept.append(turn)
+        budget -= cost
+
+    current = kept[0] if kept else []
+    history = [message for turn in reversed(kept[1:]) for message in turn]
+    prompt = pinned + history + context + current
+
+    with _stats_lock:
+        CONTEXT_STATS.llm_calls += 1
+        CONTEXT_STATS.tokens_sent += count_tokens(prompt)
+        CONTEXT_STATS.tokens_saved += state.get("pruned_tokens", 0) + dropped_tokens
+
+    return prompt
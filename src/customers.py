@@ -0,0 +1,213 @@
+import csv
+import os
+import threading
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TextIO
+
+from metrics import register_collector
+from write_coordinator import FileLock, WriteCoordinator, atomic_write
+
+USER_FIELDS = ["cpf", "data_nascimento", "nome", "limite_atual", "score"]
+
+
+class CustomerRepository:
+    """Clientes de `users.csv` carregados em memória e indexados por CPF.
+
+    O arquivo é lido uma única vez e recarregado apenas quando o `mtime`
+    muda (edição externa). Leituras e atualizações são O(1) no índice.
+
+    Atualizações alteram a memória na hora e esperam a regravação pelo
+    `WriteCoordinator`: as que chegam dentro de `flush_window` segundos saem
+    em uma única regravação atômica (temporário + `os.replace`), feita com a
+    trava entre processos de `users.csv.lock` e fora do lock de leitura. Se
+    outro processo regravou o arquivo, ele é relido e as alterações
+    pendentes são reaplicadas por cima antes de gravar.
+
+    `commit()` é o caminho tudo ou nada das transações: grava primeiro e só
+    altera a memória se a regravação der certo.
+    """
+
+    def __init__(self, path: Path, flush_window: float = 0.005) -> None:
+        self.path = path
+        self._lock = threading.RLock()
+        self._by_cpf: dict[str, dict[str, str]] = {}
+        self._fieldnames: list[str] = list(USER_FIELDS)
+        self._mtime_ns: int | None = None
+        # cpf -> campos alterados desde a última regravação
+        self._pending: dict[str, dict[str, str]] = {}
+        self._local = threading.local()
+        self.writer = WriteCoordinator(self._flush, flush_window, name="users-writer")
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def is_stale(self) -> bool:
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return self._mtime_ns is not None
+        return mtime_ns != self._mtime_ns
+
+    def load(self) -> None:
+        with self._lock:
+            by_cpf: dict[str, dict[str, str]] = {}
+            fieldnames = list(USER_FIELDS)
+            mtime_ns = None
+
+            if self.path.exists():
+                mtime_ns = self.path.stat().st_mtime_ns
+                with open(self.path, "r", encoding="utf-8") as f:
+                    reader = csv.DictReader(f)
+                    if reader.fieldnames:
+                        fieldnames = list(reader.fieldnames)
+                    for row in reader:
+                        by_cpf[row["cpf"]] = row
+
+            # Alterações ainda não gravadas valem sobre o que está no disco
+            for cpf, fields in self._pending.items():
+                if cpf in by_cpf:
+                    by_cpf[cpf] = by_cpf[cpf] | fields
+
+            self._by_cpf = by_cpf
+            self._fieldnames = fieldnames
+            self._mtime_ns = mtime_ns
+
+    def _ensure_fresh(self) -> None:
+        if self._mtime_ns is None or self.is_stale():
+            self.load()
+
+    def get(self, cpf: str) -> dict[str, str] | None:
+        with self._lock:
+            self._ensure_fresh()
+            row = self._by_cpf.get(cpf)
+            return dict(row) if row is not None else None
+
+    def rows(self) -> list[dict[str, str]]:
+        with self._lock:
+            self._ensure_fresh()
+            return [dict(row) for row in self._by_cpf.values()]
+
+    def update(self, cpf: str, **fields: str) -> dict[str, str] | None:
+        with self._lock:
+            self._ensure_fresh()
+            row = self._by_cpf.get(cpf)
+            if row is None:
+                return None
+            # Linha nova em vez de mutação: a regravação lê sem o lock
+            row = self._by_cpf[cpf] = row | fields
+            self._pending.setdefault(cpf, {}).update(fields)
+
+        if getattr(self._local, "batch_depth", 0):
+            self._local.dirty = True
+        else:
+            self.writer.request()
+        return dict(row)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Agrupa as atualizações desta thread em uma única regravação."""
+        local = self._local
+        local.batch_depth = getattr(local, "batch_depth", 0) + 1
+        try:
+            yield
+        finally:
+            local.batch_depth -= 1
+            if not local.batch_depth and getattr(local, "dirty", False):
+                local.dirty = False
+                self.writer.request()
+
+    def commit(self, updates: Mapping[str, Mapping[str, str]]) -> int:
+        """Grava `updates` (com o que já estiver pendente) e só depois os
+        aplica na memória; se a regravação falhar, nenhum deles vale."""
+        if not updates:
+            return 0
+        with FileLock(self.path):
+            with self._lock:
+                if self._mtime_ns is None or self.is_stale():
+                    self.load()
+                changed = {
+                    cpf: self._by_cpf[cpf] | dict(fields)
+                    for cpf, fields in updates.items()
+                    if cpf in self._by_cpf
+                }
+                pending, self._pending = self._pending, {}
+                rows = [changed.get(cpf, row) for cpf, row in self._by_cpf.items()]
+                fieldnames = list(self._fieldnames)
+
+            self._write(rows, fieldnames, pending)
+            with self._lock:
+                self._by_cpf.update(changed)
+        return len(changed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._by_cpf)
+
+    def close(self) -> None:
+        self.writer.close()
+
+    def _flush(self) -> None:
+        """Uma regravação com tudo o que está pendente (chamado pelo coordenador)."""
+        with FileLock(self.path):
+            with self._lock:
+                if not self._pending:
+                    return
+                if self.is_stale():
+                    self.load()
+                pending, self._pending = self._pending, {}
+                rows = list(self._by_cpf.values())
+                fieldnames = list(self._fieldnames)
+            self._write(rows, fieldnames, pending)
+
+    def _write(
+        self,
+        rows: list[dict[str, str]],
+        fieldnames: list[str],
+        pending: dict[str, dict[str, str]],
+    ) -> None:
+        """Regravação atômica; quem chama segura o `FileLock`."""
+
+        def write(f: TextIO) -> None:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        try:
+            atomic_write(self.path, write)
+        except BaseException:
+            with self._lock:
+                # Devolve as alterações para a próxima tentativa
+                for cpf, fields in self._pending.items():
+                    pending.setdefault(cpf, {}).update(fields)
+                self._pending = pending
+            raise
+
+        with self._lock:
+            self._mtime_ns = self.path.stat().st_mtime_ns
+
+
+_repository: CustomerRepository | None = None
+_repository_lock = threading.Lock()
+
+
+def get_customer_repository(path: Path) -> CustomerRepository:
+    """Retorna o repositório compartilhado, carregando-o no primeiro uso."""
+    global _repository  # noqa: PLW0603
+
+    with _repository_lock:
+        if _repository is None or _repository.path != path:
+            if _repository is not None:
+                _repository.close()
+            _repository = CustomerRepository(
+                path, flush_window=float(os.getenv("BANK_USERS_FLUSH_WINDOW", "0.005"))
+            )
+            _repository.load()
+        return _repository
+
+
+register_collector(
+    "customer_writes", lambda: _repository.writer.stats.as_dict() if _repository else {}
+)
@@ -0,0 +1,311 @@
+import json
+import re
+import time
+import uuid
+from collections.abc import Iterator, Sequence
+from typing import Any
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+CPF_RE = re.compile(r"\b(\d{3}\.?\d{3}\.?\d{3}-?\d{2})\b")
+DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+AMOUNT_RE = re.compile(r"\b(\d+(?:[.,]\d+)?)\b")
+CURRENCY_RE = re.compile(r"\b(USD|EUR|GBP|JPY|ARS|CAD|CHF|BTC|BRL)\b", re.IGNORECASE)
+EXIT_RE = re.compile(r"\b(sair|tchau|encerrar|q)\b", re.IGNORECASE)
+TOKEN_RE = re.compile(r"\S+\s*")
+
+
+class FakeChatModel(BaseChatModel):
+    """Modelo determinístico para testes de carga sem Ollama.
+
+    Decide a resposta por regras simples sobre a última mensagem (CPF e data
+    -> `triagem`, moedas -> `quote_currency`, etc.) e simula a latência de
+    geração com `token_delay` segundos por token.
+    """
+
+    token_delay: float = 0.0
+    prompt_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-banking"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeChatModel":  # noqa: ARG002
+        return self
+
+    def respond(self, messages: Sequence[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+
+        if isinstance(last, ToolMessage):
+            return AIMessage(self._reply_to_tool(last))
+
+        text = last.text if isinstance(last, HumanMessage) else ""
+        currencies = [c.upper() for c in CURRENCY_RE.findall(text)]
+        cpf = CPF_RE.search(text)
+        date = DATE_RE.search(text)
+
+        if cpf and date:
+            return self._tool_call(
+                "triagem",
+                {"cpf": re.sub(r"\D", "", cpf.group(1)), "data_nascimento": date.group(1)},
+            )
+        if EXIT_RE.search(text):
+            return self._tool_call("encerrar_conversa", {})
+        if "limite" in text.lower() and (amount := AMOUNT_RE.search(text)):
+            return self._tool_call(
+                "solicitar_aumento_limite",
+                {
+                    "cpf": self._known_cpf(messages) or "",
+                    "novo_limite_solicitado": float(amount.group(1).replace(",", ".")),
+                },
+            )
+        if currencies:
+            target = "BRL"
+            sources = [c for c in currencies if c != target] or ["USD"]
+            if len(sources) == 1:
+                return self._tool_call(
+                    "quote_currency", {"from_currency": sources[0], "to_currency": target}
+                )
+            return self._tool_call(
+                "quote_currencies", {"pairs": [f"{c}-{target}" for c in sources]}
+            )
+
+        return AIMessage(
+            "Olá! 👋 Sou o assistente virtual do Banco Ágil. Para começar, "
+            "informe seu CPF e sua data de nascimento (AAAA-MM-DD)."
+        )
+
+    @staticmethod
+    def _known_cpf(messages: Sequence[BaseMessage]) -> str | None:
+        for message in reversed(messages):
+            found = re.search(r"cpf=(\d{11})", message.text) or CPF_RE.search(message.text)
+            if found:
+                return re.sub(r"\D", "", found.group(1))
+        return None
+
+    @staticmethod
+    def _tool_call(name: str, args: dict[str, Any]) -> AIMessage:
+        call_id = f"call_{uuid.uuid4().hex[:12]}"
+        return AIMessage("", tool_calls=[{"name": name, "args": args, "id": call_id}])
+
+    @staticmethod
+    def _reply_to_tool(message: ToolMessage) -> str:
+        try:
+            result = json.loads(message.text)
+        except ValueError:
+            return f"Houve um problema: {message.text}"
+        if not isinstance(result, dict):
+            return f"Resultado: {message.text}"
+        if result.get("success") is False or result.get("sucesso") is False:
+            return f"Não foi possível concluir: {result.get('message') or result.get('mensagem')}"
+        if message.name == "triagem":
+            return (
+                f"Olá, {result.get('nome')}! ✅ Posso ajudar com Alteração de Limite, "
+                "Entrevista de Crédito e Cotação de Câmbio."
+            )
+        if message.name == "quote_currency":
+            return f"A cotação {result.get('from')}/{result.get('to')} é {result.get('rate')}. 💱"
+        if message.name == "solicitar_aumento_limite":
+            return f"Sua solicitação foi {result.get('status_pedido')}."
+        if message.name == "encerrar_conversa":
+            return "Atendimento encerrado. Até logo! 👋"
+        return f"Pronto! {message.text}"
+
+    def _usage(self, messages: Sequence[BaseMessage], output: AIMessage) -> dict[str, int]:
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([output])
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,  # noqa: ARG002
+        run_manager: CallbackManagerForLLMRun | None = None,  # noqa: ARG002
+        **kwargs: Any,  # noqa: ARG002
+    ) -> ChatResult:
+        message = self.respond(messages)
+        time.sleep(self.prompt_delay + self.token_delay * len(TOKEN_RE.findall(message.text)))
+        message.usage_metadata = self._usage(messages, message)  # type: ignore[assignment]
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,  # noqa: ARG002
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,  # noqa: ARG002
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self.respond(messages)
+        time.sleep(self.prompt_delay)
+
+        for token in TOKEN_RE.findall(message.text):
+            time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {
+                        "name": call["name"],
+                        "args": json.dumps(call["args"], ensure_ascii=False),
+                        "id": call["id"],
+                        "index": i,
+                    }
+                    for i, call in enumerate(message.tool_calls)
+                ],
+                usage_metadata=self._usage(messages, message),  # type: ignore[arg-type]
+                chunk_position="last",
+            )
+        )
+
+
+PLACEHOLDER_RE = re.compile(r"\\\{(\w+)\\\}")
+PLACEHOLDER_PATTERNS = {
+    "cpf": r"\d{3}\.?\d{3}\.?\d{3}-?\d{2}",
+    "data_nascimento": r"\d{4}-\d{2}-\d{2}",
+}
+
+
+def script_key(text: str) -> str:
+    return " ".join(text.split())
+
+
+def compile_template(text: str) -> re.Pattern[str]:
+    """"Meu CPF é {cpf}" -> regex com grupos nomeados para os placeholders."""
+    return re.compile(
+        PLACEHOLDER_RE.sub(
+            lambda m: f"(?P<{m.group(1)}>{PLACEHOLDER_PATTERNS.get(m.group(1), '.+?')})",
+            re.escape(script_key(text)),
+        ),
+        re.IGNORECASE,
+    )
+
+
+def fill_template(value: Any, values: dict[str, str]) -> Any:
+    if isinstance(value, str):
+        return re.sub(r"\{(\w+)\}", lambda m: values.get(m.group(1), m.group(0)), value)
+    if isinstance(value, dict):
+        return {key: fill_template(item, values) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill_template(item, values) for item in value]
+    return value
+
+
+class ScriptedChatModel(FakeChatModel):
+    """Reproduz conversas gravadas (`bench/conversations.jsonl`).
+
+    Cada turno gravado tem o texto do cliente (com placeholders como
+    `{cpf}`, `{data_nascimento}` e `{nome}`) e os passos do assistente
+    (`{"content": ...}` ou `{"tool_calls": [{"name": ..., "args": ...}]}`),
+    devolvidos em ordem a cada chamada ao modelo no turno. Os placeholders
+    são preenchidos com o que a própria conversa já revelou (texto do
+    cliente, argumentos e resultado da `triagem`), então um mesmo roteiro
+    serve para qualquer cliente. Mensagens fora do roteiro caem nas regras
+    do `FakeChatModel`.
+    """
+
+    turns: list[tuple[str, list[dict[str, Any]]]] = []
+    _patterns: list[tuple[re.Pattern[str], list[dict[str, Any]]]] = PrivateAttr(
+        default_factory=list
+    )
+
+    def model_post_init(self, context: Any) -> None:
+        self._patterns = [(compile_template(text), steps) for text, steps in self.turns]
+
+    @classmethod
+    def from_conversations(
+        cls, conversations: Sequence[dict[str, Any]], **kwargs: Any
+    ) -> "ScriptedChatModel":
+        turns = [
+            (turn["user"], turn.get("assistant", []))
+            for conversation in conversations
+            for turn in conversation["turns"]
+        ]
+        return cls(turns=turns, **kwargs)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs: Any) -> "ScriptedChatModel":
+        with open(path, encoding="utf-8") as f:
+            conversations = [json.loads(line) for line in f if line.strip()]
+        return cls.from_conversations(conversations, **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-banking"
+
+    def respond(self, messages: Sequence[BaseMessage]) -> AIMessage:
+        human = next(
+            (i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)),
+            None,
+        )
+        if human is None:
+            return super().respond(messages)
+
+        text = script_key(messages[human].text)
+        for pattern, steps in self._patterns:
+            if match := pattern.fullmatch(text):
+                break
+        else:
+            return super().respond(messages)
+
+        # Passo = quantas respostas do modelo já houve neste turno
+        step = sum(
+            1
+            for message in messages[human + 1 :]
+            if isinstance(message, AIMessage) and message.name != "fast_path"
+        )
+        if step >= len(steps):
+            return super().respond(messages)
+
+        values = self._known_values(messages) | {
+            key: value for key, value in match.groupdict().items() if value
+        }
+        recorded = fill_template(steps[step], values)
+        if recorded.get("tool_calls"):
+            message = AIMessage("", tool_calls=[])
+            for call in recorded["tool_calls"]:
+                message.tool_calls += self._tool_call(call["name"], call.get("args", {})).tool_calls
+            return message
+        return AIMessage(recorded.get("content", ""))
+
+    @staticmethod
+    def _known_values(messages: Sequence[BaseMessage]) -> dict[str, str]:
+        values: dict[str, str] = {}
+        for message in messages:
+            if isinstance(message, AIMessage):
+                for call in message.tool_calls:
+                    if call["name"] == "triagem":
+                        values |= {key: str(value) for key, value in call["args"].items()}
+            elif isinstance(message, ToolMessage) and message.name == "triagem":
+                # O conteúdo enviado ao modelo é a projeção compacta
+                # (`sucesso`, `nome`); o resultado completo fica no artifact
+                if isinstance(message.artifact, dict):
+                    usuario = message.artifact.get("usuario") or {}
+                else:
+                    try:
+                        usuario = {"nome": json.loads(message.text).get("nome")}
+                    except (ValueError, AttributeError):
+                        continue
+                values |= {
+                    key: str(value) for key, value in usuario.items() if value is not None
+                }
+        return values
@@ -0,0 +1,274 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+from metrics import register_collector, span
+
+if TYPE_CHECKING:
+    import requests
+
+AWESOMEAPI_URL = "https://economia.awesomeapi.com.br/json/last"
+
+
+class QuoteError(Exception):
+    """Falha ao obter a cotação e nenhum valor em cache para servir."""
+
+    def __init__(self, message: str, raw: Any = None) -> None:
+        super().__init__(message)
+        self.raw = raw
+
+
+@dataclass(slots=True)
+class Quote:
+    pair: str
+    rate: float
+    raw: dict[str, Any]
+    fetched_at: float
+    stale: bool = False
+
+
+@dataclass(slots=True)
+class QuoteStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    stale_served: int = 0
+    upstream_errors: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self) | {"hit_rate": round(self.hit_rate, 4)}
+
+
+@dataclass(slots=True)
+class _CacheEntry:
+    quote: Quote
+    expires_at: float
+
+
+class CurrencyQuoteService:
+    """Cotações da AwesomeAPI com sessão HTTP reutilizável e cache TTL/LRU.
+
+    Requisições simultâneas para o mesmo par que não estejam em cache são
+    agrupadas em uma única chamada (single-flight). Se a API falhar, a última
+    cotação conhecida é servida marcada como `stale`.
+    """
+
+    def __init__(
+        self,
+        base_url: str = AWESOMEAPI_URL,
+        ttl: float = 30.0,
+        max_entries: int = 256,
+        timeout: float | tuple[float, float] = (3.05, 10),
+        pool_size: int = 32,
+        session: "requests.Session | None" = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.stats = QuoteStats()
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._inflight: dict[str, Future[Quote]] = {}
+
+        if session is None:
+            # requests só é importado quando o serviço é criado (1ª cotação)
+            import requests  # noqa: PLC0415
+            from requests.adapters import HTTPAdapter  # noqa: PLC0415
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self._session = session
+
+    @staticmethod
+    def pair_key(from_currency: str, to_currency: str) -> str:
+        return f"{from_currency.strip().upper()}-{to_currency.strip().upper()}"
+
+    @classmethod
+    def parse_pair(cls, text: str) -> str:
+        """Normaliza "usd-brl", "USD/BRL" ou "USDBRL" para "USD-BRL"."""
+        cleaned = text.strip().upper().replace("/", "-").replace(" ", "")
+        if "-" not in cleaned and len(cleaned) == 6:  # noqa: PLR2004
+            cleaned = f"{cleaned[:3]}-{cleaned[3:]}"
+        from_currency, sep, to_currency = cleaned.partition("-")
+        if not sep or not from_currency.isalpha() or not to_currency.isalpha():
+            msg = f"Par de moedas inválido: {text!r} (use o formato USD-BRL)"
+            raise ValueError(msg)
+        return cls.pair_key(from_currency, to_currency)
+
+    def get_quote(self, from_currency: str, to_currency: str) -> Quote:
+        pair = self.pair_key(from_currency, to_currency)
+        result = self.get_quotes([pair])[pair]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def get_quotes(self, pairs: Iterable[str]) -> dict[str, Quote | Exception]:
+        """Cotações de vários pares ("USD-BRL") com uma única chamada à API.
+
+        Pares em cache são servidos direto; os demais são buscados juntos em
+        `/json/last/USD-BRL,EUR-BRL,...`. Falhas são retornadas por par.
+        """
+        keys = list(dict.fromkeys(pairs))
+        results: dict[str, Quote | Exception] = {}
+        waiting: dict[str, Future[Quote]] = {}
+        leading: dict[str, Future[Quote]] = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for pair in keys:
+                entry = self._cache.get(pair)
+                if entry is not None and entry.expires_at > now:
+                    self._cache.move_to_end(pair)
+                    self.stats.hits += 1
+                    results[pair] = entry.quote
+                    continue
+
+                flight = self._inflight.get(pair)
+                if flight is not None:
+                    self.stats.coalesced += 1
+                    waiting[pair] = flight
+                else:
+                    flight = Future()
+                    self._inflight[pair] = flight
+                    self.stats.misses += 1
+                    leading[pair] = flight
+
+        if leading:
+            self._resolve(leading)
+
+        for pair, flight in (waiting | leading).items():
+            try:
+                results[pair] = flight.result()
+            except Exception as error:  # noqa: BLE001
+                results[pair] = error
+
+        return {pair: results[pair] for pair in keys}
+
+    def _resolve(self, flights: dict[str, Future[Quote]]) -> None:
+        try:
+            fetched = self._fetch_many(list(flights))
+        except Exception as error:  # noqa: BLE001
+            fetched = {pair: error for pair in flights}
+
+        try:
+            for pair, flight in flights.items():
+                result = fetched[pair]
+                if isinstance(result, Quote):
+                    self._store(result)
+                    flight.set_result(result)
+                    continue
+
+                with self._lock:
+                    self.stats.upstream_errors += 1
+                    stale = self._cache.get(pair)
+                    if stale is not None:
+                        self.stats.stale_served += 1
+
+                if stale is None:
+                    flight.set_exception(result)
+                else:
+                    flight.set_result(
+                        Quote(
+                            pair=pair,
+                            rate=stale.quote.rate,
+                            raw=stale.quote.raw,
+                            fetched_at=stale.quote.fetched_at,
+                            stale=True,
+                        )
+                    )
+        finally:
+            with self._lock:
+                for pair in flights:
+                    self._inflight.pop(pair, None)
+
+    def _fetch_many(self, pairs: list[str]) -> dict[str, Quote | Exception]:
+        url = f"{self.base_url}/{','.join(pairs)}"
+        with span("fx.upstream", pairs=len(pairs)) as record:
+            resp = self._session.get(url, timeout=self.timeout)
+            record["http.status_code"] = resp.status_code
+
+        if resp.status_code == HTTPStatus.NOT_FOUND and len(pairs) > 1:
+            # A API rejeita o lote inteiro se um dos pares não existir
+            results: dict[str, Quote | Exception] = {}
+            for pair in pairs:
+                try:
+                    results |= self._fetch_many([pair])
+                except Exception as error:  # noqa: BLE001
+                    results[pair] = error
+            return results
+
+        if not resp.ok:
+            msg = f"Erro ao consultar API: {resp.status_code}"
+            raise QuoteError(msg, raw=resp.text)
+
+        data = resp.json()
+        fetched_at = time.time()
+        results = {}
+        for pair in pairs:
+            # A resposta vem com chave igual ao par sem hífen (ex: "USDBRL")
+            key = pair.replace("-", "")
+            quote_data = data.get(key) or data.get(pair)
+            if not quote_data:
+                results[pair] = QuoteError(
+                    "Par de moedas não encontrado na resposta", raw=data
+                )
+                continue
+            results[pair] = Quote(
+                pair=pair,
+                rate=float(quote_data["bid"]),  # "bid" é o valor de cotação
+                raw={key: quote_data},
+                fetched_at=fetched_at,
+            )
+        return results
+
+    def _store(self, quote: Quote) -> None:
+        with self._lock:
+            self._cache[quote.pair] = _CacheEntry(quote, time.monotonic() + self.ttl)
+            self._cache.move_to_end(quote.pair)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        self._session.close()
+
+
+_service: CurrencyQuoteService | None = None
+_service_lock = threading.Lock()
+
+
+def get_quote_service() -> CurrencyQuoteService:
+    """Serviço compartilhado, configurável por `BANK_FX_URL`, `BANK_FX_TTL`
+    e `BANK_FX_CACHE_SIZE`."""
+    global _service  # noqa: PLW0603
+
+    with _service_lock:
+        if _service is None:
+            _service = CurrencyQuoteService(
+                base_url=os.getenv("BANK_FX_URL", AWESOMEAPI_URL),
+                ttl=float(os.getenv("BANK_FX_TTL", "30")),
+                max_entries=int(os.getenv("BANK_FX_CACHE_SIZE", "256")),
+            )
+        return _service
+
+
+register_collector("fx", lambda: _service.stats.as_dict() if _service else {})
@@ -1,23 +1,156 @@
+import asyncio
+import contextvars
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal
 
-from langchain_core.messages import AIMessage, ToolMessage
-from langgraph.checkpoint.memory import InMemorySaver
+from langchain_core.messages import AIMessage, HumanMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.constants import START
 from langgraph.graph.state import CompiledStateGraph, StateGraph
 from pydantic import ValidationError
 
+from checkpointer import load_checkpointer
+from context import build_prompt, manage_context
+from intents import classify, record_turn, render_reply
+from llm_scheduler import BUSY_MESSAGE, LLMQueueRejected, classify_request, get_llm_scheduler
+from metrics import instrument_node, record_llm_usage, record_tool_timeout, tool_span
+from prompt_prefix import get_prompt_prefix, record_timings
+from response_cache import get_response_cache
+from shaping import shape_tool_result
 from state import State
 from tools import TOOLS, TOOLS_BY_NAME
-from utils import load_llm
+from utils import get_llm_with_tools
 
 
-def call_llm(state: State) -> State:
+FAST_PATH = "fast_path"
+FAST_PATH_ENABLED = os.getenv("BANK_FAST_PATH", "1") != "0"
+
+
+def _failed_logins(state: State) -> int:
+    return sum(
+        1
+        for message in state["messages"]
+        if isinstance(message, ToolMessage)
+        and message.name == "triagem"
+        and not (isinstance(message.artifact, dict) and message.artifact.get("sucesso"))
+    )
+
+
+def fast_path(state: State) -> State:
+    """Classifica a mensagem por regras e, se houver confiança, já decide a tool.
+
+    A tool call é gravada como uma AIMessage comum (com `name="fast_path"`),
+    então o histórico continua coerente para o LLM nos turnos seguintes.
+    """
+    last = state["messages"][-1]
+    intent = None
+    if FAST_PATH_ENABLED and isinstance(last, HumanMessage):
+        intent = classify(
+            last.text,
+            authenticated=bool(state.get("authenticated_user")),
+            failed_logins=_failed_logins(state),
+        )
+    record_turn(intent)
+
+    if intent is None:
+        return {}
+
+    call = ToolCall(name=intent.tool, args=intent.args, id=f"call_{uuid.uuid4().hex[:12]}")
+    return {"messages": [AIMessage("", tool_calls=[call], name=FAST_PATH)]}
+
+
+def fast_path_router(state: State) -> Literal["tool_node", "manage_context"]:
+    last = state["messages"][-1]
+    if isinstance(last, AIMessage) and last.name == FAST_PATH and last.tool_calls:
+        return "tool_node"
+    return "manage_context"
+
+
+def fast_path_reply(state: State) -> State:
+    """Responde por template ao resultado da tool chamada pelo fast path."""
+    last = state["messages"][-1]
+    result = last.artifact if last.artifact is not None else last.text
+    reply = render_reply(last.name or "", result)
+    return {"messages": [AIMessage(reply, name=FAST_PATH)]}
+
+
+def call_llm(state: State, config: RunnableConfig) -> State:
     # print("> call llm")
-    llm_with_tools = load_llm().bind_tools(TOOLS)
-    result = llm_with_tools.invoke(state["messages"])
+    llm_with_tools = get_llm_with_tools(TOOLS)
+    # Mesmo objeto de system prompt em todos os passos: prefixo byte a byte
+    # idêntico para o cache KV do Ollama
+    prefix = get_prompt_prefix(TOOLS)
+    prompt = build_prompt({**state, "messages": prefix.pin(state["messages"])})
+    user = state.get("authenticated_user")
+
+    cache = get_response_cache(TOOLS)
+    key = cache.key_for(prompt, user) if cache is not None else None
+    if key is not None and (cached := cache.get(key, user)) is not None:  # type: ignore[union-attr]
+        return {"messages": [cached]}
+
+    # Gerações limitadas e em fila: respostas a tools primeiro, rodízio
+    # entre conversas e recusa amigável quando o prazo da fila vence
+    thread_id = str((config.get("configurable") or {}).get("thread_id", ""))
+    try:
+        with get_llm_scheduler().slot(thread_id, classify_request(state["messages"])):
+            result = llm_with_tools.invoke(prompt)
+    except LLMQueueRejected as error:
+        return {
+            "messages": [
+                AIMessage(BUSY_MESSAGE, response_metadata={"scheduler": error.reason})
+            ]
+        }
+    record_llm_usage(result)
+    record_timings(result)
+
+    if key is not None:
+        cache.put(key, result, user)  # type: ignore[union-attr]
     return {"messages": [result]}
 
 
+TOOL_MAX_WORKERS = int(os.getenv("BANK_TOOL_WORKERS", "8"))
+TOOL_TIMEOUT = float(os.getenv("BANK_TOOL_TIMEOUT", "30"))
+TOOL_TIMEOUTS: dict[str, float] = {"quote_currency": 15, "quote_currencies": 15}
+# Tools que gravam na base não têm prazo: a thread não pode ser interrompida,
+# então um "falhou" por timeout viraria uma gravação tardia e o modelo
+# repetiria o pedido (ex.: duas solicitações de aumento)
+MUTATING_TOOLS = frozenset({"solicitar_aumento_limite", "recalcular_score"})
+
+_tool_executor = ThreadPoolExecutor(
+    max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool_node"
+)
+
+
+def run_tool_call(call: ToolCall) -> ToolMessage:
+    name, args, id_ = call["name"], call["args"], call["id"]
+
+    with tool_span(name) as record:
+        try:
+            tool = TOOLS_BY_NAME[name]
+            if getattr(tool, "coroutine", None) is not None:
+                result = asyncio.run(tool.ainvoke(args))
+            else:
+                result = tool.invoke(args)
+            content = shape_tool_result(name, result)
+            status = "success"
+        except (KeyError, IndexError, TypeError, ValidationError, ValueError) as error:
+            result = content = f"Please, fix your mistakes: {error}"
+            status = "error"
+        except Exception as error:  # noqa: BLE001
+            result = content = f"Tool {name} failed: {error}"
+            status = "error"
+        if status == "error":
+            record["status"] = "error"
+
+    # O modelo recebe a projeção compacta; o resultado completo fica no artifact
+    return ToolMessage(
+        content=content, tool_call_id=id_, name=name, status=status, artifact=result
+    )
+
+
 def tool_node(state: State) -> State:
     # print("> tool node")
     llm_response = state["messages"][-1]
@@ -27,19 +160,45 @@ def tool_node(state: State) -> State:
     ):
         return state
 
-    call = llm_response.tool_calls[-1]
-    name, args, id_ = call["name"], call["args"], call["id"]
-
-    try:
-        content = TOOLS_BY_NAME[name].invoke(args)
-        status = "success"
-    except (KeyError, IndexError, TypeError, ValidationError, ValueError) as error:
-        content = f"Please, fix your mistakes: {error}"
-        status = "error"
-
-    tool_message = ToolMessage(content=content, tool_call_id=id_, status=status)
-
-    return {"messages": [tool_message]}
+    calls = llm_response.tool_calls
+
+    # Executa todas as tool calls em paralelo, mantendo a ordem original
+    started = time.monotonic()
+    # copy_context leva o span do nó para as threads (traces aninhados)
+    futures = [
+        _tool_executor.submit(contextvars.copy_context().run, run_tool_call, call)
+        for call in calls
+    ]
+    tool_messages = []
+
+    for call, future in zip(calls, futures, strict=True):
+        if call["name"] in MUTATING_TOOLS:
+            tool_messages.append(future.result())
+            continue
+        timeout = TOOL_TIMEOUTS.get(call["name"], TOOL_TIMEOUT)
+        remaining = max(0.0, started + timeout - time.monotonic())
+        try:
+            tool_messages.append(future.result(timeout=remaining))
+        except TimeoutError:
+            future.cancel()
+            record_tool_timeout(call["name"])
+            tool_messages.append(
+                ToolMessage(
+                    content=f"Tool {call['name']} timed out after {timeout:g}s",
+                    tool_call_id=call["id"],
+                    name=call["name"],
+                    status="error",
+                )
+            )
+
+    update: State = {"messages": tool_messages}
+
+    for message in tool_messages:
+        result = message.artifact
+        if message.name == "triagem" and isinstance(result, dict) and result.get("sucesso"):
+            update["authenticated_user"] = result["usuario"]
+
+    return update
 
 
 def router(state: State) -> Literal["tool_node", "__end__"]:
@@ -51,14 +210,31 @@ def router(state: State) -> Literal["tool_node", "__end__"]:
     return "__end__"
 
 
+def after_tools(state: State) -> Literal["fast_path_reply", "manage_context"]:
+    for message in reversed(state["messages"]):
+        if isinstance(message, AIMessage):
+            return "fast_path_reply" if message.name == FAST_PATH else "manage_context"
+    return "manage_context"
+
+
 def build_graph() -> CompiledStateGraph[State, None, State, State]:
     builder = StateGraph(State)
 
-    builder.add_node("call_llm", call_llm)
-    builder.add_node("tool_node", tool_node)
-
-    builder.add_edge(START, "call_llm")
+    nodes = {
+        "fast_path": fast_path,
+        "fast_path_reply": fast_path_reply,
+        "manage_context": manage_context,
+        "call_llm": call_llm,
+        "tool_node": tool_node,
+    }
+    for name, node in nodes.items():
+        builder.add_node(name, instrument_node(name, node))
+
+    builder.add_edge(START, "fast_path")
+    builder.add_conditional_edges("fast_path", fast_path_router, ["tool_node", "manage_context"])
+    builder.add_edge("manage_context", "call_llm")
     builder.add_conditional_edges("call_llm", router, ["tool_node", "__end__"])
-    builder.add_edge("tool_node", "call_llm")
+    builder.add_conditional_edges("tool_node", after_tools, ["fast_path_reply", "manage_context"])
+    builder.add_edge("fast_path_reply", "__end__")
 
-    return builder.compile(checkpointer=InMemorySaver())
+    return builder.compile(checkpointer=load_checkpointer())
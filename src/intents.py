@@ -0,0 +1,192 @@
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from metrics import register_collector
+
+CPF_RE = re.compile(r"\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b")
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+BR_DATE_RE = re.compile(r"\b(\d{2})/(\d{2})/(\d{4})\b")
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+AUTH_FILLER = frozenset(
+    {
+        "cpf", "meu", "minha", "é", "e", "data", "de", "nascimento", "nasc", "nasci",
+        "em", "dn", "o", "a",
+    }
+)  # fmt: skip
+EXIT_WORDS = frozenset({"q", "quit", "sair", "tchau", "encerrar", "finalizar", "exit"})
+QUOTE_FILLER = frozenset(
+    {
+        "COTAÇÃO", "COTACAO", "COTAÇÕES", "COTACOES", "CÂMBIO", "CAMBIO", "QUAL",
+        "QUANTO", "ESTÁ", "ESTA", "VALOR", "DO", "DA", "DE", "O", "A", "OS", "AS",
+        "HOJE", "POR", "FAVOR",
+    }
+)  # fmt: skip
+QUOTE_TARGET_WORDS = frozenset({"PARA", "EM"})
+CURRENCIES = frozenset(
+    {
+        "USD", "EUR", "GBP", "JPY", "CHF", "CAD", "AUD", "ARS", "CLP", "CNY",
+        "MXN", "UYU", "BTC", "ETH", "BRL",
+    }
+)  # fmt: skip
+
+
+@dataclass(frozen=True, slots=True)
+class Intent:
+    """Ação decidida sem o LLM: qual tool chamar e com quais argumentos."""
+
+    name: str
+    tool: str
+    args: dict[str, Any]
+
+
+@dataclass(slots=True)
+class FastPathStats:
+    turns: int = 0
+    served: int = 0
+    by_intent: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def served_ratio(self) -> float:
+        return self.served / self.turns if self.turns else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self) | {"served_ratio": round(self.served_ratio, 4)}
+
+
+FAST_PATH_STATS = FastPathStats()
+_stats_lock = threading.Lock()
+register_collector("fast_path", FAST_PATH_STATS.as_dict)
+
+
+def record_turn(intent: Intent | None) -> None:
+    with _stats_lock:
+        FAST_PATH_STATS.turns += 1
+        if intent is not None:
+            FAST_PATH_STATS.served += 1
+            FAST_PATH_STATS.by_intent[intent.name] = (
+                FAST_PATH_STATS.by_intent.get(intent.name, 0) + 1
+            )
+
+
+def match_authentication(text: str) -> Intent | None:
+    """Mensagem contendo apenas CPF e data de nascimento (com palavras de apoio)."""
+    cpfs = CPF_RE.findall(text)
+    iso = ISO_DATE_RE.findall(text)
+    br = BR_DATE_RE.findall(text)
+    if len(cpfs) != 1 or len(iso) + len(br) != 1:
+        return None
+
+    rest = BR_DATE_RE.sub(" ", ISO_DATE_RE.sub(" ", CPF_RE.sub(" ", text)))
+    if any(char.isdigit() for char in rest):
+        return None
+    if any(word not in AUTH_FILLER for word in WORD_RE.findall(rest.lower())):
+        return None
+
+    year, month, day = iso[0] if iso else tuple(reversed(br[0]))
+    cpf = re.sub(r"\D", "", cpfs[0])
+    return Intent(
+        "authenticate",
+        "triagem",
+        {"cpf": cpf, "data_nascimento": f"{year}-{month}-{day}"},
+    )
+
+
+def match_exit(text: str) -> Intent | None:
+    words = WORD_RE.findall(text.lower())
+    if len(words) == 1 and words[0] in EXIT_WORDS:
+        return Intent("exit", "encerrar_conversa", {})
+    return None
+
+
+def match_quote(text: str) -> Intent | None:
+    """"USD para BRL", "USD-BRL", "cotação do USD, EUR e GBP em BRL"."""
+    normalized = re.sub(r"\s*(?:->|/|-)\s*", " PARA ", text.upper())
+    words = [w for w in WORD_RE.findall(normalized) if w not in QUOTE_FILLER]
+
+    connectors = [i for i, word in enumerate(words) if word in QUOTE_TARGET_WORDS]
+    if len(connectors) != 1:
+        return None
+
+    split = connectors[0]
+    sources = [w for w in words[:split] if w != "E"]
+    targets = words[split + 1 :]
+    if not sources or len(targets) != 1:
+        return None
+    if any(code not in CURRENCIES for code in [*sources, *targets]):
+        return None
+
+    target = targets[0]
+    if len(sources) == 1:
+        return Intent(
+            "quote", "quote_currency", {"from_currency": sources[0], "to_currency": target}
+        )
+    return Intent(
+        "quote_many",
+        "quote_currencies",
+        {"pairs": [f"{source}-{target}" for source in dict.fromkeys(sources)]},
+    )
+
+
+def classify(text: str, *, authenticated: bool, failed_logins: int) -> Intent | None:
+    """Regras determinísticas; devolve None quando não há confiança (vai ao LLM)."""
+    text = text.strip()
+    if not text:
+        return None
+
+    if intent := match_exit(text):
+        return intent
+
+    if not authenticated:
+        # Na terceira tentativa o prompt manda encerrar: deixa com o LLM
+        if failed_logins < 2:  # noqa: PLR2004
+            return match_authentication(text)
+        return None
+
+    return match_quote(text)
+
+
+def format_brl(value: float) -> str:
+    return f"{value:,.4f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def render_reply(tool: str, result: Any) -> str:
+    """Resposta em template para o resultado da tool chamada pelo fast path."""
+    if not isinstance(result, dict):
+        return f"⚠️ Não foi possível concluir a operação: {result}"
+
+    if tool == "triagem":
+        if result.get("sucesso"):
+            nome = result["usuario"]["nome"]
+            return (
+                f"Olá, {nome}! 👋 Autenticação realizada com sucesso ✅\n\n"
+                "Posso ajudar com **Alteração de Limite**, **Entrevista de Crédito** "
+                "e **Cotação de Câmbio**. O que você deseja?"
+            )
+        return (
+            "❌ Não consegui validar seus dados: CPF ou data de nascimento incorretos. "
+            "Por favor, confira e envie novamente."
+        )
+
+    if tool == "encerrar_conversa":
+        return "Atendimento encerrado. Obrigado por falar com o Banco Ágil! 👋"
+
+    if tool == "quote_currency":
+        if not result.get("success"):
+            return f"⚠️ Não consegui obter a cotação agora: {result.get('message')}"
+        return (
+            f"💱 Cotação {result['from']}/{result['to']}: **{format_brl(result['rate'])}**\n\n"
+            "Precisa de outra consulta?"
+        )
+
+    if tool == "quote_currencies":
+        lines = [
+            f"- {pair.replace('-', '/')}: **{format_brl(rate)}**"
+            for pair, rate in result.get("rates", {}).items()
+        ]
+        lines += [f"- {pair}: ⚠️ {error}" for pair, error in result.get("errors", {}).items()]
+        return "💱 Cotações atuais:\n\n" + "\n".join(lines) + "\n\nPrecisa de outra consulta?"
+
+    return str(result)
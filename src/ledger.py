@@ -0,0 +1,488 @@
+import atexit
+import csv
+import io
+import os
+import threading
+from collections.abc import Iterator, Sequence
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Literal
+
+from write_coordinator import FileLock
+
+FsyncPolicy = Literal["always", "interval", "never"]
+Row = dict[str, Any]
+
+INDEX_SUFFIX = ".idx"
+
+
+@dataclass(frozen=True)
+class LedgerConfig:
+    """Política de escrita do ledger.
+
+    - `fsync`: `always` (cada append espera o fsync, em grupo), `interval`
+      (fsync a cada flush em segundo plano) ou `never` (fica com o SO).
+    - `flush_interval`: intervalo máximo, em segundos, entre flushes.
+    - `max_bytes` / `rotate_daily`: quando o arquivo ativo é rotacionado.
+    """
+
+    fsync: FsyncPolicy = "interval"
+    flush_interval: float = 0.2
+    max_bytes: int = 16 * 1024 * 1024
+    rotate_daily: bool = False
+
+    @classmethod
+    def from_env(cls) -> "LedgerConfig":
+        fsync = os.getenv("BANK_LEDGER_FSYNC", cls.fsync)
+        if fsync not in ("always", "interval", "never"):
+            msg = f"Política de fsync desconhecida: {fsync}"
+            raise ValueError(msg)
+        return cls(
+            fsync=fsync,  # type: ignore[arg-type]
+            flush_interval=float(
+                os.getenv("BANK_LEDGER_FLUSH_INTERVAL", str(cls.flush_interval))
+            ),
+            max_bytes=int(os.getenv("BANK_LEDGER_MAX_BYTES", str(cls.max_bytes))),
+            rotate_daily=os.getenv("BANK_LEDGER_ROTATE_DAILY", "0") == "1",
+        )
+
+
+@dataclass(slots=True)
+class RequestStats:
+    total: int = 0
+    aprovados: int = 0
+    ultima_solicitacao: str | None = None
+
+    @property
+    def rejeitados(self) -> int:
+        return self.total - self.aprovados
+
+    @property
+    def taxa_aprovacao(self) -> float:
+        return self.aprovados / self.total if self.total else 0.0
+
+    def as_dict(self) -> Row:
+        return asdict(self) | {
+            "rejeitados": self.rejeitados,
+            "taxa_aprovacao": round(self.taxa_aprovacao, 4),
+        }
+
+
+# (segmento, offset, data_hora_solicitacao, status_pedido)
+IndexEntry = tuple[int, int, str, str]
+# (inode, tamanho) do arquivo ativo; None se ele ainda não existe
+DiskState = tuple[int, int] | None
+
+
+def _csv_line(values: Sequence[Any]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue().encode()
+
+
+def _parse_line(line: bytes) -> list[str]:
+    return next(csv.reader([line.decode()]))
+
+
+class Ledger:
+    """Log de solicitações só de acréscimo, em CSV, com índice por cliente.
+
+    `append` apenas enfileira a linha; uma thread em segundo plano grava os
+    lotes no arquivo ativo conforme a política de fsync e rotaciona o
+    arquivo por tamanho ou data (`<nome>-<AAAAMMDDTHHMMSS>.csv`). Cada
+    segmento tem um índice lateral (`.csv.idx`) com `cpf, offset, data,
+    status`, carregado em memória: contagens e taxa de aprovação saem só do
+    índice e as solicitações recentes são lidas por `seek` direto na linha.
+
+    A escrita (append, índice e rotação) acontece fora do lock em memória,
+    para leituras não esperarem pelo fsync, e sob um `FileLock` no arquivo
+    ativo: o servidor e o CLI em lote (`limits.py`) podem gravar no mesmo
+    ledger. Se outro processo escreveu ou rotacionou desde a última
+    gravação, o índice em memória é recarregado do disco antes de escrever.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fields: Sequence[str],
+        config: LedgerConfig | None = None,
+        key_field: str | None = None,
+        time_field: str | None = None,
+        status_field: str | None = None,
+    ) -> None:
+        self.path = path
+        self.fields = list(fields)
+        self.config = config or LedgerConfig.from_env()
+        self.key_field = key_field or self.fields[0]
+        self.time_field = time_field or self.fields[1]
+        self.status_field = status_field or self.fields[-1]
+
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        # Serializa as gravações deste processo; nunca é pego com `_lock`
+        self._io_lock = threading.Lock()
+        self._file_lock = FileLock(self.path)
+        self._segments: list[Path] = []
+        self._index: dict[str, list[IndexEntry]] = {}
+        self._pending: list[Row] = []
+        # Lote sendo gravado: continua visível para `recent` e `stats`
+        self._inflight: list[Row] = []
+        self._disk: DiskState = None
+        self._appended = 0
+        self._written = 0
+        self._file: BinaryIO | None = None
+        self._index_file: BinaryIO | None = None
+        self._opened_day = ""
+        self._closed = False
+
+        with self._io_lock, self._file_lock:
+            self._load()
+        self._thread = threading.Thread(target=self._flush_loop, name="ledger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # -- escrita ---------------------------------------------------------------
+
+    def append(self, row: Row) -> None:
+        with self._lock:
+            if self._closed:
+                msg = "Ledger fechado"
+                raise RuntimeError(msg)
+            self._pending.append(row)
+            self._appended += 1
+            seq = self._appended
+            if self.config.fsync == "always":
+                self._flushed.notify_all()
+                # Commit em grupo: quem chegar junto sai no mesmo fsync
+                while self._written < seq and not self._closed:
+                    self._flushed.wait()
+
+    def flush(self) -> None:
+        with self._io_lock:
+            self._flush_pending()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flushed.notify_all()
+        with self._io_lock:
+            self._flush_pending()
+            self._close_files()
+        atexit.unregister(self.close)
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                self._flushed.wait(self.config.flush_interval)
+                if not self._pending:
+                    continue
+            self.flush()
+
+    def _flush_pending(self) -> None:
+        """Grava o lote pendente. Quem chama segura `_io_lock`, não `_lock`."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._inflight = batch
+        if not batch:
+            return
+
+        try:
+            with self._file_lock:
+                entries = self._write(batch)
+        except BaseException:
+            with self._lock:
+                self._pending[:0] = batch
+                self._inflight = []
+            raise
+
+        with self._lock:
+            for key, entry in entries:
+                self._index.setdefault(key, []).append(entry)
+            self._inflight = []
+            self._written += len(batch)
+            self._flushed.notify_all()
+
+    def _write(self, batch: Sequence[Row]) -> list[tuple[str, IndexEntry]]:
+        if _disk_state(self.path) != self._disk:
+            # Outro processo gravou ou rotacionou o ledger
+            self._close_files()
+            self._load()
+        if self.config.rotate_daily and self._opened_day != _today():
+            self._rotate()
+
+        data_file, index_file = self._open_active()
+        data_file.seek(0, os.SEEK_END)
+        offset = data_file.tell()
+        segment = len(self._segments) - 1
+        lines, entries = [], []
+
+        for row in batch:
+            line = _csv_line([row.get(field, "") for field in self.fields])
+            entry = (segment, offset, str(row[self.time_field]), str(row[self.status_field]))
+            entries.append((str(row[self.key_field]), entry))
+            lines.append(line)
+            offset += len(line)
+
+        data_file.write(b"".join(lines))
+        data_file.flush()
+        if self.config.fsync != "never":
+            os.fsync(data_file.fileno())
+        # O índice só é escrito depois dos dados e não recebe fsync: na carga,
+        # entradas além do fim dos dados são descartadas e o resto é
+        # reconstruído a partir do CSV
+        index_file.write(b"".join(_index_line(key, entry) for key, entry in entries))
+        index_file.flush()
+        stat = os.fstat(data_file.fileno())
+        self._disk = (stat.st_ino, stat.st_size)
+
+        if offset >= self.config.max_bytes:
+            self._rotate()
+        return entries
+
+    def _close_files(self) -> None:
+        for handle in (self._file, self._index_file):
+            if handle is not None:
+                handle.close()
+        self._file = self._index_file = None
+
+    def _open_active(self) -> tuple[BinaryIO, BinaryIO]:
+        if self._file is None or self._index_file is None:
+            new = not self.path.exists() or self.path.stat().st_size == 0
+            self._file = open(self.path, "ab")  # noqa: SIM115
+            if new:
+                self._file.write(_csv_line(self.fields))
+                self._opened_day = _today()
+            # Arquivo novo começa com índice vazio, mesmo que sobre um antigo
+            self._index_file = open(_index_path(self.path), "wb" if new else "ab")  # noqa: SIM115
+        return self._file, self._index_file
+
+    def _rotate(self) -> None:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+        self._close_files()
+
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+        rotated = self.path.with_name(f"{self.path.stem}-{stamp}{self.path.suffix}")
+        # Renomear é só metadado: feito sob `_lock`, leitores nunca veem o
+        # segmento ativo sumir antes da lista ser atualizada
+        with self._lock:
+            self.path.rename(rotated)
+            index = _index_path(self.path)
+            if index.exists():
+                index.rename(_index_path(rotated))
+
+            # O segmento ativo é sempre o último da lista
+            self._segments[-1] = rotated
+            self._segments.append(self.path)
+        self._opened_day = _today()
+        self._disk = None
+
+    # -- leitura ---------------------------------------------------------------
+
+    def segments(self) -> list[Path]:
+        """Arquivos do ledger, do mais antigo ao ativo."""
+        with self._lock:
+            return [path for path in self._segments if path.exists()]
+
+    def recent(self, key: str, limit: int = 10) -> list[Row]:
+        """Últimas solicitações do cliente, da mais recente para a mais antiga."""
+        if limit <= 0:
+            return []
+        with self._lock:
+            pending = [row for row in self._unwritten() if str(row[self.key_field]) == key]
+            rows = [
+                row
+                for entry in self._index.get(key, [])[-limit:]
+                if (row := self._read(entry)) is not None
+            ]
+        rows += [{field: str(row.get(field, "")) for field in self.fields} for row in pending]
+        # Ordem de escrita invertida desempata timestamps iguais
+        rows.reverse()
+        rows.sort(key=lambda row: row[self.time_field], reverse=True)
+        return rows[:limit]
+
+    def stats(self, key: str, since: str | None = None) -> RequestStats:
+        """Contagem e taxa de aprovação do cliente (opcionalmente a partir de `since`)."""
+        with self._lock:
+            items = [(entry[2], entry[3]) for entry in self._index.get(key, [])]
+            items += [
+                (str(row[self.time_field]), str(row[self.status_field]))
+                for row in self._unwritten()
+                if str(row[self.key_field]) == key
+            ]
+
+        stats = RequestStats()
+        for timestamp, status in items:
+            if since is not None and timestamp < since:
+                continue
+            stats.total += 1
+            stats.aprovados += status == "aprovado"
+            if stats.ultima_solicitacao is None or timestamp > stats.ultima_solicitacao:
+                stats.ultima_solicitacao = timestamp
+        return stats
+
+    def __iter__(self) -> Iterator[Row]:
+        self.flush()
+        for path in self.segments():
+            with open(path, encoding="utf-8", newline="") as f:
+                yield from csv.DictReader(f)
+
+    def _unwritten(self) -> list[Row]:
+        return self._inflight + self._pending
+
+    def _read(self, entry: IndexEntry) -> Row | None:
+        segment, offset, _, _ = entry
+        try:
+            with open(self._segments[segment], "rb") as f:
+                f.seek(offset)
+                values = _parse_line(f.readline())
+        except FileNotFoundError:
+            # Rotacionado por outro processo; recarregado na próxima gravação
+            return None
+        return dict(zip(self.fields, values, strict=False))
+
+    # -- carga -------------------------------------------------------------------
+
+    def _load(self) -> None:
+        """Lê segmentos e índices do disco. Quem chama segura o `FileLock`."""
+        rotated = sorted(self.path.parent.glob(f"{self.path.stem}-*{self.path.suffix}"))
+        segments = [*rotated, self.path]
+        index: dict[str, list[IndexEntry]] = {}
+        for segment, path in enumerate(segments):
+            if path.exists():
+                for key, entry in self._load_segment(segment, path):
+                    index.setdefault(key, []).append(entry)
+        if self.path.exists():
+            mtime = datetime.fromtimestamp(self.path.stat().st_mtime, UTC)
+            self._opened_day = mtime.strftime("%Y-%m-%d")
+        self._disk = _disk_state(self.path)
+        with self._lock:
+            self._segments, self._index = segments, index
+
+    def _load_segment(self, segment: int, path: Path) -> list[tuple[str, IndexEntry]]:
+        """Carrega o índice lateral e completa com o que o arquivo tiver além dele.
+
+        Sem índice (CSV antigo) ou com índice atrasado (queda antes do
+        flush do índice), as linhas restantes são escaneadas e reindexadas.
+        Entradas do índice além do fim dos dados são descartadas. Uma última
+        linha sem quebra de linha só é tratada como escrita interrompida (e
+        cortada) se não for um registro completo; um CSV editado ou exportado
+        sem o "\n" final só ganha a quebra de linha.
+        """
+        index_path = _index_path(path)
+        size = path.stat().st_size
+        entries: list[tuple[str, IndexEntry]] = []
+        rebuild_index = False
+
+        if index_path.exists():
+            with open(index_path, "rb") as f:
+                for line in f:
+                    try:
+                        key, offset, timestamp, status = _parse_line(line)
+                    except ValueError:
+                        rebuild_index = True  # linha parcial no fim do índice
+                        break
+                    if int(offset) >= size:
+                        rebuild_index = True  # índice à frente dos dados
+                        break
+                    entries.append((key, (segment, int(offset), timestamp, status)))
+
+        missing: list[tuple[str, IndexEntry]] = []
+        partial_at: int | None = None
+        repaired = False
+        with open(path, "rb") as f:
+            header = f.readline()
+            columns = _parse_line(header) if header else self.fields
+            offset = f.tell()
+            if entries:
+                f.seek(entries[-1][1][1])
+                last = f.readline()
+                if last.endswith(b"\n"):
+                    offset = f.tell()
+                else:
+                    # A última linha indexada está incompleta: reavalia abaixo
+                    entries.pop()
+                    rebuild_index = True
+                    offset = entries[-1][1][1] if entries else len(header)
+                    f.seek(offset)
+                    if entries:
+                        f.readline()
+                        offset = f.tell()
+            for line in f:
+                if not line.endswith(b"\n"):
+                    if not self._complete_row(line, columns):
+                        partial_at = offset  # escrita interrompida no meio da linha
+                        break
+                    repaired = True
+                row = dict(zip(columns, _parse_line(line), strict=False))
+                entry = (segment, offset, row[self.time_field], row[self.status_field])
+                missing.append((row[self.key_field], entry))
+                offset += len(line)
+
+        if partial_at is not None:
+            os.truncate(path, partial_at)
+        if repaired or missing:
+            with open(path, "ab") as f:
+                if repaired:
+                    f.write(b"\n")
+                f.flush()
+                # Dados no disco antes do índice: o índice nunca aponta além deles
+                os.fsync(f.fileno())
+
+        entries += missing
+        if rebuild_index:
+            with open(index_path, "wb") as f:
+                f.write(b"".join(_index_line(key, entry) for key, entry in entries))
+        elif missing:
+            with open(index_path, "ab") as f:
+                f.write(b"".join(_index_line(key, entry) for key, entry in missing))
+
+        return entries
+
+    @staticmethod
+    def _complete_row(line: bytes, columns: Sequence[str]) -> bool:
+        try:
+            return len(_parse_line(line)) == len(columns)
+        except (ValueError, csv.Error):
+            return False
+
+
+def _index_line(key: str, entry: IndexEntry) -> bytes:
+    _, offset, timestamp, status = entry
+    return _csv_line([key, offset, timestamp, status])
+
+
+def _disk_state(path: Path) -> DiskState:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size)
+
+
+def _index_path(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _today() -> str:
+    return datetime.now(UTC).strftime("%Y-%m-%d")
+
+
+_ledgers: dict[Path, Ledger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(path: Path, fields: Sequence[str]) -> Ledger:
+    """Ledger compartilhado por arquivo (um por processo; entre processos,
+    as gravações se coordenam pelo `FileLock`)."""
+    with _ledgers_lock:
+        ledger = _ledgers.get(path)
+        if ledger is None or ledger._closed:  # noqa: SLF001
+            ledger = _ledgers[path] = Ledger(path, fields)
+        return ledger
+
@@ -0,0 +1,375 @@
+import argparse
+import csv
+import json
+import os
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Any, TypeVar
+
+from score_bands import ScoreBandTable, get_score_band_table
+from storage import LIMIT_REQUEST_FIELDS, Storage, get_storage
+
+# Limite de solicitações de aumento por cliente dentro da janela (0 = sem
+# limite; cada implantação decide se quer ativar)
+LIMIT_REQUESTS_MAX = int(os.getenv("BANK_LIMIT_REQUESTS_MAX", "0"))
+LIMIT_REQUESTS_WINDOW = timedelta(
+    seconds=float(os.getenv("BANK_LIMIT_REQUESTS_WINDOW", "3600"))
+)
+
+# Nome da coluna do limite pedido no arquivo de entrada (o primeiro presente)
+LIMIT_INPUT_FIELDS = ("novo_limite_solicitado", "requested_limit")
+REPORT_FIELDS = [
+    "linha",
+    "cpf",
+    "novo_limite_solicitado",
+    "limite_anterior",
+    "limite_maximo",
+    "status_pedido",
+    "mensagem",
+]
+
+T = TypeVar("T")
+Row = dict[str, Any]
+
+
+def _iso(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def decide_limit_increase(
+    storage: Storage,
+    cpf: str,
+    novo_limite_solicitado: float,
+    *,
+    check_rate_limit: bool = True,
+    bands: ScoreBandTable | None = None,
+) -> Row:
+    """Decide e registra um pedido de aumento de limite.
+
+    Confere o score do cliente na tabela `score_limite` de `storage` (ou em
+    `bands`), grava o pedido no ledger e, se aprovado, atualiza
+    `limite_atual`, tudo na mesma transação. Quem chama precisa segurar
+    `storage.customer_lock(cpf)`.
+    """
+    conta = storage.get_user(cpf)
+
+    if conta is None:
+        return {"success": False, "message": "Conta/CPF não encontrado em accounts.csv"}
+
+    agora = datetime.now(UTC).replace(microsecond=0)
+    if check_rate_limit and LIMIT_REQUESTS_MAX:
+        # Rajadas de pedidos repetidos: consulta só o índice do ledger
+        desde = _iso(agora - LIMIT_REQUESTS_WINDOW)
+        recentes = storage.limit_request_stats(cpf, since=desde)
+        if recentes["total"] >= LIMIT_REQUESTS_MAX:
+            return {
+                "success": False,
+                "status_pedido": "bloqueado",
+                "message": (
+                    f"Você já fez {recentes['total']} solicitações de aumento recentemente. "
+                    "Aguarde um pouco antes de solicitar novamente."
+                ),
+            }
+
+    try:
+        limite_atual = float(conta.get("limite_atual", 0))
+    except Exception:
+        limite_atual = 0.0
+
+    try:
+        score = int(conta.get("score", 0))
+    except Exception:
+        score = 0
+
+    # Determinar limite permitido a partir da tabela de score
+    if not storage.score_bands_available():
+        return {"success": False, "message": "Arquivo score_limite.csv não encontrado"}
+
+    # Busca binária no índice de faixas (compilado e validado no carregamento)
+    max_allowed = (bands or get_score_band_table(storage)).lookup(score)
+
+    if max_allowed is None:
+        return {"success": False, "message": "Nenhuma regra de limite encontrada para o score do cliente"}
+
+    status = "rejeitado"
+    if float(novo_limite_solicitado) <= float(max_allowed):
+        status = "aprovado"
+
+    # Registrar solicitação e, se aprovada, atualizar o limite_atual na mesma transação
+    timestamp = _iso(agora)
+    solicitacao = dict(zip(
+        LIMIT_REQUEST_FIELDS,
+        [cpf, timestamp, f"{limite_atual:.2f}", f"{float(novo_limite_solicitado):.2f}", status],
+    ))
+
+    with storage.transaction():
+        storage.append_limit_request(solicitacao)
+        if status == "aprovado":
+            storage.update_user(cpf, limite_atual=f"{float(novo_limite_solicitado):.2f}")
+
+    return {
+        "success": True,
+        "cpf": cpf,
+        "limite_atual": limite_atual,
+        "novo_limite_solicitado": float(novo_limite_solicitado),
+        "status_pedido": status,
+        "max_allowed_for_score": max_allowed,
+        "message": ("Solicitação aprovada" if status == "aprovado" else "Solicitação rejeitada"),
+    }
+
+
+def request_limit_increase(
+    cpf: str,
+    novo_limite_solicitado: float,
+    storage: Storage | None = None,
+    *,
+    check_rate_limit: bool = True,
+) -> Row:
+    """Um pedido avulso: as mesmas regras da tool, sem passar pelo LLM."""
+    storage = storage or get_storage()
+
+    if not storage.users_available():
+        return {"success": False, "message": "Arquivo users.csv não encontrado"}
+
+    # Consulta, decisão e gravação sem outro pedido do mesmo CPF no meio
+    with storage.customer_lock(cpf):
+        return decide_limit_increase(
+            storage, cpf, novo_limite_solicitado, check_rate_limit=check_rate_limit
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class LimitRequest:
+    """Uma linha do arquivo de entrada; `error` indica linha inválida."""
+
+    line: int
+    cpf: str
+    novo_limite_solicitado: float | None
+    error: str | None = None
+
+
+def _parse(line: int, data: Any) -> LimitRequest:
+    if not isinstance(data, dict):
+        return LimitRequest(line, "", None, "Linha sem os campos cpf e novo_limite_solicitado")
+
+    cpf = str(data.get("cpf") or "").strip()
+    raw = next((data[name] for name in LIMIT_INPUT_FIELDS if data.get(name) not in (None, "")), None)
+    if not cpf:
+        return LimitRequest(line, cpf, None, "CPF ausente")
+    try:
+        value = float(raw)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return LimitRequest(line, cpf, None, f"Limite solicitado inválido: {raw!r}")
+    if not value > 0:
+        return LimitRequest(line, cpf, None, "Limite solicitado deve ser positivo")
+    return LimitRequest(line, cpf, value)
+
+
+def read_requests(path: Path) -> Iterator[LimitRequest]:
+    """Lê os pedidos em streaming de um CSV (com cabeçalho) ou JSONL.
+
+    O formato vem da extensão (`.jsonl`/`.ndjson` ou CSV). Linhas inválidas
+    não interrompem a leitura: seguem adiante com `error` preenchido.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            for line, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    data = json.loads(text)
+                except ValueError as error:
+                    yield LimitRequest(line, "", None, f"JSON inválido: {error}")
+                    continue
+                yield _parse(line, data)
+            return
+
+        reader = csv.DictReader(f)
+        fields = set(reader.fieldnames or [])
+        if "cpf" not in fields or fields.isdisjoint(LIMIT_INPUT_FIELDS):
+            msg = f"Colunas ausentes em {path}: cpf e {' ou '.join(LIMIT_INPUT_FIELDS)}"
+            raise ValueError(msg)
+        for line, data in enumerate(reader, start=2):
+            yield _parse(line, data)
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _report_row(request: LimitRequest, result: Row) -> Row:
+    limite_anterior = result.get("limite_atual")
+    limite_maximo = result.get("max_allowed_for_score")
+    return {
+        "linha": request.line,
+        "cpf": request.cpf,
+        "novo_limite_solicitado": request.novo_limite_solicitado,
+        "limite_anterior": limite_anterior,
+        "limite_maximo": limite_maximo,
+        "status_pedido": result.get("status_pedido") or "erro",
+        "mensagem": result.get("message", ""),
+    }
+
+
+def process_chunks(
+    storage: Storage,
+    chunks: Iterable[list[LimitRequest]],
+    *,
+    check_rate_limit: bool = False,
+) -> Iterator[list[Row]]:
+    """Processa cada lote em uma única transação e devolve as linhas do relatório.
+
+    Os locks dos CPFs do lote são tomados antes da transação, em ordem, como
+    na tool (lock do cliente e depois transação): um lote não trava com uma
+    conversa nem com outro lote. As linhas só saem depois do commit; se o
+    lote falhar, nada dele é gravado (nos dois backends) e todas as linhas
+    voltam como `erro`.
+    """
+    bands = ScoreBandTable(storage)
+    for chunk in chunks:
+        valid = [request for request in chunk if request.error is None]
+        results: dict[int, Row] = {
+            request.line: {"message": request.error} for request in chunk if request.error
+        }
+        try:
+            with ExitStack() as stack:
+                for cpf in sorted({request.cpf for request in valid}):
+                    stack.enter_context(storage.customer_lock(cpf))
+                with storage.transaction():
+                    for request in valid:
+                        results[request.line] = decide_limit_increase(
+                            storage,
+                            request.cpf,
+                            request.novo_limite_solicitado,  # type: ignore[arg-type]
+                            check_rate_limit=check_rate_limit,
+                            bands=bands,
+                        )
+        except Exception as error:  # noqa: BLE001
+            message = f"Falha ao gravar o lote: {error}"
+            for request in valid:
+                results[request.line] = {"message": message}
+
+        yield [_report_row(request, results[request.line]) for request in chunk]
+
+
+@dataclass(slots=True)
+class BulkSummary:
+    rows: int = 0
+    aprovados: int = 0
+    rejeitados: int = 0
+    bloqueados: int = 0
+    erros: int = 0
+    chunks: int = 0
+    elapsed_s: float = 0.0
+
+    def add(self, row: Row) -> None:
+        self.rows += 1
+        status = row["status_pedido"]
+        if status == "aprovado":
+            self.aprovados += 1
+        elif status == "rejeitado":
+            self.rejeitados += 1
+        elif status == "bloqueado":
+            self.bloqueados += 1
+        else:
+            self.erros += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        rate = self.rows / self.elapsed_s if self.elapsed_s else 0.0
+        return asdict(self) | {"rows_per_s": round(rate)}
+
+
+class ReportWriter:
+    """Relatório por linha em CSV ou JSONL (pela extensão), gravado em streaming."""
+
+    def __init__(self, path: Path) -> None:
+        self._file = open(path, "w", encoding="utf-8", newline="")  # noqa: SIM115
+        self._jsonl = path.suffix.lower() in (".jsonl", ".ndjson")
+        self._csv = None
+        if not self._jsonl:
+            self._csv = csv.DictWriter(self._file, fieldnames=REPORT_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, rows: list[Row]) -> None:
+        if self._csv is not None:
+            self._csv.writerows(rows)
+            return
+        self._file.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def bulk_limit_increase(
+    requests: Iterable[LimitRequest],
+    storage: Storage | None = None,
+    *,
+    chunk_size: int = 500,
+    report_path: Path | None = None,
+    check_rate_limit: bool = False,
+) -> BulkSummary:
+    """Aplica uma campanha de aumentos de limite com as regras da tool.
+
+    Os pedidos passam por um pipeline de geradores (leitura → lotes →
+    decisão → relatório), então a memória não cresce com o tamanho do
+    arquivo. Cada lote de `chunk_size` pedidos é gravado em uma transação
+    (no CSV, uma regravação de `users.csv`). O limite de pedidos por janela
+    das conversas fica desligado por padrão: campanhas já vêm pré-aprovadas.
+    """
+    storage = storage or get_storage()
+    if not storage.users_available():
+        msg = "Arquivo users.csv não encontrado"
+        raise FileNotFoundError(msg)
+
+    started = time.perf_counter()
+    summary = BulkSummary()
+    writer = ReportWriter(report_path) if report_path is not None else None
+    try:
+        for rows in process_chunks(
+            storage, chunked(requests, chunk_size), check_rate_limit=check_rate_limit
+        ):
+            summary.chunks += 1
+            for row in rows:
+                summary.add(row)
+            if writer is not None:
+                writer.write(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    summary.elapsed_s = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Aumento de limite em lote")
+    parser.add_argument(
+        "input", type=Path, help="CSV ou JSONL com cpf e novo_limite_solicitado"
+    )
+    parser.add_argument("--report", type=Path, help="relatório por linha (.csv ou .jsonl)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="pedidos por transação")
+    parser.add_argument(
+        "--rate-limit",
+        action="store_true",
+        help="aplica BANK_LIMIT_REQUESTS_MAX por cliente, como nas conversas",
+    )
+    args = parser.parse_args()
+
+    summary = bulk_limit_increase(
+        read_requests(args.input),
+        chunk_size=args.chunk_size,
+        report_path=args.report,
+        check_rate_limit=args.rate_limit,
+    )
+    print(json.dumps(summary.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
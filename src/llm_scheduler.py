@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from enum import IntEnum
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from metrics import record_llm_queue, register_collector
+
+BUSY_MESSAGE = (
+    "Estamos com muitos atendimentos neste momento e não consegui responder a tempo. "
+    "Por favor, envie sua mensagem novamente em instantes."
+)
+
+
+class Priority(IntEnum):
+    """Ordem de atendimento na fila (menor sai primeiro)."""
+
+    FOLLOW_UP = 0  # resposta logo após o resultado de uma tool
+    TURN = 1  # nova mensagem em uma conversa já iniciada
+    NEW_SESSION = 2  # primeira resposta de uma conversa
+
+
+def classify_request(messages: Sequence[BaseMessage]) -> Priority:
+    if messages and isinstance(messages[-1], ToolMessage):
+        return Priority.FOLLOW_UP
+    if any(isinstance(message, AIMessage) for message in messages):
+        return Priority.TURN
+    return Priority.NEW_SESSION
+
+
+class LLMQueueRejected(Exception):
+    """Pedido recusado pela fila do LLM (prazo vencido ou fila cheia)."""
+
+    def __init__(self, reason: str, waited: float) -> None:
+        super().__init__(f"Fila do LLM: {reason} após {waited:.2f}s")
+        self.reason = reason
+        self.waited = waited
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    """Admissão de chamadas ao modelo local.
+
+    - `max_in_flight`: gerações simultâneas no servidor de modelo.
+    - `queue_timeout`: prazo, em segundos, para sair da fila; depois disso o
+      pedido é recusado com uma mensagem amigável.
+    - `max_queue`: pedidos esperando; além disso a recusa é imediata (0 = sem
+      limite).
+    """
+
+    max_in_flight: int = 4
+    queue_timeout: float = 30.0
+    max_queue: int = 256
+
+    @classmethod
+    def from_env(cls) -> "SchedulerConfig":
+        return cls(
+            max_in_flight=max(1, int(os.getenv("BANK_LLM_CONCURRENCY", str(cls.max_in_flight)))),
+            queue_timeout=float(os.getenv("BANK_LLM_QUEUE_TIMEOUT", str(cls.queue_timeout))),
+            max_queue=int(os.getenv("BANK_LLM_MAX_QUEUE", str(cls.max_queue))),
+        )
+
+
+@dataclass(slots=True)
+class SchedulerStats:
+    admitted: int = 0
+    queued: int = 0
+    rejected_timeout: int = 0
+    rejected_full: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self) | {
+            "wait_seconds": round(self.wait_seconds, 4),
+            "max_wait_seconds": round(self.max_wait_seconds, 4),
+            "mean_wait_ms": round(self.wait_seconds * 1000 / self.admitted, 1)
+            if self.admitted
+            else 0.0,
+        }
+
+
+@dataclass(slots=True, eq=False)
+class _Waiter:
+    thread_id: str
+    priority: Priority
+    enqueued: float
+    granted: threading.Event = field(default_factory=threading.Event)
+
+
+class LLMScheduler:
+    """Fila de prioridade com justiça entre conversas na frente do modelo.
+
+    No máximo `max_in_flight` gerações rodam ao mesmo tempo; as demais
+    esperam. Sai primeiro a prioridade mais alta (respostas a resultados de
+    tools, que fecham um turno já começado, antes de conversas novas) e,
+    dentro de cada prioridade, as conversas se revezam: uma `thread_id` com
+    vários pedidos na fila não passa na frente das outras. Quem não sai da
+    fila dentro de `queue_timeout` recebe `LLMQueueRejected`.
+    """
+
+    def __init__(self, config: SchedulerConfig | None = None) -> None:
+        self.config = config or SchedulerConfig.from_env()
+        self.stats = SchedulerStats()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+        # prioridade -> thread_id -> pedidos da conversa, em ordem de chegada;
+        # a ordem das conversas é a vez de cada uma (rodízio)
+        self._queues: dict[Priority, OrderedDict[str, deque[_Waiter]]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+
+    @contextmanager
+    def slot(self, thread_id: str, priority: Priority = Priority.TURN) -> Iterator[float]:
+        """Segura uma vaga de geração; devolve o tempo de espera na fila."""
+        waited = self._acquire(thread_id, priority)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    def _acquire(self, thread_id: str, priority: Priority) -> float:
+        started = time.monotonic()
+        with self._lock:
+            if self._in_flight < self.config.max_in_flight and not self._waiting:
+                self._in_flight += 1
+                self._admitted(0.0)
+                record_llm_queue(0.0, priority.name.lower(), "admitted")
+                return 0.0
+            if self.config.max_queue and self._waiting >= self.config.max_queue:
+                self.stats.rejected_full += 1
+                record_llm_queue(0.0, priority.name.lower(), "rejected")
+                raise LLMQueueRejected("fila cheia", 0.0)
+
+            waiter = _Waiter(thread_id, priority, started)
+            self._queues[priority].setdefault(thread_id, deque()).append(waiter)
+            self._waiting += 1
+            self.stats.queued += 1
+
+        granted = waiter.granted.wait(self.config.queue_timeout)
+        waited = time.monotonic() - started
+        with self._lock:
+            if not granted and not waiter.granted.is_set():
+                self._remove(waiter)
+                self.stats.rejected_timeout += 1
+                record_llm_queue(waited, priority.name.lower(), "rejected")
+                raise LLMQueueRejected("prazo vencido", waited)
+            self._admitted(waited)
+        record_llm_queue(waited, priority.name.lower(), "admitted")
+        return waited
+
+    def _release(self) -> None:
+        with self._lock:
+            waiter = self._next()
+            if waiter is None:
+                self._in_flight -= 1
+                return
+            # A vaga passa direto para o próximo, sem voltar a ficar livre
+            waiter.granted.set()
+
+    def _next(self) -> _Waiter | None:
+        for priority in Priority:
+            queue = self._queues[priority]
+            if not queue:
+                continue
+            thread_id, waiters = next(iter(queue.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                queue.move_to_end(thread_id)
+            else:
+                del queue[thread_id]
+            self._waiting -= 1
+            return waiter
+        return None
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues[waiter.priority]
+        waiters = queue.get(waiter.thread_id)
+        if waiters is None:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del queue[waiter.thread_id]
+        self._waiting -= 1
+
+    def _admitted(self, waited: float) -> None:
+        self.stats.admitted += 1
+        self.stats.wait_seconds += waited
+        self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            depth = {
+                f"queue_depth_{priority.name.lower()}": sum(map(len, queue.values()))
+                for priority, queue in self._queues.items()
+            }
+            return (
+                {"in_flight": self._in_flight, "queue_depth": self._waiting}
+                | depth
+                | self.stats.as_dict()
+            )
+
+
+_scheduler: LLMScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Fila compartilhada, configurável por `BANK_LLM_CONCURRENCY`,
+    `BANK_LLM_QUEUE_TIMEOUT` e `BANK_LLM_MAX_QUEUE`."""
+    global _scheduler  # noqa: PLW0603
+
+    if _scheduler is not None:
+        return _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
+
+
+register_collector("llm_scheduler", lambda: _scheduler.snapshot() if _scheduler else {})
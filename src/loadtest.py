@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+DB_PATH = Path(__file__).parents[1] / "db"
+
+# Conversas roteirizadas, compreendidas pelo FakeChatModel
+SCRIPTS: list[list[str]] = [
+    ["Olá", "CPF 12345678901 nascimento 1990-05-15", "Qual a cotação do USD?", "sair"],
+    ["Oi", "98765432101 1985-08-22", "quero aumentar meu limite para 10000", "tchau"],
+    ["Bom dia", "11122233344 1992-03-10", "cotação de USD, EUR e GBP", "encerrar"],
+]
+
+
+class _FxStubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        pairs = self.path.rstrip("/").rsplit("/", 1)[-1].split(",")
+        body = json.dumps(
+            {
+                pair.replace("-", ""): {
+                    "code": pair.split("-")[0],
+                    "codein": pair.split("-")[-1],
+                    "bid": "5.4321",
+                }
+                for pair in pairs
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_fx_stub() -> ThreadingHTTPServer:
+    """Sobe um stub local da AwesomeAPI e retorna o servidor já rodando."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FxStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@dataclass
+class LoadReport:
+    sessions: int = 0
+    turns: int = 0
+    errors: int = 0
+    duration_s: float = 0.0
+    latencies_ms: list[float] = field(default_factory=list)
+    ttft_ms: list[float] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        def pct(values: list[float], q: float) -> float | None:
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+        data = asdict(self)
+        del data["latencies_ms"], data["ttft_ms"]
+        return data | {
+            "turns_per_s": round(self.turns / self.duration_s, 1) if self.duration_s else 0,
+            "latency_p50_ms": pct(self.latencies_ms, 0.50),
+            "latency_p95_ms": pct(self.latencies_ms, 0.95),
+            "latency_p99_ms": pct(self.latencies_ms, 0.99),
+            "latency_mean_ms": round(statistics.fmean(self.latencies_ms), 1)
+            if self.latencies_ms
+            else None,
+            "ttft_p50_ms": pct(self.ttft_ms, 0.50),
+            "ttft_p95_ms": pct(self.ttft_ms, 0.95),
+        }
+
+
+async def chat(host: str, port: int, session: str | None, message: str) -> list[dict[str, Any]]:
+    """Envia uma mensagem para `POST /chat` e lê todos os eventos NDJSON."""
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps({"session": session, "message": message}).encode()
+    writer.write(
+        f"POST /chat HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+
+    status_line = await reader.readline()
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+
+    events = []
+    if b" 200 " not in status_line:
+        events.append({"type": "error", "message": status_line.decode().strip()})
+    else:
+        async for line in reader:
+            if line.strip():
+                events.append(json.loads(line))
+
+    writer.close()
+    await writer.wait_closed()
+    return events
+
+
+async def run_conversation(host: str, port: int, script: list[str], report: LoadReport) -> None:
+    session = None
+    for message in script:
+        events = await chat(host, port, session, message)
+        for event in events:
+            if event["type"] == "session":
+                session = event["session"]
+            elif event["type"] == "done":
+                report.turns += 1
+                report.latencies_ms.append(event["latency_ms"])
+                if event.get("ttft_ms") is not None:
+                    report.ttft_ms.append(event["ttft_ms"])
+            elif event["type"] == "error":
+                report.errors += 1
+    report.sessions += 1
+
+
+async def run_load(host: str, port: int, sessions: int, concurrency: int) -> LoadReport:
+    report = LoadReport()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with slots:
+            await run_conversation(host, port, SCRIPTS[i % len(SCRIPTS)], report)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+    report.duration_s = round(time.perf_counter() - started, 3)
+    return report
+
+
+async def run_embedded(sessions: int, concurrency: int, token_delay: float) -> LoadReport:
+    """Sobe servidor, FakeChatModel, stub de câmbio e cópia do `db/` no
+    próprio processo, para medir sem Ollama nem rede."""
+    workdir = Path(tempfile.mkdtemp(prefix="bank_loadtest_"))
+    shutil.copytree(DB_PATH, workdir / "db")
+    fx_stub = start_fx_stub()
+
+    os.environ["BANK_LLM_PROVIDER"] = "fake"
+    os.environ["BANK_FAKE_TOKEN_DELAY"] = str(token_delay)
+    os.environ["BANK_DB_PATH"] = str(workdir / "db")
+    os.environ["BANK_FX_URL"] = f"http://127.0.0.1:{fx_stub.server_port}/json/last"
+
+    from server import ChatServer  # noqa: PLC0415
+
+    server = ChatServer(max_sessions=concurrency * 2, max_active_turns=concurrency)
+    listener = await server.start("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+
+    try:
+        async with listener:
+            return await run_load("127.0.0.1", port, sessions, concurrency)
+    finally:
+        fx_stub.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de chat")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--embedded",
+        action="store_true",
+        help="sobe o servidor no próprio processo com o FakeChatModel",
+    )
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    if args.embedded:
+        report = asyncio.run(run_embedded(args.sessions, args.concurrency, args.token_delay))
+    else:
+        report = asyncio.run(run_load(args.host, args.port, args.sessions, args.concurrency))
+
+    print(json.dumps(report.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,121 @@
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
-from langgraph.graph.state import RunnableConfig
-from rich import print
+import time
+from typing import TYPE_CHECKING
+
+from rich import get_console, print
+from rich.console import Group, RenderableType
 from rich.markdown import Markdown
 from rich.prompt import Prompt
-from graph import build_graph
+from rich.text import Text
+from intents import FAST_PATH_STATS
+from metrics import LLMTimings, span
 from prompts import SYSTEM_PROMPT
+from startup import Warmup
+
+# LangChain/LangGraph (a maior parte da inicialização) só são importados
+# pelo aquecimento em segundo plano, enquanto o prompt já está na tela
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+    from langgraph.graph.state import CompiledStateGraph, RunnableConfig
+
+
+def stream_turn(
+    graph: "CompiledStateGraph", messages: "list[BaseMessage]", config: "RunnableConfig"
+) -> tuple[float | None, float, LLMTimings | None]:
+    """Renderiza a resposta conforme os tokens chegam e mostra as tools em execução.
+
+    Retorna (tempo até o primeiro token, duração total do turno) em segundos e
+    as fases das chamadas ao modelo somadas, quando o backend as informa.
+    """
+    from langchain_core.messages import AIMessage, AIMessageChunk  # noqa: PLC0415
+    from rich.live import Live  # noqa: PLC0415
+    from rich.spinner import Spinner  # noqa: PLC0415
+
+    started = time.perf_counter()
+    first_token: float | None = None
+    answer = ""
+    timings: LLMTimings | None = None
+    tools_status: dict[str, RenderableType] = {}
+
+    def render() -> Group:
+        return Group(Markdown(answer), *tools_status.values())
+
+    with (
+        span("chat.turn", thread_id=str(config["configurable"]["thread_id"])),
+        Live(render(), refresh_per_second=12, vertical_overflow="visible") as live,
+    ):
+        for mode, chunk in graph.stream(
+            {"messages": messages}, config=config, stream_mode=["messages", "updates"]
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                if (
+                    metadata.get("langgraph_node") == "call_llm"
+                    and isinstance(message, AIMessageChunk)
+                    and message.text
+                ):
+                    first_token = first_token or time.perf_counter()
+                    answer += message.text
+                    live.update(render())
+                continue
+
+            for message in (chunk.get("fast_path_reply") or {}).get("messages", []):
+                first_token = first_token or time.perf_counter()
+                answer += message.text
+                live.update(render())
+
+            llm_messages = [
+                *(chunk.get("fast_path") or {}).get("messages", []),
+                *(chunk.get("call_llm") or {}).get("messages", []),
+            ]
+            for message in llm_messages:
+                if (step := LLMTimings.from_message(message)) is not None:
+                    timings = step if timings is None else timings + step
+                meta = message.response_metadata if isinstance(message, AIMessage) else {}
+                if meta.get("cache") or meta.get("scheduler"):
+                    # Resposta do cache ou recusa da fila: não passou pelo streaming do modelo
+                    first_token = first_token or time.perf_counter()
+                    answer += message.text
+                    live.update(render())
+                if isinstance(message, AIMessage) and message.tool_calls:
+                    if answer:
+                        answer += "\n\n"
+                    for call in message.tool_calls:
+                        tools_status[call["id"]] = Spinner(
+                            "dots", text=Text(f" Executando {call['name']}...", style="yellow")
+                        )
+                    live.update(render())
+
+            for message in (chunk.get("tool_node") or {}).get("messages", []):
+                ok = message.status != "error"
+                tools_status[message.tool_call_id] = Text(
+                    f"{'✔' if ok else '✘'} {message.name}", style="green" if ok else "red"
+                )
+                live.update(render())
+
+    ttft = first_token - started if first_token is not None else None
+    return ttft, time.perf_counter() - started, timings
+
+
+def wait_for_graph(warmup: Warmup) -> "CompiledStateGraph":
+    """Grafo do aquecimento, com aviso se o cliente ainda precisar esperar."""
+    if warmup.ready:
+        graph = warmup.graph()
+    else:
+        started = time.perf_counter()
+        with get_console().status("Carregando o assistente..."):
+            graph = warmup.graph()
+        print(f"[dim]⏱ assistente pronto após {time.perf_counter() - started:.2f}s de espera")
+
+    if warmup.llm_error is not None:
+        print(f"[yellow]Não foi possível pré-carregar o modelo: {warmup.llm_error}")
+        warmup.llm_error = None
+    return graph
 
 
 def main() -> None:
-    graph = build_graph()
-    config = RunnableConfig(configurable={"thread_id": 1})
+    # Compila o grafo e carrega o modelo enquanto o cliente digita
+    warmup = Warmup().start()
+    config: RunnableConfig = {"configurable": {"thread_id": 1}}
     all_messages: list[BaseMessage] = []
 
     prompt = Prompt()
@@ -22,21 +128,37 @@ def main() -> None:
         if user_input.lower() in ["q", "quit"]:
             break
 
+        graph = wait_for_graph(warmup)
+        from langchain_core.messages import HumanMessage, SystemMessage  # noqa: PLC0415
+
         human_message = HumanMessage(user_input)
         current_loop_messages = [human_message]
 
         if len(all_messages) == 0:
             current_loop_messages = [SystemMessage(SYSTEM_PROMPT), human_message]
 
-        result = graph.invoke({"messages": current_loop_messages}, config=config)
-
         print("[bold cyan]RESPOSTA: \n")
-        print(Markdown(result["messages"][-1].content))
+        ttft, total, timings = stream_turn(graph, current_loop_messages, config)
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "-"
+        phases = ""
+        if timings is not None:
+            phases = (
+                f" · prompt: {timings.prompt_tokens} tok em {timings.prompt_eval:.2f}s"
+                f" · geração: {timings.eval_tokens} tok em {timings.eval:.2f}s"
+            )
+        print(f"[dim]⏱ primeiro token: {ttft_text} · turno completo: {total:.2f}s{phases}")
         print(Markdown("\n\n  ---  \n\n"))
 
-        all_messages = result["messages"]
+        all_messages = graph.get_state(config).values["messages"]
 
     print(all_messages)
+    from shaping import conversation_savings  # noqa: PLC0415
+
+    print(f"Tokens economizados com resultados compactos: {conversation_savings(all_messages)}")
+    print(
+        f"Turnos respondidos sem o LLM: {FAST_PATH_STATS.served}/{FAST_PATH_STATS.turns} "
+        f"({FAST_PATH_STATS.served_ratio:.0%})"
+    )
     # print(graph.get_graph().draw_mermaid())\
 
 
@@ -0,0 +1,368 @@
+import atexit
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TypeVar
+
+# Desligado por padrão: os wrappers viram a própria função e `span` vira
+# um nullcontext, sem custo por chamada
+METRICS_ENABLED = os.getenv("BANK_METRICS", "0") == "1"
+TRACE_FILE = os.getenv("BANK_TRACE_FILE")
+TRACE_BUFFER = int(os.getenv("BANK_TRACE_BUFFER", "10000"))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SERVICE_NAME = "bank_agent"
+
+F = TypeVar("F", bound=Callable[..., Any])
+Labels = tuple[tuple[str, str], ...]
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self._values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(labels)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # labels -> (contagem por bucket, soma, total)
+        self._values: dict[Labels, tuple[list[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            if i < len(counts):
+                counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def totals(self) -> dict[Labels, tuple[int, float]]:
+        """(contagem, soma) por conjunto de labels."""
+        with self._lock:
+            return {labels: (count, total) for labels, (_, total, count) in self._values.items()}
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = [(k, (list(c), s, n)) for k, (c, s, n) in self._values.items()]
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts, strict=True):
+                cumulative += bucket
+                le = (*labels, ("le", _number(bound)))
+                yield f"{self.name}_bucket{_labels(le)} {cumulative}"
+            yield f"{self.name}_bucket{_labels((*labels, ('le', '+Inf')))} {count}"
+            yield f"{self.name}_sum{_labels(labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(labels)} {count}"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+NODE_SECONDS = Histogram("bank_node_duration_seconds", "Duração de cada nó do grafo")
+TOOL_SECONDS = Histogram("bank_tool_duration_seconds", "Duração de cada tool")
+TOOL_CALLS = Counter("bank_tool_calls_total", "Chamadas de tool por status")
+LLM_CALLS = Counter("bank_llm_calls_total", "Chamadas ao LLM")
+LLM_TOKENS = Counter("bank_llm_tokens_total", "Tokens por direção (input/output)")
+SPAN_SECONDS = Histogram("bank_span_duration_seconds", "Duração de trechos instrumentados")
+LLM_PHASE_SECONDS = Histogram(
+    "bank_llm_phase_seconds", "Tempo do modelo por fase (load, prompt_eval, eval)"
+)
+LLM_QUEUE_SECONDS = Histogram(
+    "bank_llm_queue_wait_seconds", "Espera na fila do LLM por prioridade e resultado"
+)
+
+METRICS: list[Counter | Histogram] = [
+    NODE_SECONDS,
+    TOOL_SECONDS,
+    TOOL_CALLS,
+    LLM_CALLS,
+    LLM_TOKENS,
+    SPAN_SECONDS,
+    LLM_PHASE_SECONDS,
+    LLM_QUEUE_SECONDS,
+]
+
+# Estatísticas já mantidas pelos módulos (caches, contexto, ...), lidas
+# apenas na exportação: nome -> função que devolve um dict de números
+_collectors: dict[str, Callable[[], Mapping[str, Any]]] = {}
+
+
+def register_collector(name: str, collect: Callable[[], Mapping[str, Any]]) -> None:
+    _collectors[name] = collect
+
+
+# -- traces ----------------------------------------------------------------------
+
+_spans: deque[dict[str, Any]] = deque(maxlen=TRACE_BUFFER)
+_current: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar(
+    "bank_span", default=None
+)
+
+
+@contextmanager
+def _span(name: str, attributes: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    parent = _current.get()
+    trace_id = parent[0] if parent else secrets.token_hex(16)
+    span_id = secrets.token_hex(8)
+    token = _current.set((trace_id, span_id))
+    record: dict[str, Any] = {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "parentSpanId": parent[1] if parent else "",
+        "name": name,
+        "attributes": dict(attributes),
+        "status": "ok",
+    }
+    started_ns = time.time_ns()
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record["status"] = "error"
+        raise
+    finally:
+        _current.reset(token)
+        record["duration"] = time.perf_counter() - started
+        record["startTimeUnixNano"] = started_ns
+        record["endTimeUnixNano"] = started_ns + int(record["duration"] * 1e9)
+        _spans.append(record)
+
+
+def span(name: str, **attributes: Any) -> Any:
+    """Trecho instrumentado (`with span("fx.upstream", pairs=3): ...`)."""
+    if not METRICS_ENABLED:
+        return nullcontext({})
+    return _timed_span(name, attributes)
+
+
+@contextmanager
+def _timed_span(name: str, attributes: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    with _span(name, attributes) as record:
+        yield record
+    SPAN_SECONDS.observe(record["duration"], span=name)
+
+
+def instrument_node(name: str, node: F) -> F:
+    """Envolve um nó do grafo com histograma de latência e span."""
+    if not METRICS_ENABLED:
+        return node
+
+    @functools.wraps(node)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            with _span(f"node.{name}", {"langgraph.node": name}):
+                return node(*args, **kwargs)
+        finally:
+            NODE_SECONDS.observe(time.perf_counter() - started, node=name)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def tool_span(name: str) -> Any:
+    """Mede uma tool; quem chama marca `record["status"] = "error"` na falha."""
+    if not METRICS_ENABLED:
+        return nullcontext({})
+    return _tool_span(name)
+
+
+@contextmanager
+def _tool_span(name: str) -> Iterator[dict[str, Any]]:
+    started = time.perf_counter()
+    with _span(f"tool.{name}", {"tool.name": name}) as record:
+        try:
+            yield record
+        finally:
+            status = "error" if record["status"] == "error" else "success"
+            TOOL_SECONDS.observe(time.perf_counter() - started, tool=name)
+            TOOL_CALLS.inc(tool=name, status=status)
+
+
+def record_tool_timeout(name: str) -> None:
+    if METRICS_ENABLED:
+        TOOL_CALLS.inc(tool=name, status="timeout")
+
+
+@dataclass(slots=True)
+class LLMTimings:
+    """Fases de uma geração, como o Ollama devolve em `response_metadata`.
+
+    `prompt_eval` é o processamento do prompt (só dos tokens que não
+    estavam no cache KV) e `eval` é a geração da resposta; tempos em
+    segundos.
+    """
+
+    load: float = 0.0
+    prompt_eval: float = 0.0
+    prompt_tokens: int = 0
+    eval: float = 0.0
+    eval_tokens: int = 0
+
+    @classmethod
+    def from_message(cls, message: Any) -> "LLMTimings | None":
+        meta = getattr(message, "response_metadata", None) or {}
+        if "prompt_eval_duration" not in meta and "eval_duration" not in meta:
+            return None
+        return cls(
+            load=(meta.get("load_duration") or 0) / 1e9,
+            prompt_eval=(meta.get("prompt_eval_duration") or 0) / 1e9,
+            prompt_tokens=meta.get("prompt_eval_count") or 0,
+            eval=(meta.get("eval_duration") or 0) / 1e9,
+            eval_tokens=meta.get("eval_count") or 0,
+        )
+
+    def __add__(self, other: "LLMTimings") -> "LLMTimings":
+        return LLMTimings(
+            self.load + other.load,
+            self.prompt_eval + other.prompt_eval,
+            self.prompt_tokens + other.prompt_tokens,
+            self.eval + other.eval,
+            self.eval_tokens + other.eval_tokens,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "load_ms": round(self.load * 1000, 1),
+            "prompt_eval_ms": round(self.prompt_eval * 1000, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "eval_ms": round(self.eval * 1000, 1),
+            "eval_tokens": self.eval_tokens,
+        }
+
+
+def record_llm_usage(message: Any) -> None:
+    """Tokens de entrada/saída (`usage_metadata`) e tempo de cada fase."""
+    if not METRICS_ENABLED:
+        return
+    LLM_CALLS.inc()
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("input_tokens"):
+        LLM_TOKENS.inc(usage["input_tokens"], direction="input")
+    if usage.get("output_tokens"):
+        LLM_TOKENS.inc(usage["output_tokens"], direction="output")
+    timings = LLMTimings.from_message(message)
+    if timings is not None:
+        LLM_PHASE_SECONDS.observe(timings.load, phase="load")
+        LLM_PHASE_SECONDS.observe(timings.prompt_eval, phase="prompt_eval")
+        LLM_PHASE_SECONDS.observe(timings.eval, phase="eval")
+
+
+def record_llm_queue(wait: float, priority: str, outcome: str) -> None:
+    if METRICS_ENABLED:
+        LLM_QUEUE_SECONDS.observe(wait, priority=priority, outcome=outcome)
+
+
+# -- exportação -------------------------------------------------------------------
+
+
+def prometheus_text(extra: Mapping[str, Mapping[str, Any]] | None = None) -> str:
+    """Todas as métricas no formato de texto do Prometheus."""
+    lines: list[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    groups = {name: collect() for name, collect in _collectors.items()} | dict(extra or {})
+    for group, values in groups.items():
+        for key, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, int | float):
+                continue
+            name = f"bank_{group}_{key}".replace(".", "_").replace("-", "_")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _otel_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def export_traces() -> dict[str, Any]:
+    """Spans guardados no formato JSON do OTLP (importável por coletores OTel)."""
+    spans = [
+        {
+            "traceId": record["traceId"],
+            "spanId": record["spanId"],
+            "parentSpanId": record["parentSpanId"],
+            "name": record["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(record["startTimeUnixNano"]),
+            "endTimeUnixNano": str(record["endTimeUnixNano"]),
+            "attributes": [
+                {"key": key, "value": _otel_value(value)}
+                for key, value in record["attributes"].items()
+            ],
+            "status": {"code": 2 if record["status"] == "error" else 1},
+        }
+        for record in list(_spans)
+    ]
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+            }
+        ]
+    }
+
+
+def dump_traces(path: Path) -> None:
+    path.write_text(json.dumps(export_traces(), ensure_ascii=False), encoding="utf-8")
+
+
+if METRICS_ENABLED and TRACE_FILE:
+    atexit.register(dump_traces, Path(TRACE_FILE))
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import threading
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from metrics import LLMTimings, register_collector
+from prompts import SYSTEM_PROMPT
+
+
+def _sha256(data: str) -> str:
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def canonical_tool_schemas(tools: Sequence[BaseTool]) -> tuple[dict[str, Any], ...]:
+    return tuple(convert_to_openai_tool(tool) for tool in tools)
+
+
+def _schemas_hash(schemas: Sequence[dict[str, Any]]) -> str:
+    return _sha256(json.dumps(schemas, sort_keys=True, ensure_ascii=False))
+
+
+def tools_hash(tools: Sequence[BaseTool]) -> str:
+    return _schemas_hash(canonical_tool_schemas(tools))
+
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    """Início fixo de toda chamada ao modelo: system prompt + schema das tools.
+
+    O Ollama reaproveita o cache KV de um prompt anterior enquanto os bytes
+    forem idênticos, então o prefixo é montado uma única vez e a mesma
+    `SystemMessage` é enviada em todos os passos de todas as sessões. A
+    versão (hash do texto e dos schemas) vai para o `/health` e muda a cada
+    edição do prompt ou das tools.
+    """
+
+    system_prompt: str
+    tool_schemas: tuple[dict[str, Any], ...]
+    prompt_hash: str
+    tools_hash: str
+    message: SystemMessage = field(compare=False, repr=False)
+
+    @property
+    def version(self) -> str:
+        return f"{self.prompt_hash[:8]}.{self.tools_hash[:8]}"
+
+    def pin(self, messages: Sequence[BaseMessage]) -> list[BaseMessage]:
+        """Histórico da thread com o prefixo atual na primeira posição.
+
+        Threads criadas com outra versão do system prompt (checkpoint
+        antigo) ou sem ele passam a usar a atual, em vez de quebrar o
+        cache KV.
+        """
+        first = messages[0] if messages else None
+        if first is not self.message and (
+            not isinstance(first, SystemMessage) or first.text != self.system_prompt
+        ):
+            with _stats_lock:
+                PREFIX_STATS.replaced += 1
+        if isinstance(first, SystemMessage):
+            return [self.message, *messages[1:]]
+        return [self.message, *messages]
+
+
+def build_prefix(tools: Sequence[BaseTool], system_prompt: str = SYSTEM_PROMPT) -> PromptPrefix:
+    schemas = canonical_tool_schemas(tools)
+    return PromptPrefix(
+        system_prompt=system_prompt,
+        tool_schemas=schemas,
+        prompt_hash=_sha256(system_prompt),
+        tools_hash=_schemas_hash(schemas),
+        message=SystemMessage(system_prompt),
+    )
+
+
+@dataclass(slots=True)
+class PrefixStats:
+    """Tempo de processamento do prompt x tempo de geração, no agregado.
+
+    Com o prefixo em cache, `prompt_tokens` por chamada cai para só o que
+    mudou desde a chamada anterior da mesma sessão.
+    """
+
+    calls: int = 0
+    replaced: int = 0
+    load_seconds: float = 0.0
+    prompt_eval_seconds: float = 0.0
+    prompt_tokens: int = 0
+    eval_seconds: float = 0.0
+    eval_tokens: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        calls = self.calls or 1
+        return asdict(self) | {
+            "load_seconds": round(self.load_seconds, 4),
+            "prompt_eval_seconds": round(self.prompt_eval_seconds, 4),
+            "eval_seconds": round(self.eval_seconds, 4),
+            "prompt_tokens_per_call": round(self.prompt_tokens / calls, 1),
+            "prompt_eval_ms_per_call": round(self.prompt_eval_seconds * 1000 / calls, 1),
+            "eval_ms_per_call": round(self.eval_seconds * 1000 / calls, 1),
+        }
+
+
+PREFIX_STATS = PrefixStats()
+_stats_lock = threading.Lock()
+
+
+def record_timings(message: Any) -> LLMTimings | None:
+    """Soma as fases da geração (quando o backend as informa) nas estatísticas."""
+    timings = LLMTimings.from_message(message)
+    if timings is None:
+        return None
+    with _stats_lock:
+        PREFIX_STATS.calls += 1
+        PREFIX_STATS.load_seconds += timings.load
+        PREFIX_STATS.prompt_eval_seconds += timings.prompt_eval
+        PREFIX_STATS.prompt_tokens += timings.prompt_tokens
+        PREFIX_STATS.eval_seconds += timings.eval
+        PREFIX_STATS.eval_tokens += timings.eval_tokens
+    return timings
+
+
+_prefix: PromptPrefix | None = None
+_prefix_lock = threading.Lock()
+
+
+def get_prompt_prefix(tools: Sequence[BaseTool]) -> PromptPrefix:
+    """Prefixo compartilhado, serializado na primeira chamada."""
+    global _prefix  # noqa: PLW0603
+
+    if _prefix is not None:
+        return _prefix
+    with _prefix_lock:
+        if _prefix is None:
+            _prefix = build_prefix(tools)
+        return _prefix
+
+
+register_collector("prompt_prefix", PREFIX_STATS.as_dict)
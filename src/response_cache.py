@@ -0,0 +1,279 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.tools import BaseTool
+
+from metrics import register_collector
+from prompt_prefix import tools_hash
+
+CPF_RE = re.compile(r"\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b")
+DATE_RE = re.compile(r"\b(?:\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4})\b")
+NAME_SLOT = "\x00nome\x00"
+
+Embedder = Callable[[str], Sequence[float]]
+
+
+@dataclass(slots=True)
+class ResponseCacheStats:
+    hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    skipped: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return (self.hits + self.semantic_hits) / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self) | {"hit_rate": round(self.hit_rate, 4)}
+
+
+@dataclass(slots=True)
+class CacheKey:
+    """Chave de um passo do LLM.
+
+    `exact` cobre todo o histórico normalizado; `context` cobre tudo menos a
+    última mensagem do cliente e delimita a busca por similaridade.
+    """
+
+    exact: str
+    context: str
+    query: str
+    vector: list[float] | None = field(default=None, repr=False)
+
+
+def redact(text: str, user: dict[str, str] | None = None) -> str:
+    """Remove dados pessoais (CPF, datas e o nome do cliente autenticado)."""
+    if user and user.get("nome"):
+        text = re.sub(re.escape(user["nome"]), NAME_SLOT, text, flags=re.IGNORECASE)
+    text = CPF_RE.sub("<cpf>", text)
+    return DATE_RE.sub("<data>", text)
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split()).strip(" .!?")
+
+
+def tools_fingerprint(tools: Sequence[BaseTool]) -> str:
+    return tools_hash(tools)[:16]
+
+
+def _digest(parts: Sequence[Any]) -> str:
+    encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b, strict=False))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCache:
+    """Cache LRU de respostas finais do LLM (sem tool calls).
+
+    A chave é o hash de (versão do system prompt, schema das tools e todo o
+    histórico enviado ao modelo, normalizado), sempre com CPF, datas e o nome do
+    cliente removidos. O nome volta a ser preenchido na resposta servida,
+    então "Olá, João!" pode ser reaproveitado como "Olá, Maria!". Respostas
+    com CPF ou datas nunca são guardadas.
+
+    Com um `embedder`, mensagens parecidas (acima de `similarity`) no mesmo
+    contexto também são atendidas pelo cache.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        max_entries: int = 512,
+        embedder: Embedder | None = None,
+        similarity: float = 0.93,
+    ) -> None:
+        self.tools_hash = tools_fingerprint(tools)
+        self.max_entries = max_entries
+        self.embedder = embedder
+        self.similarity = similarity
+        self.stats = ResponseCacheStats()
+        self._entries: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._by_context: dict[str, dict[str, list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def key_for(
+        self, prompt: Sequence[BaseMessage], user: dict[str, str] | None = None
+    ) -> CacheKey | None:
+        """Chave do passo, ou None se ele não deve usar o cache.
+
+        Só passos que respondem direto a uma mensagem do cliente são
+        cacheáveis; as respostas a resultados de tools dependem de dados
+        do momento (cotação, limite, score). A chave cobre o prompt inteiro
+        que vai para o modelo: um resultado de tool antigo (score, decisão de
+        limite) continua diferenciando as conversas.
+        """
+        if not prompt or not isinstance(prompt[-1], HumanMessage):
+            return None
+
+        system: list[str] = []
+        history: list[list[str]] = []
+        for message in prompt:
+            if message.type == "system" and not history:
+                # Versão do prompt: hash do texto fixo, não o texto em si
+                system.append(_digest([normalize(redact(message.text, user))])[:16])
+                continue
+            item = [message.type, normalize(redact(message.text, user))]
+            if isinstance(message, AIMessage) and message.tool_calls:
+                item += [
+                    redact(json.dumps([c["name"], c["args"]], sort_keys=True), user)
+                    for c in message.tool_calls
+                ]
+            elif isinstance(message, ToolMessage):
+                item.append(message.name or "")
+            history.append(item)
+
+        context = _digest([system, self.tools_hash, history[:-1]])
+        query = history[-1][1]
+        return CacheKey(exact=_digest([context, query]), context=context, query=query)
+
+    def get(self, key: CacheKey, user: dict[str, str] | None = None) -> AIMessage | None:
+        kind = "exact"
+        with self._lock:
+            entry = self._entries.get(key.exact)
+            if entry is not None:
+                self._entries.move_to_end(key.exact)
+            has_neighbours = key.context in self._by_context
+
+        if entry is None and has_neighbours:
+            # O embedding é calculado fora do lock e reaproveitado no put
+            vector = self._vector(key)
+            with self._lock:
+                exact = self._nearest(key.context, vector)
+                entry = self._entries.get(exact) if exact else None
+                if entry is not None:
+                    self._entries.move_to_end(exact)  # type: ignore[arg-type]
+            kind = "semantic"
+
+        with self._lock:
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            if kind == "exact":
+                self.stats.hits += 1
+            else:
+                self.stats.semantic_hits += 1
+
+        _, content = entry
+        content = content.replace(NAME_SLOT, (user or {}).get("nome", ""))
+        return AIMessage(content, response_metadata={"cache": kind})
+
+    def put(
+        self, key: CacheKey, message: BaseMessage, user: dict[str, str] | None = None
+    ) -> bool:
+        if not isinstance(message, AIMessage) or message.tool_calls or not message.text:
+            return False
+
+        content = redact(message.text, user)
+        if "<cpf>" in content or "<data>" in content:
+            with self._lock:
+                self.stats.skipped += 1
+            return False
+
+        vector = self._vector(key)
+        with self._lock:
+            self._entries[key.exact] = (key.context, content)
+            self._entries.move_to_end(key.exact)
+            if vector is not None:
+                self._by_context.setdefault(key.context, {})[key.exact] = vector
+            self.stats.stores += 1
+
+            while len(self._entries) > self.max_entries:
+                exact, (context, _) = self._entries.popitem(last=False)
+                vectors = self._by_context.get(context)
+                if vectors is not None:
+                    vectors.pop(exact, None)
+                    if not vectors:
+                        del self._by_context[context]
+                self.stats.evictions += 1
+        return True
+
+    def _vector(self, key: CacheKey) -> list[float] | None:
+        if self.embedder is None:
+            return None
+        if key.vector is None:
+            key.vector = list(self.embedder(key.query))
+        return key.vector
+
+    def _nearest(self, context: str, vector: list[float] | None) -> str | None:
+        candidates = self._by_context.get(context)
+        if not candidates or vector is None:
+            return None
+        best, best_score = None, self.similarity
+        for exact, other in candidates.items():
+            score = _cosine(vector, other)
+            if score >= best_score:
+                best, best_score = exact, score
+        return best
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: ResponseCache | None = None
+_cache_loaded = False
+_cache_lock = threading.Lock()
+
+
+def load_embedder() -> Embedder | None:
+    """Embeddings do Ollama para o nível semântico (BANK_RESPONSE_CACHE_EMBED_MODEL)."""
+    model = os.getenv("BANK_RESPONSE_CACHE_EMBED_MODEL")
+    if not model:
+        return None
+
+    from langchain_ollama import OllamaEmbeddings  # noqa: PLC0415
+
+    embeddings = OllamaEmbeddings(
+        model=model, base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    )
+    return embeddings.embed_query
+
+
+def get_response_cache(tools: Sequence[BaseTool]) -> ResponseCache | None:
+    """Cache compartilhado; `BANK_RESPONSE_CACHE_SIZE=0` desliga."""
+    global _cache, _cache_loaded  # noqa: PLW0603
+
+    if _cache_loaded:
+        return _cache
+
+    with _cache_lock:
+        if not _cache_loaded:
+            size = int(os.getenv("BANK_RESPONSE_CACHE_SIZE", "512"))
+            if size > 0:
+                _cache = ResponseCache(
+                    tools,
+                    max_entries=size,
+                    embedder=load_embedder(),
+                    similarity=float(os.getenv("BANK_RESPONSE_CACHE_SIMILARITY", "0.93")),
+                )
+            _cache_loaded = True
+    return _cache
+
+
+register_collector(
+    "response_cache",
+    lambda: _cache.stats.as_dict() | {"entries": len(_cache)} if _cache else {},
+)
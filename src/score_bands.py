@@ -0,0 +1,111 @@
+import threading
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from storage import Row, Storage, get_storage
+
+
+class ScoreBandError(ValueError):
+    """Tabela de faixas de score inválida (linha malformada, lacuna ou sobreposição)."""
+
+
+@dataclass(frozen=True, slots=True)
+class ScoreBandIndex:
+    """Faixas `score -> limite máximo` ordenadas em arrays e buscadas com bisect."""
+
+    mins: array
+    maxs: array
+    limits: array
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Row]) -> "ScoreBandIndex":
+        bands: list[tuple[int, int, float]] = []
+        for line, row in enumerate(rows, start=2):
+            try:
+                band = (
+                    int(row["min_score"]),
+                    int(row["max_score"]),
+                    float(row["max_allowed_limit"]),
+                )
+            except (KeyError, TypeError, ValueError) as error:
+                msg = f"Linha {line} malformada em score_limite: {row!r} ({error})"
+                raise ScoreBandError(msg) from error
+            if band[0] > band[1]:
+                msg = f"Linha {line}: min_score {band[0]} maior que max_score {band[1]}"
+                raise ScoreBandError(msg)
+            bands.append(band)
+
+        bands.sort()
+        for (_, prev_max, _), (cur_min, cur_max, _) in zip(bands, bands[1:]):
+            if cur_min <= prev_max:
+                msg = f"Faixa {cur_min}-{cur_max} sobrepõe a faixa que termina em {prev_max}"
+                raise ScoreBandError(msg)
+            if cur_min != prev_max + 1:
+                msg = f"Lacuna entre os scores {prev_max} e {cur_min} em score_limite"
+                raise ScoreBandError(msg)
+
+        return cls(
+            mins=array("q", (band[0] for band in bands)),
+            maxs=array("q", (band[1] for band in bands)),
+            limits=array("d", (band[2] for band in bands)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.mins)
+
+    def lookup(self, score: int) -> float | None:
+        """Limite máximo permitido para o score, ou None fora das faixas."""
+        i = bisect_right(self.mins, score) - 1
+        if i < 0 or score > self.maxs[i]:
+            return None
+        return self.limits[i]
+
+    def limits_for(self, scores: Sequence[int]) -> list[float | None]:
+        """Versão em lote de `lookup`, mantendo a ordem de `scores`."""
+        lookup = self.lookup
+        return [lookup(score) for score in scores]
+
+
+class ScoreBandTable:
+    """Índice de faixas compilado uma vez e recarregado quando a origem muda."""
+
+    def __init__(self, storage: Storage) -> None:
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._index: ScoreBandIndex | None = None
+        self._version: object = None
+
+    def index(self) -> ScoreBandIndex:
+        version = self.storage.score_bands_version()
+        if self._index is not None and version == self._version:
+            return self._index
+
+        with self._lock:
+            if self._index is None or version != self._version:
+                self._index = ScoreBandIndex.from_rows(self.storage.load_score_bands())
+                self._version = version
+            return self._index
+
+    def lookup(self, score: int) -> float | None:
+        return self.index().lookup(score)
+
+    def limits_for(self, scores: Sequence[int]) -> list[float | None]:
+        return self.index().limits_for(scores)
+
+
+_table: ScoreBandTable | None = None
+_table_lock = threading.Lock()
+
+
+def get_score_band_table(storage: Storage | None = None) -> ScoreBandTable:
+    """Tabela de faixas do backend dado (ou do compartilhado), reaproveitada
+    enquanto o backend for o mesmo."""
+    global _table  # noqa: PLW0603
+
+    storage = storage or get_storage()
+    with _table_lock:
+        if _table is None or _table.storage is not storage:
+            _table = ScoreBandTable(storage)
+        return _table
@@ -0,0 +1,497 @@
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from score_bands import ScoreBandIndex, ScoreBandTable
+from storage import DB_PATH, CsvStorage, Storage, get_storage
+
+if TYPE_CHECKING:
+    import numpy as np
+
+INPUT_FIELDS = [
+    "cpf",
+    "renda_mensal",
+    "tipo_emprego",
+    "despesas_fixas",
+    "num_dependentes",
+    "tem_dividas",
+]
+REPORT_FIELDS = [
+    "cpf",
+    "score_anterior",
+    "novo_score",
+    "limite_atual",
+    "limite_maximo",
+    "status",
+]
+
+
+class ScoreInputError(ValueError):
+    """Dados da entrevista de crédito fora do domínio da fórmula."""
+
+
+@dataclass(frozen=True)
+class ScoreWeights:
+    """Pesos da fórmula de score.
+
+    score = (renda_mensal / (despesas_fixas + 1)) * renda
+            + emprego[tipo_emprego] + dependentes[min(n, 3)] + dividas[tem_dividas]
+
+    limitado a [min_score, max_score]. `dependentes` vale para 0, 1, 2 e 3+.
+    """
+
+    renda: float = 30
+    emprego: Mapping[str, int] = field(
+        default_factory=lambda: {"formal": 300, "autônomo": 200, "desempregado": 0}
+    )
+    dependentes: tuple[int, int, int, int] = (100, 80, 60, 30)
+    dividas: Mapping[str, int] = field(default_factory=lambda: {"sim": -100, "não": 100})
+    min_score: int = 0
+    max_score: int = 1000
+
+    @classmethod
+    def from_file(cls, path: Path) -> "ScoreWeights":
+        """Lê os pesos de um JSON com `peso_renda`, `peso_emprego`,
+        `peso_dependentes` (`{"0": .., "1": .., "2": .., "3+": ..}`) e
+        `peso_dividas`; chaves ausentes mantêm o valor padrão."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        default = cls()
+        dependentes = data.get("peso_dependentes")
+        return cls(
+            renda=float(data.get("peso_renda", default.renda)),
+            emprego=data.get("peso_emprego", default.emprego),
+            dependentes=tuple(int(dependentes[key]) for key in ("0", "1", "2", "3+"))  # type: ignore[arg-type]
+            if dependentes
+            else default.dependentes,
+            dividas=data.get("peso_dividas", default.dividas),
+        )
+
+
+def compute_score(
+    renda_mensal: float,
+    tipo_emprego: str,
+    despesas_fixas: float,
+    num_dependentes: int,
+    tem_dividas: str,
+    weights: ScoreWeights | None = None,
+) -> int:
+    """Score de uma entrevista; levanta `ScoreInputError` para dados inválidos."""
+    weights = weights or get_score_weights()
+    emprego = tipo_emprego.strip().lower()
+    dividas = tem_dividas.strip().lower()
+
+    if emprego not in weights.emprego:
+        msg = "Tipo de emprego inválido. Use: formal, autônomo ou desempregado"
+        raise ScoreInputError(msg)
+    if dividas not in weights.dividas:
+        msg = "Resposta sobre dívidas inválida. Use: sim ou não"
+        raise ScoreInputError(msg)
+    if num_dependentes < 0:
+        msg = "Número de dependentes não pode ser negativo"
+        raise ScoreInputError(msg)
+    if renda_mensal < 0 or despesas_fixas < 0:
+        msg = "Renda e despesas não podem ser negativas"
+        raise ScoreInputError(msg)
+
+    score = int(
+        (renda_mensal / (despesas_fixas + 1)) * weights.renda
+        + weights.emprego[emprego]
+        + weights.dependentes[min(num_dependentes, 3)]
+        + weights.dividas[dividas]
+    )
+    return max(weights.min_score, min(weights.max_score, score))
+
+
+def _numpy():  # noqa: ANN202
+    try:
+        import numpy as np  # noqa: PLC0415
+    except ImportError as error:
+        msg = "O cálculo em lote precisa do NumPy: instale com `uv sync --extra batch`"
+        raise RuntimeError(msg) from error
+    return np
+
+
+def compute_scores(
+    columns: Mapping[str, Sequence[Any]], weights: ScoreWeights | None = None
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """Versão vetorizada de `compute_score` sobre colunas (listas ou arrays).
+
+    Retorna `(scores, valid)`: scores int64 e a máscara das linhas válidas;
+    linhas inválidas (inclusive células numéricas vazias ou com texto)
+    ficam com score -1.
+    """
+    np = _numpy()
+    weights = weights or get_score_weights()
+
+    def numeric(values: Sequence[Any]) -> tuple[Any, Any]:
+        # Conversão vetorizada; se alguma célula não for número (vazia,
+        # texto), só os valores distintos são convertidos um a um e as
+        # linhas inválidas viram NaN
+        values = np.asarray(values)
+        try:
+            numbers = values.astype(np.float64, copy=False)
+        except (TypeError, ValueError):
+            uniques, inverse = np.unique(values, return_inverse=True)
+            parsed = np.empty(len(uniques))
+            for i, value in enumerate(uniques.tolist()):
+                try:
+                    parsed[i] = float(value)
+                except (TypeError, ValueError):
+                    parsed[i] = np.nan
+            numbers = parsed[inverse.reshape(-1)]
+        return numbers, np.isfinite(numbers)
+
+    renda, renda_ok = numeric(columns["renda_mensal"])
+    despesas, despesas_ok = numeric(columns["despesas_fixas"])
+    dependentes_raw, dependentes_ok = numeric(columns["num_dependentes"])
+    dependentes_ok &= dependentes_raw == np.trunc(np.nan_to_num(dependentes_raw))
+    renda = np.where(renda_ok, renda, 0.0)
+    despesas = np.where(despesas_ok, despesas, 0.0)
+    dependentes = np.where(dependentes_ok, dependentes_raw, 0).astype(np.int64)
+
+    def categorical(values: Sequence[str], table: Mapping[str, int]) -> tuple[Any, Any]:
+        # Uma comparação vetorizada por categoria; só o que não casou
+        # (maiúsculas, espaços, valores inválidos) é normalizado em Python
+        values = np.asarray(values)
+        points = np.zeros(len(values))
+        found = np.zeros(len(values), dtype=bool)
+        for key, weight in table.items():
+            match = values == key
+            points[match] = weight
+            found |= match
+
+        rest = np.flatnonzero(~found)
+        if rest.size:
+            uniques, inverse = np.unique(values[rest], return_inverse=True)
+            normalized = [str(value).strip().lower() for value in uniques]
+            points[rest] = np.array([table.get(v, 0) for v in normalized], dtype=float)[inverse]
+            found[rest] = np.array([v in table for v in normalized], dtype=bool)[inverse]
+        return points, found
+
+    emprego_points, emprego_ok = categorical(columns["tipo_emprego"], weights.emprego)
+    dividas_points, dividas_ok = categorical(columns["tem_dividas"], weights.dividas)
+    dependentes_points = np.asarray(weights.dependentes, dtype=np.float64)[
+        np.clip(dependentes, 0, 3)
+    ]
+
+    valid = (
+        renda_ok
+        & despesas_ok
+        & dependentes_ok
+        & emprego_ok
+        & dividas_ok
+        & (dependentes >= 0)
+        & (renda >= 0)
+        & (despesas >= 0)
+    )
+    raw = (
+        (renda / (despesas + 1)) * weights.renda
+        + emprego_points
+        + dependentes_points
+        + dividas_points
+    )
+    scores = np.clip(np.trunc(raw), weights.min_score, weights.max_score).astype(np.int64)
+    return np.where(valid, scores, -1), valid
+
+
+def band_limits(scores: "np.ndarray", index: ScoreBandIndex) -> "np.ndarray":
+    """Limite máximo por score via `searchsorted` (NaN fora das faixas)."""
+    np = _numpy()
+    mins = np.frombuffer(index.mins, dtype=np.int64)
+    maxs = np.frombuffer(index.maxs, dtype=np.int64)
+    limits = np.frombuffer(index.limits, dtype=np.float64)
+    if not len(mins):
+        return np.full(len(scores), np.nan)
+
+    i = np.searchsorted(mins, scores, side="right") - 1
+    clipped = np.clip(i, 0, len(mins) - 1)
+    inside = (i >= 0) & (scores <= maxs[clipped])
+    return np.where(inside, limits[clipped], np.nan)
+
+
+def read_columns(path: Path) -> dict[str, list[str]]:
+    """Lê o CSV de entrevistas em colunas (uma lista por campo)."""
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        missing = set(INPUT_FIELDS) - set(header)
+        if missing:
+            msg = f"Colunas ausentes em {path}: {sorted(missing)}"
+            raise ValueError(msg)
+        positions = [header.index(name) for name in INPUT_FIELDS]
+        columns: list[list[str]] = [[] for _ in INPUT_FIELDS]
+        appends = [column.append for column in columns]
+        for row in reader:
+            for append, position in zip(appends, positions, strict=True):
+                append(row[position])
+    return dict(zip(INPUT_FIELDS, columns, strict=True))
+
+
+@dataclass(slots=True)
+class RescoreSummary:
+    rows: int = 0
+    updated: int = 0
+    invalid: int = 0
+    not_found: int = 0
+    out_of_bands: int = 0
+    limits_capped: int = 0
+    elapsed_s: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        rate = self.rows / self.elapsed_s if self.elapsed_s else 0.0
+        return asdict(self) | {"rows_per_s": round(rate)}
+
+
+def rescore(  # noqa: PLR0913
+    storage: Storage,
+    columns: Mapping[str, Sequence[Any]],
+    weights: ScoreWeights | None = None,
+    *,
+    cap_limits: bool = False,
+    dry_run: bool = False,
+    report_path: Path | None = None,
+) -> RescoreSummary:
+    """Recalcula o score de toda a base e reavalia o limite pelas faixas.
+
+    Os scores são calculados em lote com NumPy, cada cliente é mapeado à
+    faixa de `score_limite` e casado com a base por `searchsorted`, sem laço
+    por linha; tudo é gravado em uma única passada (`update_users`). Com `cap_limits`, `limite_atual` acima do máximo da
+    nova faixa é reduzido para esse máximo.
+    """
+    np = _numpy()
+    started = time.perf_counter()
+    summary = RescoreSummary(rows=len(columns["cpf"]))
+
+    scores, valid = compute_scores(columns, weights)
+    limits = band_limits(scores, ScoreBandTable(storage).index())
+    cpfs = np.asarray(columns["cpf"]).astype(str)
+
+    # Clientes em arrays, casados com as linhas da entrada por `searchsorted`
+    users = list(storage.iter_users())
+    user_cpfs = np.array([str(user["cpf"]) for user in users])
+    user_scores = np.array([str(user["score"]) for user in users])
+    user_limits = np.array([float(user["limite_atual"]) for user in users])
+    if users:
+        order = np.argsort(user_cpfs, kind="stable")
+        position = np.clip(np.searchsorted(user_cpfs[order], cpfs), 0, len(users) - 1)
+        matched = order[position]
+        found = user_cpfs[matched] == cpfs
+    else:
+        matched = np.zeros(len(cpfs), dtype=np.int64)
+        found = np.zeros(len(cpfs), dtype=bool)
+        user_scores, user_limits = np.array([""]), np.array([0.0])
+
+    ok = valid & found
+    no_band = ok & np.isnan(limits)
+    capped = ok & ~no_band & cap_limits & (user_limits[matched] > limits)
+    summary.invalid = int((~valid).sum())
+    summary.not_found = int((valid & ~found).sum())
+    summary.out_of_bands = int(no_band.sum())
+    summary.limits_capped = int(capped.sum())
+
+    score_text = scores.astype(str)
+    limit_text = _money(np.nan_to_num(limits))
+
+    if not dry_run and ok.any():
+        capped_text = np.where(capped, limit_text, "")
+        updates: dict[str, dict[str, Any]] = {
+            cpf: {"score": score, "limite_atual": limit} if limit else {"score": score}
+            for cpf, score, limit in zip(
+                cpfs[ok].tolist(), score_text[ok].tolist(), capped_text[ok].tolist(), strict=True
+            )
+        }
+        summary.updated = storage.update_users(updates)
+
+    if report_path is not None:
+        status = np.select(
+            [~valid, ~found, no_band, capped],
+            ["dados_invalidos", "cpf_nao_encontrado", "sem_faixa", "limite_reduzido"],
+            "atualizado",
+        )
+        report = zip(
+            cpfs.tolist(),
+            np.where(ok, user_scores[matched], "").tolist(),
+            np.where(valid, score_text, "").tolist(),
+            np.where(ok, _money(user_limits[matched]), "").tolist(),
+            np.where(ok & ~no_band, limit_text, "").tolist(),
+            status.tolist(),
+            strict=True,
+        )
+        with open(report_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(REPORT_FIELDS)
+            writer.writerows(report)
+
+    summary.elapsed_s = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def _money(values: "np.ndarray") -> "np.ndarray":
+    """`f"{v:.2f}"` por elemento, formatando só os valores distintos."""
+    np = _numpy()
+    uniques, inverse = np.unique(values, return_inverse=True)
+    return np.array([f"{value:.2f}" for value in uniques.tolist()])[inverse.reshape(-1)]
+
+
+def synthetic_columns(rows: int, seed: int = 42) -> dict[str, list[Any]]:
+    rng = random.Random(seed)
+    return {
+        "cpf": [f"{i:011d}" for i in range(rows)],
+        "renda_mensal": [round(rng.uniform(0, 30000), 2) for _ in range(rows)],
+        "tipo_emprego": rng.choices(["formal", "autônomo", "desempregado"], k=rows),
+        "despesas_fixas": [round(rng.uniform(0, 15000), 2) for _ in range(rows)],
+        "num_dependentes": [rng.randint(0, 5) for _ in range(rows)],
+        "tem_dividas": rng.choices(["sim", "não"], k=rows),
+    }
+
+
+def benchmark(rows: int, seed: int = 42) -> dict[str, Any]:
+    """Compara o laço por linha (`compute_score`) com o cálculo vetorizado.
+
+    `to_arrays_s` é a conversão das listas em arrays colunares, medida à
+    parte: em produção ela acontece uma vez na leitura da entrada.
+    `rescore_s` mede o caminho completo de `rescore` (scores, faixas,
+    casamento com a base, atualizações e relatório) sobre uma base CSV
+    temporária, em `dry_run`.
+    """
+    np = _numpy()
+    weights = get_score_weights()
+    columns = synthetic_columns(rows, seed)
+
+    started = time.perf_counter()
+    loop = [
+        compute_score(renda, emprego, despesas, dependentes, dividas, weights)
+        for renda, emprego, despesas, dependentes, dividas in zip(
+            columns["renda_mensal"],
+            columns["tipo_emprego"],
+            columns["despesas_fixas"],
+            columns["num_dependentes"],
+            columns["tem_dividas"],
+            strict=True,
+        )
+    ]
+    loop_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    arrays = {name: np.asarray(values) for name, values in columns.items()}
+    convert_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scores, _ = compute_scores(arrays, weights)
+    numpy_s = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        _benchmark_database(workdir, columns["cpf"], seed)
+        storage = CsvStorage(workdir)
+        # Carrega a base antes de medir (o índice por CPF fica em memória)
+        storage.get_user(columns["cpf"][1])
+        started = time.perf_counter()
+        rescore(
+            storage,
+            arrays,
+            weights,
+            cap_limits=True,
+            dry_run=True,
+            report_path=workdir / "relatorio.csv",
+        )
+        rescore_s = time.perf_counter() - started
+
+    return {
+        "rows": rows,
+        "loop_s": round(loop_s, 4),
+        "numpy_s": round(numpy_s, 4),
+        "to_arrays_s": round(convert_s, 4),
+        "speedup": round(loop_s / numpy_s, 1) if numpy_s else None,
+        "loop_rows_per_s": round(rows / loop_s) if loop_s else None,
+        "numpy_rows_per_s": round(rows / numpy_s) if numpy_s else None,
+        "rescore_s": round(rescore_s, 4),
+        "rescore_rows_per_s": round(rows / rescore_s) if rescore_s else None,
+        "identical": bool(np.array_equal(scores, np.asarray(loop, dtype=np.int64))),
+    }
+
+
+def _benchmark_database(path: Path, cpfs: Sequence[str], seed: int) -> None:
+    """`users.csv` com os CPFs da entrada (exceto 1 em 20) e as faixas reais."""
+    from customers import USER_FIELDS  # noqa: PLC0415
+
+    rng = random.Random(seed)
+    with open(path / "users.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(USER_FIELDS)
+        writer.writerows(
+            [cpf, "1990-01-01", f"Cliente {cpf}", f"{rng.randrange(1, 60) * 1000:.2f}", "500"]
+            for i, cpf in enumerate(cpfs)
+            if i % 20
+        )
+    shutil.copy(DB_PATH / "score_limite.csv", path / "score_limite.csv")
+
+
+_weights: ScoreWeights | None = None
+_weights_lock = threading.Lock()
+
+
+def get_score_weights() -> ScoreWeights:
+    """Pesos em uso; `BANK_SCORE_WEIGHTS` aponta para um JSON que os substitui."""
+    global _weights  # noqa: PLW0603
+
+    if _weights is not None:
+        return _weights
+    with _weights_lock:
+        if _weights is None:
+            path = os.getenv("BANK_SCORE_WEIGHTS")
+            _weights = ScoreWeights.from_file(Path(path)) if path else ScoreWeights()
+        return _weights
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recálculo de score em lote")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rescore_parser = subparsers.add_parser(
+        "rescore", help="Recalcula o score da base a partir de um CSV de entrevistas"
+    )
+    rescore_parser.add_argument("input", type=Path, help=f"CSV com {', '.join(INPUT_FIELDS)}")
+    rescore_parser.add_argument("--weights", type=Path, help="JSON com os novos pesos")
+    rescore_parser.add_argument("--report", type=Path, help="CSV de saída por cliente")
+    rescore_parser.add_argument(
+        "--cap-limits",
+        action="store_true",
+        help="reduz limite_atual ao máximo da nova faixa quando exceder",
+    )
+    rescore_parser.add_argument("--dry-run", action="store_true", help="não grava na base")
+
+    bench_parser = subparsers.add_parser("bench", help="Laço por linha x NumPy")
+    bench_parser.add_argument("--rows", type=int, default=1_000_000)
+
+    args = parser.parse_args()
+
+    if args.command == "rescore":
+        weights = ScoreWeights.from_file(args.weights) if args.weights else None
+        summary = rescore(
+            get_storage(),
+            read_columns(args.input),
+            weights,
+            cap_limits=args.cap_limits,
+            dry_run=args.dry_run,
+            report_path=args.report,
+        )
+        print(json.dumps(summary.as_dict(), indent=2))
+    elif args.command == "bench":
+        print(json.dumps(benchmark(args.rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import time
+import uuid
+import weakref
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    SystemMessage,
+)
+from langgraph.graph.state import CompiledStateGraph, RunnableConfig
+
+from graph import build_graph
+from intents import FAST_PATH_STATS
+from llm_scheduler import get_llm_scheduler
+from metrics import LLMTimings, prometheus_text, span
+from prompt_prefix import PREFIX_STATS, get_prompt_prefix
+from prompts import SYSTEM_PROMPT
+from response_cache import get_response_cache
+from tools import TOOLS
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_BODY = 64 * 1024
+HEADER_TIMEOUT = 10.0
+
+Emit = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, reason: str) -> None:
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class ChatServer:
+    """Servidor asyncio (HTTP + WebSocket) com uma thread do LangGraph por sessão.
+
+    - `POST /chat` com `{"session": opcional, "message": "..."}` responde em
+      NDJSON, um evento por linha, com os tokens à medida que são gerados.
+    - `GET /ws` abre um WebSocket; cada conexão é uma sessão própria.
+
+    `max_sessions` limita conexões simultâneas (acima disso: 503) e
+    `max_active_turns` limita turnos em execução; os demais esperam até
+    `queue_timeout` segundos. A escrita aguarda `drain()`, então um cliente
+    lento segura apenas a própria sessão.
+    """
+
+    def __init__(
+        self,
+        graph: CompiledStateGraph | None = None,
+        max_sessions: int = 1000,
+        max_active_turns: int = 64,
+        queue_timeout: float = 30.0,
+    ) -> None:
+        self.graph = graph or build_graph()
+        self.max_sessions = max_sessions
+        self.max_active_turns = max_active_turns
+        self.queue_timeout = queue_timeout
+        self.active_sessions = 0
+        self.stats = {"turns": 0, "rejected": 0, "errors": 0}
+        self._turn_slots = asyncio.Semaphore(max_active_turns)
+        self._session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    async def start(self, host: str, port: int) -> asyncio.Server:
+        # Nós síncronos do grafo rodam no executor padrão do loop
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.max_active_turns + 8)
+        )
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self.active_sessions >= self.max_sessions:
+            self.stats["rejected"] += 1
+            await self._respond(writer, 503, {"error": "Servidor ocupado, tente novamente."})
+            return
+
+        self.active_sessions += 1
+        try:
+            method, path, headers = await asyncio.wait_for(
+                self._read_head(reader), HEADER_TIMEOUT
+            )
+            if method == "GET" and path == "/health":
+                await self._respond(writer, 200, self.health())
+            elif method == "GET" and path == "/metrics":
+                await self._respond_text(writer, self.metrics())
+            elif method == "GET" and path == "/ws":
+                await self._websocket(reader, writer, headers)
+            elif method == "POST" and path == "/chat":
+                await self._chat(reader, writer, headers)
+            else:
+                raise HttpError(404, "Not Found")  # noqa: TRY301
+        except HttpError as error:
+            await self._respond(writer, error.status, {"error": error.reason})
+        except (TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.active_sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def health(self) -> dict[str, Any]:
+        health = {"status": "ok", "sessions": self.active_sessions} | self.stats
+        health["fast_path"] = FAST_PATH_STATS.as_dict()
+        health["llm_scheduler"] = get_llm_scheduler().snapshot()
+        health["prompt_prefix"] = {"version": get_prompt_prefix(TOOLS).version} | (
+            PREFIX_STATS.as_dict()
+        )
+        cache = get_response_cache(TOOLS)
+        if cache is not None:
+            health["response_cache"] = cache.stats.as_dict() | {"entries": len(cache)}
+        stats = getattr(self.graph.checkpointer, "stats", None)
+        if callable(stats):
+            health["checkpointer"] = stats()
+        return health
+
+    def metrics(self) -> str:
+        server = {"sessions": self.active_sessions} | self.stats
+        extra = {"server": server}
+        stats = getattr(self.graph.checkpointer, "stats", None)
+        if callable(stats):
+            extra["checkpointer"] = stats()
+        return prometheus_text(extra)
+
+    async def run_turn(self, thread_id: str, text: str, emit: Emit) -> None:
+        """Executa um turno da conversa emitindo eventos enquanto o grafo roda."""
+        lock = self._session_locks.get(thread_id)
+        if lock is None:
+            lock = self._session_locks[thread_id] = asyncio.Lock()
+
+        # Primeiro a vez na própria sessão, depois a vaga global: uma segunda
+        # mensagem de uma sessão ocupada não segura vaga enquanto espera
+        async with lock:
+            try:
+                await asyncio.wait_for(self._turn_slots.acquire(), self.queue_timeout)
+            except TimeoutError:
+                self.stats["rejected"] += 1
+                await emit(
+                    {"type": "error", "message": "Muitos atendimentos no momento, tente novamente."}
+                )
+                return
+
+            try:
+                await self._run_admitted_turn(thread_id, text, emit)
+            finally:
+                self._turn_slots.release()
+
+    async def _run_admitted_turn(self, thread_id: str, text: str, emit: Emit) -> None:
+        started = time.perf_counter()
+        try:
+            with span("chat.turn", thread_id=thread_id):
+                answer, first_token, timings = await self._stream_turn(thread_id, text, emit)
+
+            self.stats["turns"] += 1
+            finished = time.perf_counter()
+            await emit(
+                {
+                    "type": "done",
+                    "content": answer,
+                    "ttft_ms": round((first_token - started) * 1000, 1) if first_token else None,
+                    "latency_ms": round((finished - started) * 1000, 1),
+                    "llm": timings.as_dict() if timings else None,
+                }
+            )
+        except ConnectionError:
+            raise
+        except Exception as error:  # noqa: BLE001
+            self.stats["errors"] += 1
+            await emit({"type": "error", "message": f"Erro ao processar a mensagem: {error}"})
+
+    async def _stream_turn(
+        self, thread_id: str, text: str, emit: Emit
+    ) -> tuple[str, float | None, LLMTimings | None]:
+        """Roda o grafo repassando tokens e tools.
+
+        Retorna (resposta, 1º token, fases das chamadas ao modelo somadas).
+        """
+        first_token: float | None = None
+        answer = ""
+        timings: LLMTimings | None = None
+        config = RunnableConfig(configurable={"thread_id": thread_id})
+        snapshot = await self.graph.aget_state(config)
+        messages = [HumanMessage(text)]
+        if not snapshot.values.get("messages"):
+            messages.insert(0, SystemMessage(SYSTEM_PROMPT))
+
+        async for mode, chunk in self.graph.astream(
+            {"messages": messages}, config, stream_mode=["messages", "updates"]
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                if (
+                    metadata.get("langgraph_node") == "call_llm"
+                    and isinstance(message, AIMessageChunk)
+                    and message.text
+                ):
+                    first_token = first_token or time.perf_counter()
+                    await emit({"type": "token", "content": message.text})
+            elif "tool_node" in chunk:
+                for tool_message in (chunk["tool_node"] or {}).get("messages", []):
+                    await emit(
+                        {
+                            "type": "tool",
+                            "name": tool_message.name,
+                            "status": tool_message.status,
+                        }
+                    )
+            elif "call_llm" in chunk:
+                for message in (chunk["call_llm"] or {}).get("messages", []):
+                    if (step := LLMTimings.from_message(message)) is not None:
+                        timings = step if timings is None else timings + step
+                    if isinstance(message, AIMessage) and not message.tool_calls:
+                        answer = message.text
+                        meta = message.response_metadata
+                        if meta.get("cache") or meta.get("scheduler"):
+                            first_token = first_token or time.perf_counter()
+                            await emit({"type": "token", "content": answer})
+            elif "fast_path_reply" in chunk:
+                # Resposta por template: chega inteira, sem passar pelo LLM
+                for message in (chunk["fast_path_reply"] or {}).get("messages", []):
+                    answer = message.text
+                    first_token = first_token or time.perf_counter()
+                    await emit({"type": "token", "content": answer})
+
+        return answer, first_token, timings
+
+    async def _chat(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        headers: dict[str, str],
+    ) -> None:
+        length = int(headers.get("content-length", "0"))
+        if length <= 0 or length > MAX_BODY:
+            raise HttpError(413 if length else 411, "Corpo da requisição inválido")
+
+        try:
+            body = json.loads(await reader.readexactly(length))
+            text = str(body["message"])
+        except (ValueError, KeyError, TypeError) as error:
+            raise HttpError(400, "Envie JSON com o campo 'message'") from error
+
+        session = str(body.get("session") or uuid.uuid4().hex)
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+
+        async def emit(event: dict[str, Any]) -> None:
+            writer.write(json.dumps(event, ensure_ascii=False).encode() + b"\n")
+            await writer.drain()
+
+        await emit({"type": "session", "session": session})
+        await self.run_turn(session, text, emit)
+
+    async def _websocket(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        headers: dict[str, str],
+    ) -> None:
+        key = headers.get("sec-websocket-key")
+        if headers.get("upgrade", "").lower() != "websocket" or not key:
+            raise HttpError(400, "Upgrade para WebSocket esperado")
+
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest())  # noqa: S324
+        writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\n"
+            b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        await writer.drain()
+
+        session = uuid.uuid4().hex
+
+        async def emit(event: dict[str, Any]) -> None:
+            await _ws_send(writer, 0x1, json.dumps(event, ensure_ascii=False).encode())
+
+        await emit({"type": "session", "session": session})
+
+        while True:
+            opcode, payload = await _ws_recv(reader)
+            if opcode == 0x8:  # close
+                await _ws_send(writer, 0x8, payload[:2])
+                return
+            if opcode == 0x9:  # ping
+                await _ws_send(writer, 0xA, payload)
+                continue
+            if opcode != 0x1:
+                continue
+
+            try:
+                text = str(json.loads(payload)["message"])
+            except (ValueError, KeyError, TypeError):
+                text = payload.decode("utf-8", errors="replace")
+            await self.run_turn(session, text, emit)
+
+    @staticmethod
+    async def _read_head(reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str]]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            raise asyncio.IncompleteReadError(b"", None)
+        try:
+            method, path, _ = request_line.split(" ", 2)
+        except ValueError as error:
+            raise HttpError(400, "Bad Request") from error
+
+        headers: dict[str, str] = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), path.split("?", 1)[0], headers
+
+    @staticmethod
+    async def _respond_text(writer: asyncio.StreamWriter, text: str) -> None:
+        body = text.encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 503: "Service Unavailable"}
+        writer.write(
+            f"HTTP/1.1 {status} {reasons.get(status, 'Error')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def _ws_recv(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:  # noqa: PLR2004
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:  # noqa: PLR2004
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_BODY:
+        raise ConnectionError("Frame WebSocket grande demais")
+
+    mask = await reader.readexactly(4) if second & 0x80 else b""
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return opcode, payload
+
+
+async def _ws_send(writer: asyncio.StreamWriter, opcode: int, payload: bytes) -> None:
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:  # noqa: PLR2004
+        header += bytes([length])
+    elif length < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    writer.write(header + payload)
+    await writer.drain()
+
+
+async def serve(host: str, port: int, server: ChatServer | None = None) -> None:
+    server = server or ChatServer(
+        max_sessions=int(os.getenv("BANK_SERVER_MAX_SESSIONS", "1000")),
+        max_active_turns=int(os.getenv("BANK_SERVER_MAX_ACTIVE_TURNS", "64")),
+        queue_timeout=float(os.getenv("BANK_SERVER_QUEUE_TIMEOUT", "30")),
+    )
+    listener = await server.start(host, port)
+    print(f"Servidor ouvindo em http://{host}:{port} (POST /chat, GET /ws, GET /metrics)")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor de atendimento do Banco Ágil")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
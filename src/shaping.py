@@ -0,0 +1,102 @@
+import json
+import threading
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from metrics import register_collector
+
+# Campos enviados ao modelo por tool, na ordem em que aparecem no JSON.
+# O payload completo continua em `ToolMessage.artifact` para auditoria.
+PROJECTIONS: dict[str, tuple[str, ...]] = {
+    "triagem": ("sucesso", "nome"),
+    "quote_currency": ("success", "from", "to", "rate", "stale"),
+    "quote_currencies": ("success", "rates", "errors", "stale"),
+    "solicitar_aumento_limite": (
+        "success",
+        "status_pedido",
+        "limite_atual",
+        "novo_limite_solicitado",
+        "max_allowed_for_score",
+    ),
+    "recalcular_score": ("success", "score_anterior", "novo_score"),
+    "encerrar_conversa": ("success",),
+}
+DROPPED_FIELDS = frozenset({"raw", "closing_message"})
+
+
+@dataclass(slots=True)
+class ShapingStats:
+    results: int = 0
+    raw_tokens: int = 0
+    shaped_tokens: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.raw_tokens - self.shaped_tokens
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self) | {"tokens_saved": self.tokens_saved}
+
+
+SHAPING_STATS = ShapingStats()
+_stats_lock = threading.Lock()
+register_collector("shaping", SHAPING_STATS.as_dict)
+
+
+def _tokens(content: str) -> int:
+    return count_tokens_approximately([ToolMessage(content=content, tool_call_id="")])
+
+
+def project(name: str, result: dict[str, Any]) -> dict[str, Any]:
+    if name == "triagem":
+        # Os dados do cliente já vão fixados no contexto (authenticated_user)
+        result = {**result, "nome": (result.get("usuario") or {}).get("nome")}
+
+    ok = result.get("success", result.get("sucesso"))
+    fields = PROJECTIONS.get(name)
+    if fields is None:
+        projected = {k: v for k, v in result.items() if k not in DROPPED_FIELDS}
+    else:
+        projected = {k: result[k] for k in fields if result.get(k) is not None}
+
+    if not ok:
+        message_key = "mensagem" if "mensagem" in result else "message"
+        projected[message_key] = result.get(message_key)
+
+    return projected
+
+
+def shape_tool_result(name: str, result: Any) -> str:
+    """Projeção JSON compacta e estável do resultado de uma tool."""
+    if not isinstance(result, dict):
+        return str(result)
+
+    shaped = json.dumps(project(name, result), ensure_ascii=False, separators=(",", ":"))
+
+    with _stats_lock:
+        SHAPING_STATS.results += 1
+        SHAPING_STATS.raw_tokens += _tokens(str(result))
+        SHAPING_STATS.shaped_tokens += _tokens(shaped)
+
+    return shaped
+
+
+def conversation_savings(messages: Sequence[BaseMessage]) -> int:
+    """Tokens de prompt economizados em uma conversa.
+
+    Cada resultado de tool é reenviado em todas as chamadas ao LLM
+    seguintes, então a economia de cada um é multiplicada por elas.
+    """
+    saved = 0
+    for i, message in enumerate(messages):
+        if not isinstance(message, ToolMessage) or not isinstance(message.artifact, dict):
+            continue
+        diff = _tokens(str(message.artifact)) - _tokens(message.text)
+        later_llm_calls = sum(isinstance(m, AIMessage) for m in messages[i + 1 :])
+        saved += diff * later_llm_calls
+
+    return saved
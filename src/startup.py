@@ -0,0 +1,172 @@
+import argparse
+import json
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class Warmup:
+    """Prepara o assistente em segundo plano enquanto o prompt é exibido.
+
+    Importa o grafo e as tools, compila o grafo e pré-carrega o modelo;
+    `graph()` espera só o que ainda faltar. Uma falha no pré-carregamento do
+    modelo não impede o uso (a primeira chamada carrega), mas fica em
+    `llm_error`.
+    """
+
+    def __init__(self, prewarm: bool = True) -> None:
+        self.prewarm = prewarm
+        self.timings: dict[str, float] = {}
+        self.llm_error: Exception | None = None
+        self._graph: Any = None
+        self._error: BaseException | None = None
+        self._ready = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "Warmup":
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def graph(self) -> Any:
+        """Grafo compilado; bloqueia até o aquecimento terminar."""
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self._graph
+
+    def _step(self, name: str, started: float) -> float:
+        now = time.perf_counter()
+        self.timings[name] = round(now - started, 4)
+        return now
+
+    def _run(self) -> None:
+        try:
+            started = time.perf_counter()
+            from graph import build_graph  # noqa: PLC0415
+            from tools import TOOLS  # noqa: PLC0415
+            from utils import prewarm_llm  # noqa: PLC0415
+
+            started = self._step("imports", started)
+            self._graph = build_graph()
+            started = self._step("build_graph", started)
+            if self.prewarm:
+                try:
+                    prewarm_llm(TOOLS)
+                except Exception as error:  # noqa: BLE001
+                    self.llm_error = error
+                self._step("prewarm_llm", started)
+        except BaseException as error:  # noqa: BLE001
+            self._error = error
+        finally:
+            self._ready.set()
+
+
+def import_profile(module: str = "main", top: int = 25) -> dict[str, Any]:
+    """Roda `python -X importtime -c "import <module>"` e resume o resultado.
+
+    Devolve o tempo do módulo pedido, o do restante da inicialização do
+    interpretador (`site`, `.pth`), os módulos mais caros (tempo acumulado,
+    com os submódulos) e o tempo próprio somado por pacote de primeiro nível.
+    """
+    src = str(Path(__file__).parent)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=src,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        msg = f"Falha ao importar {module}: {completed.stderr.strip().splitlines()[-1:]}"
+        raise RuntimeError(msg)
+
+    modules: list[dict[str, Any]] = []
+    packages: dict[str, int] = {}
+    total_us = interpreter_us = 0
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append(
+            {
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+        if len(indent) <= 1:  # import de primeiro nível
+            if name == module:
+                total_us = int(cumulative_us)
+            else:
+                interpreter_us += int(cumulative_us)
+
+    modules.sort(key=lambda item: item["cumulative_ms"], reverse=True)
+    return {
+        "module": module,
+        "total_ms": total_us / 1000,
+        "interpreter_ms": interpreter_us / 1000,
+        "slowest": modules[:top],
+        "by_package_ms": {
+            name: us / 1000
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+    }
+
+
+def print_profile(report: dict[str, Any]) -> None:
+    print(
+        f"Importar `{report['module']}`: {report['total_ms']:.0f} ms "
+        f"(+{report['interpreter_ms']:.0f} ms do interpretador)\n"
+    )
+    print(f"{'acumulado':>10} {'próprio':>9}  módulo")
+    for item in report["slowest"]:
+        print(f"{item['cumulative_ms']:>8.1f}ms {item['self_ms']:>7.1f}ms  {item['module']}")
+    print(f"\n{'próprio':>10}  pacote")
+    for name, ms in report["by_package_ms"].items():
+        print(f"{ms:>8.1f}ms  {name}")
+    if report.get("warmup"):
+        print("\nAquecimento em segundo plano:")
+        for step, seconds in report["warmup"].items():
+            print(f"{seconds * 1000:>8.1f}ms  {step}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Perfil do tempo de inicialização")
+    parser.add_argument("--module", default="main", help="módulo a importar (padrão: main)")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument(
+        "--warmup", action="store_true", help="mede também compilar o grafo e pré-carregar o modelo"
+    )
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args()
+
+    report = import_profile(args.module, args.top)
+    if args.warmup:
+        warmup = Warmup().start()
+        warmup.graph()
+        report["warmup"] = warmup.timings
+        if warmup.llm_error is not None:
+            report["warmup_llm_error"] = str(warmup.llm_error)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_profile(report)
+
+
+if __name__ == "__main__":
+    main()
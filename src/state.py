@@ -1,8 +1,14 @@
 from collections.abc import Sequence
-from typing import Annotated, TypedDict
+from typing import Annotated, NotRequired, TypedDict
 
 from langgraph.graph.message import BaseMessage, add_messages
 
 
 class State(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
+    # Dados do cliente após `triagem` bem-sucedida (sempre enviados ao modelo)
+    authenticated_user: NotRequired[dict[str, str] | None]
+    # Resumo dos turnos antigos removidos de `messages`
+    summary: NotRequired[str]
+    # Tokens que deixaram de ser reenviados ao modelo por causa do resumo
+    pruned_tokens: NotRequired[int]
@@ -0,0 +1,511 @@
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+from customers import USER_FIELDS, get_customer_repository
+from ledger import RequestStats, get_ledger
+from write_coordinator import KeyLocks
+
+DB_PATH = Path(__file__).parents[1] / "db"
+
+SCORE_BAND_FIELDS = ["min_score", "max_score", "max_allowed_limit"]
+LIMIT_REQUEST_FIELDS = [
+    "cpf_cliente",
+    "data_hora_solicitacao",
+    "limite_atual",
+    "novo_limite_solicitado",
+    "status_pedido",
+]
+
+Row = dict[str, Any]
+
+
+class Storage(Protocol):
+    """Interface comum aos backends de armazenamento das tools."""
+
+    def users_available(self) -> bool: ...
+
+    def get_user(self, cpf: str) -> Row | None: ...
+
+    def update_user(self, cpf: str, **fields: Any) -> Row | None: ...
+
+    def iter_users(self) -> Iterator[Row]: ...
+
+    def update_users(self, updates: Mapping[str, Row]) -> int: ...
+
+    def score_bands_available(self) -> bool: ...
+
+    def load_score_bands(self) -> list[Row]: ...
+
+    def score_bands_version(self) -> object: ...
+
+    def append_limit_request(self, row: Row) -> None: ...
+
+    def recent_limit_requests(self, cpf: str, limit: int = 10) -> list[Row]: ...
+
+    def limit_request_stats(self, cpf: str, since: str | None = None) -> Row: ...
+
+    def transaction(self) -> Any: ...
+
+    def customer_lock(self, cpf: str) -> Any: ...
+
+
+# Leitura-decisão-escrita de um mesmo cliente (ex.: pedido de limite) em
+# série dentro do processo; clientes diferentes seguem em paralelo
+_customer_locks = KeyLocks()
+
+
+@dataclass(slots=True)
+class _CsvTransaction:
+    """Alterações de uma transação no CSV, aplicadas só no commit."""
+
+    updates: dict[str, Row] = field(default_factory=dict)
+    requests: list[Row] = field(default_factory=list)
+
+
+class CsvStorage:
+    """Backend original: arquivos CSV dentro de `db/`.
+
+    `transaction()` guarda as alterações da thread (pedidos no ledger e
+    atualizações de `users.csv`) e só as aplica se o bloco terminar sem
+    erro, com uma única regravação; dentro dela, as leituras da própria
+    thread já enxergam o que foi alterado.
+    """
+
+    def __init__(self, db_path: Path = DB_PATH) -> None:
+        self.db_path = db_path
+        self.users_path = db_path / "users.csv"
+        self.score_table_path = db_path / "score_limite.csv"
+        self.solicitacoes_path = db_path / "solicitacoes_aumento_limite.csv"
+        self._local = threading.local()
+
+    @property
+    def customers(self):  # noqa: ANN201
+        return get_customer_repository(self.users_path)
+
+    @property
+    def _tx(self) -> _CsvTransaction | None:
+        return getattr(self._local, "tx", None)
+
+    def users_available(self) -> bool:
+        return self.users_path.exists()
+
+    def get_user(self, cpf: str) -> Row | None:
+        row = self.customers.get(cpf)
+        tx = self._tx
+        if row is not None and tx is not None and cpf in tx.updates:
+            return row | tx.updates[cpf]
+        return row
+
+    def update_user(self, cpf: str, **fields: Any) -> Row | None:
+        fields = {k: str(v) for k, v in fields.items()}
+        tx = self._tx
+        if tx is None:
+            return self.customers.update(cpf, **fields)
+        row = self.get_user(cpf)
+        if row is None:
+            return None
+        tx.updates.setdefault(cpf, {}).update(fields)
+        return row | fields
+
+    def iter_users(self) -> Iterator[Row]:
+        return iter(self.customers.rows())
+
+    def update_users(self, updates: Mapping[str, Row]) -> int:
+        """Aplica várias atualizações com uma única regravação de users.csv."""
+        updated = 0
+        with self.customers.batch():
+            for cpf, fields in updates.items():
+                if self.update_user(cpf, **fields) is not None:
+                    updated += 1
+        return updated
+
+    def score_bands_available(self) -> bool:
+        return self.score_table_path.exists()
+
+    def load_score_bands(self) -> list[Row]:
+        with open(self.score_table_path, "r", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    def score_bands_version(self) -> object:
+        try:
+            return self.score_table_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @property
+    def ledger(self):  # noqa: ANN201
+        return get_ledger(self.solicitacoes_path, LIMIT_REQUEST_FIELDS)
+
+    def append_limit_request(self, row: Row) -> None:
+        tx = self._tx
+        if tx is None:
+            self.ledger.append(row)
+        else:
+            tx.requests.append(row)
+
+    def _staged_requests(self, cpf: str) -> list[Row]:
+        tx = self._tx
+        if tx is None:
+            return []
+        return [row for row in tx.requests if str(row["cpf_cliente"]) == cpf]
+
+    def recent_limit_requests(self, cpf: str, limit: int = 10) -> list[Row]:
+        staged = [dict(row) for row in reversed(self._staged_requests(cpf))]
+        return (staged + self.ledger.recent(cpf, limit))[:limit]
+
+    def limit_request_stats(self, cpf: str, since: str | None = None) -> Row:
+        stats = self.ledger.stats(cpf, since)
+        for row in self._staged_requests(cpf):
+            timestamp = str(row["data_hora_solicitacao"])
+            if since is not None and timestamp < since:
+                continue
+            stats.total += 1
+            stats.aprovados += row["status_pedido"] == "aprovado"
+            if stats.ultima_solicitacao is None or timestamp > stats.ultima_solicitacao:
+                stats.ultima_solicitacao = timestamp
+        return stats.as_dict()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if self._tx is not None:
+            yield  # transação aninhada: aplicada pela mais externa
+            return
+
+        tx = self._local.tx = _CsvTransaction()
+        try:
+            yield
+        finally:
+            self._local.tx = None
+        # Só chega aqui sem erro: uma regravação de users.csv, e a memória só
+        # muda se ela der certo; os pedidos vão para o ledger depois dela
+        self.customers.commit(tx.updates)
+        for row in tx.requests:
+            self.ledger.append(row)
+
+    def customer_lock(self, cpf: str) -> Any:
+        return _customer_locks.hold(cpf)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    cpf TEXT PRIMARY KEY,
+    data_nascimento TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    limite_atual REAL NOT NULL DEFAULT 0,
+    score INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS score_limite (
+    min_score INTEGER NOT NULL,
+    max_score INTEGER NOT NULL,
+    max_allowed_limit REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_score_limite_min_score
+    ON score_limite (min_score);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO meta (key, value) VALUES ('score_limite_version', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_score_limite_insert AFTER INSERT ON score_limite
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'score_limite_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_score_limite_update AFTER UPDATE ON score_limite
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'score_limite_version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_score_limite_delete AFTER DELETE ON score_limite
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'score_limite_version';
+END;
+
+CREATE TABLE IF NOT EXISTS solicitacoes_aumento_limite (
+    id INTEGER PRIMARY KEY,
+    cpf_cliente TEXT NOT NULL,
+    data_hora_solicitacao TEXT NOT NULL,
+    limite_atual REAL NOT NULL,
+    novo_limite_solicitado REAL NOT NULL,
+    status_pedido TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_solicitacoes_cpf_cliente
+    ON solicitacoes_aumento_limite (cpf_cliente, data_hora_solicitacao);
+"""
+
+# SQL fixo e parametrizado: o sqlite3 mantém estes statements preparados
+# no cache de cada conexão (`cached_statements`).
+SELECT_USER = "SELECT cpf, data_nascimento, nome, limite_atual, score FROM users WHERE cpf = ?"
+SELECT_USERS = "SELECT cpf, data_nascimento, nome, limite_atual, score FROM users"
+SELECT_SCORE_BANDS_VERSION = "SELECT value FROM meta WHERE key = 'score_limite_version'"
+SELECT_SCORE_BANDS = (
+    "SELECT min_score, max_score, max_allowed_limit FROM score_limite ORDER BY min_score"
+)
+INSERT_LIMIT_REQUEST = (
+    "INSERT INTO solicitacoes_aumento_limite "
+    "(cpf_cliente, data_hora_solicitacao, limite_atual, novo_limite_solicitado, status_pedido) "
+    "VALUES (:cpf_cliente, :data_hora_solicitacao, :limite_atual, :novo_limite_solicitado, :status_pedido)"
+)
+# Ambas usam o índice (cpf_cliente, data_hora_solicitacao)
+SELECT_RECENT_LIMIT_REQUESTS = (
+    "SELECT cpf_cliente, data_hora_solicitacao, limite_atual, novo_limite_solicitado, "
+    "status_pedido FROM solicitacoes_aumento_limite WHERE cpf_cliente = ? "
+    "ORDER BY data_hora_solicitacao DESC LIMIT ?"
+)
+SELECT_LIMIT_REQUEST_STATS = (
+    "SELECT COUNT(*), COALESCE(SUM(status_pedido = 'aprovado'), 0), "
+    "MAX(data_hora_solicitacao) FROM solicitacoes_aumento_limite "
+    "WHERE cpf_cliente = ? AND data_hora_solicitacao >= ?"
+)
+UPSERT_USER = (
+    "INSERT INTO users (cpf, data_nascimento, nome, limite_atual, score) "
+    "VALUES (:cpf, :data_nascimento, :nome, :limite_atual, :score) "
+    "ON CONFLICT (cpf) DO UPDATE SET data_nascimento = excluded.data_nascimento, "
+    "nome = excluded.nome, limite_atual = excluded.limite_atual, score = excluded.score"
+)
+INSERT_SCORE_BAND = (
+    "INSERT INTO score_limite (min_score, max_score, max_allowed_limit) "
+    "VALUES (:min_score, :max_score, :max_allowed_limit)"
+)
+UPDATE_USER = {
+    field: f"UPDATE users SET {field} = ? WHERE cpf = ?"  # noqa: S608
+    for field in USER_FIELDS
+    if field != "cpf"
+}
+
+
+class SqliteStorage:
+    """Backend transacional em SQLite (WAL, uma conexão por thread)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, cached_statements=256
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        self._local.depth = 1
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        finally:
+            self._local.depth = 0
+
+    def customer_lock(self, cpf: str) -> Any:
+        return _customer_locks.hold(cpf)
+
+    def users_available(self) -> bool:
+        return True
+
+    def get_user(self, cpf: str) -> Row | None:
+        row = self._connection().execute(SELECT_USER, (cpf,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def update_user(self, cpf: str, **fields: Any) -> Row | None:
+        unknown = set(fields) - set(UPDATE_USER)
+        if unknown:
+            msg = f"Campos inválidos para users: {sorted(unknown)}"
+            raise ValueError(msg)
+
+        with self.transaction() as conn:
+            for field, value in fields.items():
+                cursor = conn.execute(UPDATE_USER[field], (value, cpf))
+                if cursor.rowcount == 0:
+                    return None
+            row = conn.execute(SELECT_USER, (cpf,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def iter_users(self) -> Iterator[Row]:
+        for row in self._connection().execute(SELECT_USERS):
+            yield dict(row)
+
+    def update_users(self, updates: Mapping[str, Row]) -> int:
+        """Aplica várias atualizações em uma transação, com um `executemany`
+        por conjunto de campos; devolve quantos clientes foram atualizados."""
+        by_fields: dict[tuple[str, ...], list[tuple[Any, ...]]] = {}
+        for cpf, fields in updates.items():
+            unknown = set(fields) - set(UPDATE_USER)
+            if unknown:
+                msg = f"Campos inválidos para users: {sorted(unknown)}"
+                raise ValueError(msg)
+            if fields:
+                by_fields.setdefault(tuple(fields), []).append((*fields.values(), cpf))
+
+        updated = 0
+        with self.transaction() as conn:
+            for fields, params in by_fields.items():
+                assignments = ", ".join(f"{field} = ?" for field in fields)
+                cursor = conn.executemany(
+                    f"UPDATE users SET {assignments} WHERE cpf = ?",  # noqa: S608
+                    params,
+                )
+                updated += cursor.rowcount
+        return updated
+
+    def score_bands_available(self) -> bool:
+        return True
+
+    def load_score_bands(self) -> list[Row]:
+        return [dict(row) for row in self._connection().execute(SELECT_SCORE_BANDS)]
+
+    def score_bands_version(self) -> object:
+        # Incrementado por triggers a cada alteração em score_limite
+        return self._connection().execute(SELECT_SCORE_BANDS_VERSION).fetchone()[0]
+
+    def append_limit_request(self, row: Row) -> None:
+        with self.transaction() as conn:
+            conn.execute(INSERT_LIMIT_REQUEST, row)
+
+    def recent_limit_requests(self, cpf: str, limit: int = 10) -> list[Row]:
+        rows = self._connection().execute(SELECT_RECENT_LIMIT_REQUESTS, (cpf, limit))
+        return [dict(row) for row in rows]
+
+    def limit_request_stats(self, cpf: str, since: str | None = None) -> Row:
+        total, aprovados, ultima = (
+            self._connection()
+            .execute(SELECT_LIMIT_REQUEST_STATS, (cpf, since or ""))
+            .fetchone()
+        )
+        return RequestStats(total, aprovados, ultima).as_dict()
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def import_csv(db_path: Path, sqlite_path: Path) -> dict[str, int]:
+    """Importa os CSVs de `db_path` para o SQLite em uma única transação.
+
+    Pode ser executado com a aplicação ainda rodando sobre os CSVs; rodar de
+    novo substitui o conteúdo importado anteriormente.
+    """
+    storage = SqliteStorage(sqlite_path)
+    counts = {"users": 0, "score_limite": 0, "solicitacoes_aumento_limite": 0}
+
+    def read(name: str) -> list[Row]:
+        path = db_path / name
+        if not path.exists():
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    users = read("users.csv")
+    bands = read("score_limite.csv")
+    # Segmentos rotacionados do ledger primeiro, o arquivo ativo por último
+    solicitacoes = [
+        row
+        for path in sorted(db_path.glob("solicitacoes_aumento_limite-*.csv"))
+        for row in read(path.name)
+    ] + read("solicitacoes_aumento_limite.csv")
+
+    with storage.transaction() as conn:
+        conn.executemany(UPSERT_USER, users)
+        conn.execute("DELETE FROM score_limite")
+        conn.executemany(INSERT_SCORE_BAND, bands)
+        conn.execute("DELETE FROM solicitacoes_aumento_limite")
+        conn.executemany(INSERT_LIMIT_REQUEST, solicitacoes)
+
+    storage.close()
+    counts["users"] = len(users)
+    counts["score_limite"] = len(bands)
+    counts["solicitacoes_aumento_limite"] = len(solicitacoes)
+    return counts
+
+
+_storage: Storage | None = None
+_storage_lock = threading.Lock()
+
+
+def load_storage() -> Storage:
+    """Cria o backend configurado por `BANK_STORAGE` (`csv` ou `sqlite`)."""
+    backend = os.getenv("BANK_STORAGE", "csv").lower()
+    db_path = Path(os.getenv("BANK_DB_PATH", str(DB_PATH)))
+
+    if backend == "csv":
+        return CsvStorage(db_path)
+    if backend == "sqlite":
+        sqlite_path = Path(os.getenv("BANK_SQLITE_PATH", str(db_path / "bank.sqlite3")))
+        return SqliteStorage(sqlite_path)
+
+    msg = f"Backend de armazenamento desconhecido: {backend}"
+    raise ValueError(msg)
+
+
+def get_storage() -> Storage:
+    global _storage  # noqa: PLW0603
+
+    with _storage_lock:
+        if _storage is None:
+            _storage = load_storage()
+        return _storage
+
+
+def set_storage(storage: Storage | None) -> None:
+    global _storage  # noqa: PLW0603
+
+    with _storage_lock:
+        _storage = storage
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Utilitários de armazenamento")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Importa db/*.csv para SQLite")
+    import_parser.add_argument("--db-path", type=Path, default=DB_PATH)
+    import_parser.add_argument("--sqlite", type=Path, default=DB_PATH / "bank.sqlite3")
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        counts = import_csv(args.db_path, args.sqlite)
+        for table, count in counts.items():
+            print(f"{table}: {count} linhas importadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,9 @@
-import csv
-import os
-from pathlib import Path
-import requests
-from datetime import datetime
 from langchain.tools import BaseTool, tool
-from pathlib import Path
 
-DB_PATH = Path(__file__).parents[1] / "db"
+from fx import QuoteError, get_quote_service
+from limits import request_limit_increase
+from scoring import ScoreInputError, compute_score
+from storage import get_storage
 
 
 @tool
@@ -21,27 +18,24 @@ def triagem(cpf: str, data_nascimento: str) -> dict:
         dict com os dados do usuário autenticado ou mensagem de erro
     """
     try:
-        # Caminho do arquivo CSV
-        users_path = DB_PATH / "users.csv"
-        
-        if not users_path.exists():
+        storage = get_storage()
+
+        if not storage.users_available():
             return {"sucesso": False, "mensagem": "Arquivo de usuários não encontrado"}
-        
-        # Ler o CSV
-        with open(users_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row["cpf"] == cpf and row["data_nascimento"] == data_nascimento:
-                    return {
-                        "sucesso": True,
-                        "mensagem": "Autenticação realizada com sucesso",
-                        "usuario": {
-                            "cpf": row["cpf"],
-                            "nome": row["nome"],
-                            "data_nascimento": row["data_nascimento"]
-                        }
-                    }
-        
+
+        # Busca O(1) no índice por CPF
+        row = storage.get_user(cpf)
+        if row is not None and row["data_nascimento"] == data_nascimento:
+            return {
+                "sucesso": True,
+                "mensagem": "Autenticação realizada com sucesso",
+                "usuario": {
+                    "cpf": row["cpf"],
+                    "nome": row["nome"],
+                    "data_nascimento": row["data_nascimento"]
+                }
+            }
+
         return {"sucesso": False, "mensagem": "CPF ou data de nascimento inválidos"}
     
     except Exception as e:
@@ -65,38 +59,77 @@ def quote_currency(from_currency: str = "USD", to_currency: str = "BRL") -> dict
         dict com chaves: `success`, `from`, `to`, `rate`, `message` e `closing_message`.
     """
     try:
-        # Construir par de moedas dinâmico
-        currency_pair = f"{from_currency.upper()}-{to_currency.upper()}"
-        url = f"https://economia.awesomeapi.com.br/json/last/{currency_pair}"
-        
-        resp = requests.get(url, timeout=10)
-        
-        if resp.ok:
-            data = resp.json()
-            # A resposta vem com chave igual ao par (ex: "USD-BRL")
-            pair_key = currency_pair
-            if pair_key in data:
-                quote_data = data[pair_key]
-                rate = float(quote_data.get("bid"))  # "bid" é o valor de cotação
-                
-                return {
-                    "success": True,
-                    "from": from_currency.upper(),
-                    "to": to_currency.upper(),
-                    "rate": rate,
-                    "raw": data,
-                    "message": f"Cotação {from_currency.upper()}/{to_currency.upper()} obtida com sucesso",
-                    "closing_message": "Cotação finalizada. Precisa de outra consulta?"
-                }
-            else:
-                return {"success": False, "message": "Par de moedas não encontrado na resposta", "raw": data}
-        else:
-            return {"success": False, "message": f"Erro ao consultar API: {resp.status_code}", "raw": resp.text}
+        quote = get_quote_service().get_quote(from_currency, to_currency)
+
+        result = {
+            "success": True,
+            "from": from_currency.upper(),
+            "to": to_currency.upper(),
+            "rate": quote.rate,
+            "raw": quote.raw,
+            "message": f"Cotação {from_currency.upper()}/{to_currency.upper()} obtida com sucesso",
+            "closing_message": "Cotação finalizada. Precisa de outra consulta?"
+        }
+        if quote.stale:
+            result["stale"] = True
+        return result
 
+    except QuoteError as e:
+        return {"success": False, "message": str(e), "raw": e.raw}
     except Exception as e:
         return {"success": False, "message": f"Erro ao buscar cotação: {str(e)}"}
 
 
+@tool
+def quote_currencies(pairs: list[str]) -> dict:
+    """Busca de uma só vez a cotação de vários pares de moedas usando AwesomeAPI.
+
+    Use quando o cliente pedir mais de uma cotação na mesma mensagem
+    (ex: "dólar, euro e libra em reais"): todos os pares são consultados em
+    uma única chamada.
+
+    Args:
+        pairs: lista de pares no formato "MOEDA_BASE-MOEDA_ALVO" (ex: ["USD-BRL", "EUR-BRL", "GBP-BRL"])
+
+    Returns:
+        dict com `success`, `rates` (par -> cotação), `errors` (par -> motivo) e `message`.
+    """
+    try:
+        service = get_quote_service()
+        rates: dict[str, float] = {}
+        errors: dict[str, str] = {}
+        stale: list[str] = []
+
+        valid_pairs = []
+        for pair in pairs:
+            try:
+                valid_pairs.append(service.parse_pair(pair))
+            except ValueError as e:
+                errors[pair] = str(e)
+
+        for pair, result in service.get_quotes(valid_pairs).items():
+            if isinstance(result, Exception):
+                errors[pair] = str(result)
+                continue
+            rates[pair] = result.rate
+            if result.stale:
+                stale.append(pair)
+
+        response = {
+            "success": bool(rates),
+            "rates": rates,
+            "message": f"{len(rates)} de {len(pairs)} cotações obtidas com sucesso",
+        }
+        if errors:
+            response["errors"] = errors
+        if stale:
+            response["stale"] = stale
+        return response
+
+    except Exception as e:
+        return {"success": False, "message": f"Erro ao buscar cotações: {str(e)}"}
+
+
 @tool
 def solicitar_aumento_limite(cpf: str, novo_limite_solicitado: float) -> dict:
     """Registra e processa solicitação de Alteração de Limite.
@@ -117,112 +150,11 @@ def solicitar_aumento_limite(cpf: str, novo_limite_solicitado: float) -> dict:
         dict com resultado, status final e mensagens amigáveis.
     """
     try:
-        users_path = DB_PATH / "users.csv"
-        score_table_path = DB_PATH / "score_limite.csv"
-        solicitacoes_path = DB_PATH / "solicitacoes_aumento_limite.csv"
-        # base = Path(__file__).parent
-        # users_path = base / "users.csv"
-        # score_table_path = base / "score_limite.csv"
-        # solicitacoes_path = base / "solicitacoes_aumento_limite.csv"
-
-        if not users_path.exists():
-            return {"success": False, "message": "Arquivo users.csv não encontrado"}
-        
-
-        conta = None
-        with open(users_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get("cpf") == cpf:
-                    conta = row
-                    break
-
-        if conta is None:
-            return {"success": False, "message": "Conta/CPF não encontrado em accounts.csv"}
-
-        try:
-            limite_atual = float(conta.get("limite_atual", 0))
-        except Exception:
-            limite_atual = 0.0
-
-        try:
-            score = int(conta.get("score", 0))
-        except Exception:
-            score = 0
-
-        # Determinar limite permitido a partir da tabela de score
-        if not score_table_path.exists():
-            return {"success": False, "message": "Arquivo score_limite.csv não encontrado"}
-
-        permitido = False
-        max_allowed = None
-        with open(score_table_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    min_s = int(row.get("min_score", 0))
-                    max_s = int(row.get("max_score", 0))
-                    allowed = float(row.get("max_allowed_limit", 0))
-                except Exception:
-                    continue
-                if min_s <= score <= max_s:
-                    max_allowed = allowed
-                    break
-
-        if max_allowed is None:
-            return {"success": False, "message": "Nenhuma regra de limite encontrada para o score do cliente"}
-
-        status = "rejeitado"
-        if float(novo_limite_solicitado) <= float(max_allowed):
-            status = "aprovado"
-
-        # Registrar solicitação (append). Se arquivo vazio, manter header já criado.
-        timestamp = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
-        header = ["cpf_cliente", "data_hora_solicitacao", "limite_atual", "novo_limite_solicitado", "status_pedido"]
-        write_header = False
-        if not solicitacoes_path.exists():
-            write_header = True
-
-        with open(solicitacoes_path, "a", encoding="utf-8", newline="") as f:
-            writer = csv.writer(f)
-            if write_header:
-                writer.writerow(header)
-            writer.writerow([cpf, timestamp, f"{limite_atual:.2f}", f"{float(novo_limite_solicitado):.2f}", status])
-
-        # Se aprovado, atualizar o limite_atual em users.csv
-        if status == "aprovado":
-
-            all_users = []
-            fieldnames = ["cpf", "data_nascimento", "nome", "limite_atual", "score"]
-
-            with open(users_path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row["cpf"] == cpf:
-                        row["limite_atual"] = f"{float(novo_limite_solicitado):.2f}"
-                    all_users.append(row)
-
-            with open(users_path, "w", encoding="utf-8", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(all_users)
-
-            
-            if fieldnames is not None:
-                with open(users_path, "w", encoding="utf-8", newline="") as f:
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(all_users)
-
-        response = {
-            "success": True,
-            "cpf": cpf,
-            "limite_atual": limite_atual,
-            "novo_limite_solicitado": float(novo_limite_solicitado),
-            "status_pedido": status,
-            "max_allowed_for_score": max_allowed,
-            "message": ("Solicitação aprovada" if status == "aprovado" else "Solicitação rejeitada"),
-        }
+        # Mesmas regras (e o mesmo lock por CPF) do processamento em lote de limits.py
+        response = request_limit_increase(cpf, novo_limite_solicitado)
+        if not response["success"]:
+            return response
+        status = response["status_pedido"]
 
         if status == "rejeitado":
             response["closing_message"] = "Lamentamos — sua solicitação foi rejeitada. Se precisar de mais informações, entre em contato com o atendimento."
@@ -272,95 +204,31 @@ def recalcular_score(
         dict com sucesso, novo_score, score_anterior, mensagem e redirecionamento.
     """
     try:
-        users_path = DB_PATH / "users.csv"
+        storage = get_storage()
 
-        if not users_path.exists():
+        if not storage.users_available():
             return {"success": False, "message": "Arquivo users.csv não encontrado"}
 
-        # Pesos da fórmula
-        peso_renda = 30
-        peso_emprego = {
-            "formal": 300,
-            "autônomo": 200,
-            "desempregado": 0
-        }
-        peso_dependentes = {
-            0: 100,
-            1: 80,
-            2: 60,
-            "3+": 30
-        }
-        peso_dividas = {
-            "sim": -100,
-            "não": 100
-        }
-
-        # Validar tipo de emprego
-        if tipo_emprego.lower() not in peso_emprego:
-            return {
-                "success": False,
-                "message": f"Tipo de emprego inválido. Use: formal, autônomo ou desempregado"
-            }
-
-        # Validar tem_dividas
-        if tem_dividas.lower() not in peso_dividas:
-            return {
-                "success": False,
-                "message": "Resposta sobre dívidas inválida. Use: sim ou não"
-            }
-
-        # Validar num_dependentes e mapear para a chave correta
-        if num_dependentes < 0:
-            return {
-                "success": False,
-                "message": "Número de dependentes não pode ser negativo"
-            }
-        
-        dependentes_key = "3+" if num_dependentes >= 3 else num_dependentes
-
-        # Validar renda e despesas
-        if renda_mensal < 0 or despesas_fixas < 0:
-            return {
-                "success": False,
-                "message": "Renda e despesas não podem ser negativas"
-            }
-
-        # Calcular novo score
-        relacao_renda_despesa = renda_mensal / (despesas_fixas + 1)
-        novo_score = int(
-            (relacao_renda_despesa * peso_renda) +
-            peso_emprego[tipo_emprego.lower()] +
-            peso_dependentes[dependentes_key] +
-            peso_dividas[tem_dividas.lower()]
-        )
-
-        # Limitar score entre 0 e 1000
-        novo_score = max(0, min(1000, novo_score))
+        # Mesma fórmula (e pesos) do recálculo em lote de scoring.py
+        try:
+            novo_score = compute_score(
+                renda_mensal, tipo_emprego, despesas_fixas, num_dependentes, tem_dividas
+            )
+        except ScoreInputError as e:
+            return {"success": False, "message": str(e)}
 
         # Buscar score anterior e atualizar users.csv
-        score_anterior = None
-        all_users = []
-        fieldnames = ["cpf", "data_nascimento", "nome", "limite_atual", "score"]
-
-        with open(users_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row["cpf"] == cpf:
-                    score_anterior = int(row.get("score", 0))
-                    row["score"] = str(novo_score)
-                all_users.append(row)
-
-        if score_anterior is None:
-            return {
-                "success": False,
-                "message": f"Cliente com CPF {cpf} não encontrado na base de dados"
-            }
+        with storage.customer_lock(cpf):
+            conta = storage.get_user(cpf)
+
+            if conta is None:
+                return {
+                    "success": False,
+                    "message": f"Cliente com CPF {cpf} não encontrado na base de dados"
+                }
 
-        # Escrever dados atualizados
-        with open(users_path, "w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(all_users)
+            score_anterior = int(conta.get("score", 0))
+            storage.update_user(cpf, score=str(novo_score))
 
         # Calcular mudança de score
         diferenca_score = novo_score - score_anterior
@@ -392,5 +260,5 @@ def encerrar_conversa() -> dict:
         return {"success": False, "message": f"Falha ao encerrar a conversa: {str(e)}"}
 
 
-TOOLS: list[BaseTool] = [triagem, quote_currency, solicitar_aumento_limite, recalcular_score, encerrar_conversa]
+TOOLS: list[BaseTool] = [triagem, quote_currency, quote_currencies, solicitar_aumento_limite, recalcular_score, encerrar_conversa]
 TOOLS_BY_NAME: dict[str, BaseTool] = {tool.name: tool for tool in TOOLS}
@@ -1,17 +1,147 @@
 import os
-from langchain.chat_models import BaseChatModel, init_chat_model
-from langchain_ollama import ChatOllama
+import threading
+from collections.abc import Sequence
+from dataclasses import dataclass
 
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
 
-# def load_llm() -> BaseChatModel:
-#     api_key = os.getenv("OPENAI_API_KEY")
-#     return init_chat_model("gpt-4o-mini", api_key=api_key)
-    # api_key = os.getenv("GOOGLE_API_KEY")
-    # return init_chat_model("gemini-2.0-flash-lite", api_key=api_key)
+DEFAULT_MODELS = {
+    "ollama": "gpt-oss:20b",
+    "openai": "gpt-4o-mini",
+    "gemini": "gemini-2.0-flash-lite",
+    "fake": "fake-banking",
+    "scripted": "scripted-banking",
+}
+
+
+@dataclass(frozen=True)
+class LLMConfig:
+    provider: str = "ollama"
+    model: str = DEFAULT_MODELS["ollama"]
+    base_url: str = "http://localhost:11434"  # padrão do Ollama
+    temperature: float = 0.2
+    keep_alive: str = "30m"
+    # Fixo: mudar o num_ctx entre chamadas faz o Ollama recarregar o modelo
+    # (e descartar o cache KV do prefixo)
+    num_ctx: int = 16384
+
+    @classmethod
+    def from_env(cls) -> "LLMConfig":
+        provider = os.getenv("BANK_LLM_PROVIDER", "ollama").lower()
+        if provider not in DEFAULT_MODELS:
+            msg = f"Provedor de LLM desconhecido: {provider}"
+            raise ValueError(msg)
+        return cls(
+            provider=provider,
+            model=os.getenv("BANK_LLM_MODEL", DEFAULT_MODELS[provider]),
+            base_url=os.getenv("OLLAMA_BASE_URL", cls.base_url),
+            temperature=float(os.getenv("BANK_LLM_TEMPERATURE", str(cls.temperature))),
+            keep_alive=os.getenv("BANK_LLM_KEEP_ALIVE", cls.keep_alive),
+            num_ctx=int(os.getenv("BANK_LLM_NUM_CTX", str(cls.num_ctx))),
+        )
+
+
+def load_llm(config: LLMConfig | None = None) -> BaseChatModel:
+    """Cria um novo cliente de chat para o provedor configurado."""
+    config = config or LLMConfig.from_env()
+
+    # Clientes importados só quando usados: langchain_ollama e os
+    # integradores do init_chat_model pesam na inicialização
+    if config.provider == "openai":
+        from langchain.chat_models import init_chat_model  # noqa: PLC0415
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        return init_chat_model(
+            config.model,
+            model_provider="openai",
+            api_key=api_key,
+            temperature=config.temperature,
+        )
+    if config.provider == "gemini":
+        from langchain.chat_models import init_chat_model  # noqa: PLC0415
+
+        api_key = os.getenv("GOOGLE_API_KEY")
+        return init_chat_model(
+            config.model,
+            model_provider="google_genai",
+            api_key=api_key,
+            temperature=config.temperature,
+        )
+
+    if config.provider in ("fake", "scripted"):
+        from fake_llm import FakeChatModel, ScriptedChatModel  # noqa: PLC0415
+
+        # Modelos determinísticos para testes de carga e benchmarks (sem Ollama)
+        delays = {
+            "token_delay": float(os.getenv("BANK_FAKE_TOKEN_DELAY", "0")),
+            "prompt_delay": float(os.getenv("BANK_FAKE_PROMPT_DELAY", "0")),
+        }
+        if config.provider == "scripted":
+            return ScriptedChatModel.from_file(os.environ["BANK_FAKE_SCRIPT"], **delays)
+        return FakeChatModel(**delays)
+
+    from langchain_ollama import ChatOllama  # noqa: PLC0415
 
-def load_llm() -> BaseChatModel:
     return ChatOllama(
-        model="gpt-oss:20b",
-        base_url="http://localhost:11434",  # padrão do Ollama
-        temperature=0.2,
-    )
\ No newline at end of file
+        model=config.model,
+        base_url=config.base_url,
+        temperature=config.temperature,
+        # Mantém o modelo carregado no Ollama entre os turnos
+        keep_alive=config.keep_alive,
+        num_ctx=config.num_ctx,
+    )
+
+
+BoundLLM = Runnable[LanguageModelInput, BaseMessage]
+
+_bound_llms: dict[tuple[LLMConfig, tuple[str, ...]], BoundLLM] = {}
+_bound_llms_lock = threading.Lock()
+
+
+def get_llm_with_tools(
+    tools: Sequence[BaseTool], config: LLMConfig | None = None
+) -> BoundLLM:
+    """Modelo com as tools vinculadas, construído uma vez por configuração.
+
+    Reutiliza o mesmo cliente (e o pool de conexões HTTP dele) e a mesma
+    serialização dos schemas das tools em todos os turnos.
+    """
+    config = config or LLMConfig.from_env()
+    key = (config, tuple(tool.name for tool in tools))
+
+    bound = _bound_llms.get(key)
+    if bound is not None:
+        return bound
+
+    with _bound_llms_lock:
+        bound = _bound_llms.get(key)
+        if bound is None:
+            bound = load_llm(config).bind_tools(tools)
+            _bound_llms[key] = bound
+        return bound
+
+
+def prewarm_llm(tools: Sequence[BaseTool], config: LLMConfig | None = None) -> None:
+    """Constrói o modelo vinculado e, no Ollama, já carrega o modelo na memória."""
+    config = config or LLMConfig.from_env()
+    get_llm_with_tools(tools, config)
+
+    if config.provider == "ollama":
+        from ollama import Client  # noqa: PLC0415
+
+        from prompt_prefix import get_prompt_prefix  # noqa: PLC0415
+
+        # Carrega o modelo já com o num_ctx usado nas conversas e processa o
+        # prefixo (system prompt + tools): a primeira pergunta encontra o
+        # cache KV pronto. Só um token é gerado.
+        prefix = get_prompt_prefix(tools)
+        Client(host=config.base_url).chat(
+            model=config.model,
+            messages=[{"role": "system", "content": prefix.system_prompt}],
+            tools=list(prefix.tool_schemas),
+            options={"num_ctx": config.num_ctx, "num_predict": 1},
+            keep_alive=config.keep_alive,
+        )
@@ -0,0 +1,226 @@
+import atexit
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, TextIO
+
+LOCK_SUFFIX = ".lock"
+
+
+class FileLock:
+    """Trava exclusiva entre processos em `<arquivo>.lock`.
+
+    Usa `fcntl.flock` no Linux/macOS e `msvcrt.locking` no Windows, sempre
+    em modo não bloqueante com novas tentativas até `timeout` segundos.
+    """
+
+    def __init__(self, path: Path, timeout: float = 30.0) -> None:
+        self.path = path.with_name(path.name + LOCK_SUFFIX)
+        self.timeout = timeout
+        self._file: Any = None
+
+    def __enter__(self) -> "FileLock":
+        handle = open(self.path, "a+b")  # noqa: SIM115
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _lock(handle)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    handle.close()
+                    msg = f"Tempo esgotado aguardando a trava {self.path}"
+                    raise TimeoutError(msg) from None
+                time.sleep(0.005)
+        self._file = handle
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        handle, self._file = self._file, None
+        try:
+            _unlock(handle)
+        finally:
+            handle.close()
+
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock(handle: Any) -> None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock(handle: Any) -> None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock(handle: Any) -> None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock(handle: Any) -> None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write(path: Path, write: Callable[[TextIO], None]) -> None:
+    """Grava em um temporário no mesmo diretório e troca com `os.replace`.
+
+    Leitores veem o arquivo antigo ou o novo por inteiro, nunca um meio
+    termo, mesmo se o processo cair no meio da escrita.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class KeyLocks:
+    """Um lock por chave (ex.: CPF), criado sob demanda e descartado ao liberar."""
+
+    def __init__(self) -> None:
+        self._locks: dict[str, tuple[threading.Lock, int]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        with self._lock:
+            lock, holders = self._locks.get(key) or (threading.Lock(), 0)
+            self._locks[key] = (lock, holders + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, holders = self._locks[key]
+                if holders == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, holders - 1)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+@dataclass(slots=True)
+class WriteStats:
+    requests: int = 0
+    flushes: int = 0
+    errors: int = 0
+    flush_seconds: float = 0.0
+
+    @property
+    def coalescing(self) -> float:
+        """Pedidos atendidos, em média, por regravação."""
+        return self.requests / self.flushes if self.flushes else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self) | {
+            "flush_seconds": round(self.flush_seconds, 4),
+            "coalescing": round(self.coalescing, 2),
+        }
+
+
+class WriteCoordinator:
+    """Junta pedidos de gravação em uma única regravação (commit em grupo).
+
+    `request()` registra o pedido e espera a regravação que o inclui. Uma
+    thread em segundo plano aguarda `window` segundos a partir do primeiro
+    pedido pendente, chama `flush` uma vez para todos os que chegaram nesse
+    intervalo e acorda quem estava esperando (ou propaga o erro).
+    """
+
+    def __init__(self, flush: Callable[[], None], window: float = 0.005, name: str = "writer") -> None:
+        self.flush = flush
+        self.window = window
+        self.stats = WriteStats()
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._requested = 0
+        self._flushed = 0
+        self._error: tuple[int, BaseException] | None = None
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._flush_loop, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def request(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._closed:
+                # Sem a thread (encerramento): grava na hora
+                self.stats.requests += 1
+                error = self._run_flush()
+                if error is not None:
+                    msg = "Falha ao gravar as alterações"
+                    raise RuntimeError(msg) from error
+                return
+            self._requested += 1
+            self.stats.requests += 1
+            seq = self._requested
+            self._done.notify_all()
+            if not wait:
+                return
+            while self._flushed < seq:
+                self._done.wait()
+            if self._error is not None and self._error[0] >= seq:
+                msg = "Falha ao gravar as alterações"
+                raise RuntimeError(msg) from self._error[1]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._done.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _flush_loop(self) -> None:
+        with self._lock:
+            while True:
+                while self._requested == self._flushed and not self._closed:
+                    self._done.wait()
+                if self._requested == self._flushed:
+                    return
+
+                # Janela de coalescência: pedidos que chegarem agora saem juntos
+                deadline = time.monotonic() + self.window
+                while not self._closed and (remaining := deadline - time.monotonic()) > 0:
+                    self._done.wait(remaining)
+
+                target = self._requested
+                error = self._run_flush()
+                self._error = (target, error) if error is not None else None
+                self._flushed = target
+                self._done.notify_all()
+
+    def _run_flush(self) -> BaseException | None:
+        """Chama `flush` fora do lock; devolve o erro em vez de propagá-lo."""
+        self._lock.release()
+        started = time.perf_counter()
+        try:
+            self.flush()
+            error = None
+        except Exception as e:  # noqa: BLE001
+            error = e
+        finally:
+            self._lock.acquire()
+        self.stats.flushes += 1
+        self.stats.flush_seconds += time.perf_counter() - started
+        if error is not None:
+            self.stats.errors += 1
+        return error
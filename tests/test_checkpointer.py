@@ -0,0 +1,131 @@
+import operator
+import sqlite3
+from pathlib import Path
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+import checkpointer
+from checkpointer import BoundedSaver
+
+
+class Counter(TypedDict):
+    total: Annotated[int, operator.add]
+
+
+def counter_graph(saver: BoundedSaver):  # noqa: ANN201
+    builder = StateGraph(Counter)
+    builder.add_node("soma", lambda state: {"total": 1})
+    builder.add_edge(START, "soma")
+    builder.add_edge("soma", END)
+    return builder.compile(checkpointer=saver)
+
+
+def run(graph, thread_id: str) -> int:  # noqa: ANN001
+    config = {"configurable": {"thread_id": thread_id}}
+    return graph.invoke({"total": 0}, config)["total"]
+
+
+def test_keeps_only_the_last_checkpoints():
+    saver = BoundedSaver(keep_last=2)
+    graph = counter_graph(saver)
+
+    for _ in range(5):
+        run(graph, "a")
+
+    assert run(graph, "a") == 6  # noqa: PLR2004
+    assert saver.stats()["checkpoints_in_memory"] == 2  # noqa: PLR2004
+    assert saver.counters["pruned"] > 0
+
+
+def test_evicts_least_recently_used_threads():
+    saver = BoundedSaver(max_threads=2)
+    graph = counter_graph(saver)
+
+    for thread_id in ("a", "b", "c"):
+        run(graph, thread_id)
+
+    assert saver.counters["evictions"] == 1
+    assert saver.stats()["threads_in_memory"] == 2  # noqa: PLR2004
+    # Sem disco, a thread evictada recomeça do zero
+    assert run(graph, "a") == 1
+
+
+def test_evicts_idle_threads(monkeypatch: pytest.MonkeyPatch):
+    now = 1000.0
+    monkeypatch.setattr(checkpointer.time, "monotonic", lambda: now)
+    saver = BoundedSaver(idle_ttl=60)
+    graph = counter_graph(saver)
+
+    run(graph, "a")
+    now += 120
+    run(graph, "b")
+
+    assert saver.counters["evictions"] == 1
+    assert "a" not in saver.storage
+
+
+def test_restores_evicted_threads_from_disk(tmp_path: Path):
+    saver = BoundedSaver(tmp_path / "checkpoints.sqlite3", max_threads=1)
+    graph = counter_graph(saver)
+
+    run(graph, "a")
+    run(graph, "a")
+    run(graph, "b")
+
+    assert "a" not in saver.storage
+    assert run(graph, "a") == 3  # noqa: PLR2004
+    assert saver.counters["restores"] >= 1
+    assert saver.flush(timeout=5)
+    saver.close()
+
+    # Um processo novo continua de onde a thread parou
+    restarted = BoundedSaver(tmp_path / "checkpoints.sqlite3")
+    assert run(counter_graph(restarted), "b") == 2  # noqa: PLR2004
+    restarted.close()
+
+
+def test_delete_thread_removes_memory_and_disk(tmp_path: Path):
+    saver = BoundedSaver(tmp_path / "checkpoints.sqlite3")
+    graph = counter_graph(saver)
+    run(graph, "a")
+    assert saver.flush(timeout=5)
+
+    saver.delete_thread("a")
+
+    assert "a" not in saver.storage
+    assert run(graph, "a") == 1
+    saver.close()
+
+
+def test_write_errors_are_retried_then_dropped(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(checkpointer, "WRITE_RETRY_DELAY", 0.01)
+    saver = BoundedSaver(tmp_path / "checkpoints.sqlite3")
+
+    def locked(batch: object) -> int:
+        msg = "database is locked"
+        raise sqlite3.OperationalError(msg)
+
+    monkeypatch.setattr(saver, "_write_batch", locked)
+    graph = counter_graph(saver)
+    run(graph, "a")
+
+    assert saver.flush(timeout=5)
+    assert saver.counters["write_errors"] == checkpointer.WRITE_ATTEMPTS
+    assert saver.counters["writes"] == 0
+    # A conexão continua utilizável depois das falhas
+    saver.delete_thread("a")
+    saver.close()
+
+
+def test_session_bytes_counts_thread_state():
+    saver = BoundedSaver()
+    graph = counter_graph(saver)
+    run(graph, "a")
+
+    assert saver.session_bytes("a") > 0
+    assert saver.session_bytes("b") == 0
+    assert saver.stats()["bytes_per_session_max"] == saver.session_bytes("a")
@@ -0,0 +1,76 @@
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+
+from context import ContextConfig, build_prompt, manage_context
+
+SYSTEM = SystemMessage("Você é o assistente do Banco Ágil.")
+USER = {"nome": "Ana", "cpf": "12345678901", "data_nascimento": "1990-01-01"}
+
+
+def conversation(turns: int, words: int = 5) -> list[BaseMessage]:
+    messages: list[BaseMessage] = [SYSTEM]
+    for i in range(turns):
+        messages += [
+            HumanMessage(f"pergunta {i} " + "palavra " * words, id=f"h{i}"),
+            AIMessage("", tool_calls=[{"name": "triagem", "args": {}, "id": f"c{i}"}], id=f"a{i}"),
+            ToolMessage('{"sucesso": true}', tool_call_id=f"c{i}", name="triagem", id=f"t{i}"),
+            AIMessage(f"resposta {i}", id=f"r{i}"),
+        ]
+    return messages
+
+
+def test_context_goes_right_before_the_current_turn():
+    messages = conversation(3)
+    prompt = build_prompt(
+        {"messages": messages, "authenticated_user": USER, "summary": "- Cliente: oi"}
+    )
+
+    context = [m for m in prompt if isinstance(m, SystemMessage) and m is not SYSTEM]
+    assert prompt[0] is SYSTEM
+    assert len(context) == 1
+    position = prompt.index(context[0])
+    assert prompt[position + 1].id == "h2"
+    assert [m.id for m in prompt[1:position]] == [m.id for m in messages[1:9]]
+    assert "nome=Ana" in context[0].text
+    assert "- Cliente: oi" in context[0].text
+
+
+def test_summary_change_keeps_the_history_prefix():
+    messages = conversation(3)
+    before = build_prompt({"messages": messages, "summary": "- Cliente: oi"})
+    after = build_prompt({"messages": messages, "summary": "- Cliente: oi\n- Cliente: tudo bem"})
+
+    stable = len(messages) - 4
+    assert before[:stable] == after[:stable]
+    assert before[stable].text != after[stable].text
+
+
+def test_budget_drops_old_turns_but_keeps_the_current_one():
+    messages = conversation(6, words=200)
+    settings = ContextConfig(max_tokens=600)
+
+    prompt = build_prompt({"messages": messages, "authenticated_user": USER}, settings)
+
+    humans = [m.id for m in prompt if isinstance(m, HumanMessage)]
+    assert humans[-1] == "h5"
+    assert len(humans) < 6  # noqa: PLR2004
+    assert prompt[0] is SYSTEM
+
+
+def test_manage_context_summarizes_old_turns():
+    messages = conversation(6, words=200)
+    settings = ContextConfig(summary_trigger=500, keep_turns=2)
+
+    update = manage_context({"messages": messages}, settings)
+
+    removed = {m.id for m in update["messages"] if isinstance(m, RemoveMessage)}
+    assert removed == {m.id for m in messages[1:17]}
+    assert update["summary"].count("- Cliente: pergunta") == 4  # noqa: PLR2004
+    assert update["pruned_tokens"] > 0
+    assert manage_context({"messages": conversation(1)}, settings) == {}
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import pytest
+
+from fx import CurrencyQuoteService, Quote, QuoteError
+
+
+class StubServer(ThreadingHTTPServer):
+    """Stub da AwesomeAPI: cotações configuráveis, falhas e registro dos acessos."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.rates = {"USD-BRL": "5.10", "EUR-BRL": "6.20", "GBP-BRL": "7.30"}
+        self.status = 200
+        self.delay = 0.0
+        self.requests: list[list[str]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/json/last"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        pairs = self.path.rstrip("/").rsplit("/", 1)[-1].split(",")
+        with self.server.lock:
+            self.server.requests.append(pairs)
+        time.sleep(self.server.delay)
+
+        if self.server.status != 200:  # noqa: PLR2004
+            self._send(self.server.status, {"message": "indisponível"})
+        elif any(pair not in self.server.rates for pair in pairs):
+            # Como a API real: um par desconhecido derruba o lote inteiro
+            self._send(404, {"code": "CoinNotExists"})
+        else:
+            self._send(
+                200,
+                {
+                    pair.replace("-", ""): {"bid": self.server.rates[pair]}
+                    for pair in pairs
+                },
+            )
+
+    def _send(self, status: int, data: dict[str, Any]) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub() -> Iterator[StubServer]:
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_service(stub: StubServer, **kwargs: Any) -> CurrencyQuoteService:
+    return CurrencyQuoteService(base_url=stub.url, timeout=5, **kwargs)
+
+
+def test_hit_and_miss_counters(stub: StubServer):
+    service = make_service(stub)
+
+    first = service.get_quote("usd", "brl")
+    second = service.get_quote("USD", "BRL")
+
+    assert first.rate == second.rate == 5.10  # noqa: PLR2004
+    assert len(stub.requests) == 1
+    assert service.stats.misses == 1
+    assert service.stats.hits == 1
+    assert service.stats.hit_rate == 0.5  # noqa: PLR2004
+
+
+def test_ttl_expiry_refetches(stub: StubServer):
+    service = make_service(stub, ttl=0.05)
+
+    service.get_quote("USD", "BRL")
+    stub.rates["USD-BRL"] = "5.55"
+    assert service.get_quote("USD", "BRL").rate == 5.10  # noqa: PLR2004
+    time.sleep(0.1)
+
+    assert service.get_quote("USD", "BRL").rate == 5.55  # noqa: PLR2004
+    assert len(stub.requests) == 2  # noqa: PLR2004
+    assert service.stats.misses == 2  # noqa: PLR2004
+    assert service.stats.hits == 1
+
+
+def test_lru_eviction(stub: StubServer):
+    service = make_service(stub, max_entries=2)
+
+    service.get_quote("USD", "BRL")
+    service.get_quote("EUR", "BRL")
+    service.get_quote("USD", "BRL")  # USD passa a ser o mais recente
+    service.get_quote("GBP", "BRL")  # descarta EUR
+
+    assert service.stats.evictions == 1
+    requests_before = len(stub.requests)
+    service.get_quote("USD", "BRL")
+    assert len(stub.requests) == requests_before
+    service.get_quote("EUR", "BRL")
+    assert len(stub.requests) == requests_before + 1
+
+
+def test_single_flight_coalesces_concurrent_misses(stub: StubServer):
+    service = make_service(stub)
+    stub.delay = 0.2
+    workers = 10
+    barrier = threading.Barrier(workers)
+    results: list[Quote] = []
+
+    def fetch() -> None:
+        barrier.wait()
+        results.append(service.get_quote("USD", "BRL"))
+
+    threads = [threading.Thread(target=fetch) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == workers
+    assert len(stub.requests) == 1
+    assert service.stats.misses == 1
+    assert service.stats.coalesced == workers - 1
+
+
+def test_stale_quote_served_on_5xx(stub: StubServer):
+    service = make_service(stub, ttl=0.05)
+    fresh = service.get_quote("USD", "BRL")
+    time.sleep(0.1)
+    stub.status = 503
+
+    stale = service.get_quote("USD", "BRL")
+
+    assert stale.stale
+    assert stale.rate == fresh.rate
+    assert stale.fetched_at == fresh.fetched_at
+    assert service.stats.upstream_errors == 1
+    assert service.stats.stale_served == 1
+
+
+def test_5xx_without_cache_raises(stub: StubServer):
+    service = make_service(stub)
+    stub.status = 502
+
+    with pytest.raises(QuoteError):
+        service.get_quote("USD", "BRL")
+    assert service.stats.upstream_errors == 1
+
+
+def test_batch_404_retries_each_pair(stub: StubServer):
+    service = make_service(stub)
+
+    results = service.get_quotes(["USD-BRL", "XYZ-BRL", "EUR-BRL"])
+
+    assert isinstance(results["USD-BRL"], Quote)
+    assert isinstance(results["EUR-BRL"], Quote)
+    assert isinstance(results["XYZ-BRL"], Exception)
+    assert stub.requests[0] == ["USD-BRL", "XYZ-BRL", "EUR-BRL"]
+    assert sorted(map(tuple, stub.requests[1:])) == [
+        ("EUR-BRL",),
+        ("USD-BRL",),
+        ("XYZ-BRL",),
+    ]
+    # Os pares válidos ficaram em cache; o inválido continua sendo buscado
+    service.get_quote("USD", "BRL")
+    assert len(stub.requests) == 4  # noqa: PLR2004
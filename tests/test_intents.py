@@ -0,0 +1,115 @@
+import pytest
+
+from intents import (
+    FAST_PATH_STATS,
+    Intent,
+    classify,
+    format_brl,
+    record_turn,
+    render_reply,
+)
+
+
+@pytest.mark.parametrize(
+    ("text", "args"),
+    [
+        (
+            "12345678901 1990-01-31",
+            {"cpf": "12345678901", "data_nascimento": "1990-01-31"},
+        ),
+        (
+            "meu cpf é 123.456.789-01 e nasci em 31/01/1990",
+            {"cpf": "12345678901", "data_nascimento": "1990-01-31"},
+        ),
+    ],
+)
+def test_authentication_messages_call_triagem(text: str, args: dict[str, str]):
+    assert classify(text, authenticated=False, failed_logins=0) == Intent(
+        "authenticate", "triagem", args
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "12345678901",
+        "12345678901 1990-01-31 e 1991-01-31",
+        "12345678901 1990-01-31, quero aumentar o limite",
+        "oi, tudo bem?",
+    ],
+)
+def test_ambiguous_login_messages_go_to_the_llm(text: str):
+    assert classify(text, authenticated=False, failed_logins=0) is None
+
+
+def test_third_login_attempt_is_left_to_the_llm():
+    assert (
+        classify("12345678901 1990-01-31", authenticated=False, failed_logins=2) is None
+    )
+
+
+def test_exit_is_matched_before_anything_else():
+    for authenticated in (False, True):
+        intent = classify(" Tchau! ", authenticated=authenticated, failed_logins=0)
+        assert intent == Intent("exit", "encerrar_conversa", {})
+    assert classify("tchau, obrigado", authenticated=True, failed_logins=0) is None
+
+
+@pytest.mark.parametrize(
+    ("text", "intent"),
+    [
+        (
+            "USD para BRL",
+            Intent(
+                "quote",
+                "quote_currency",
+                {"from_currency": "USD", "to_currency": "BRL"},
+            ),
+        ),
+        (
+            "usd-brl",
+            Intent(
+                "quote",
+                "quote_currency",
+                {"from_currency": "USD", "to_currency": "BRL"},
+            ),
+        ),
+        (
+            "cotação do USD, EUR e USD em BRL",
+            Intent("quote_many", "quote_currencies", {"pairs": ["USD-BRL", "EUR-BRL"]}),
+        ),
+        ("USD para XYZ", None),
+        ("quero aumentar meu limite para 5000", None),
+    ],
+)
+def test_quotes_need_an_authenticated_session(text: str, intent: Intent | None):
+    assert classify(text, authenticated=True, failed_logins=0) == intent
+    assert classify(text, authenticated=False, failed_logins=0) is None
+
+
+def test_replies_are_rendered_from_the_tool_result():
+    login = {"sucesso": True, "usuario": {"nome": "Ana"}}
+    assert render_reply("triagem", login).startswith("Olá, Ana! 👋")
+    assert "CPF ou data de nascimento incorretos" in render_reply(
+        "triagem", {"sucesso": False}
+    )
+
+    quote = {"success": True, "from": "USD", "to": "BRL", "rate": 5123.4}
+    assert "USD/BRL: **5.123,4000**" in render_reply("quote_currency", quote)
+    many = {"rates": {"USD-BRL": 5.0}, "errors": {"EUR-BRL": "indisponível"}}
+    reply = render_reply("quote_currencies", many)
+    assert "- USD/BRL: **5,0000**" in reply
+    assert "- EUR-BRL: ⚠️ indisponível" in reply
+    assert render_reply("triagem", "falhou").startswith("⚠️")
+    assert format_brl(1234567.891) == "1.234.567,8910"
+
+
+def test_record_turn_counts_served_intents():
+    before = (FAST_PATH_STATS.turns, FAST_PATH_STATS.served)
+
+    record_turn(None)
+    record_turn(Intent("exit", "encerrar_conversa", {}))
+
+    assert FAST_PATH_STATS.turns == before[0] + 2
+    assert FAST_PATH_STATS.served == before[1] + 1
+    assert FAST_PATH_STATS.by_intent["exit"] >= 1
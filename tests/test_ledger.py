@@ -0,0 +1,139 @@
+import multiprocessing
+import threading
+from pathlib import Path
+
+import pytest
+
+from ledger import Ledger, LedgerConfig, _index_path
+
+FIELDS = ["cpf", "data_hora", "valor", "status"]
+
+
+def make_ledger(path: Path, **kwargs: object) -> Ledger:
+    config = LedgerConfig(**{"fsync": "never", "flush_interval": 0.01} | kwargs)  # type: ignore[arg-type]
+    return Ledger(path, FIELDS, config)
+
+
+def row(cpf: str, i: int, status: str = "aprovado") -> dict[str, object]:
+    return {"cpf": cpf, "data_hora": f"2025-01-01T00:00:{i:02d}Z", "valor": i, "status": status}
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> Path:
+    return tmp_path / "pedidos.csv"
+
+
+def test_recent_and_stats_include_unflushed_rows(path: Path):
+    ledger = make_ledger(path, flush_interval=60)
+    ledger.append(row("111", 1))
+    ledger.append(row("111", 2, "rejeitado"))
+    ledger.append(row("222", 3))
+
+    assert [r["valor"] for r in ledger.recent("111")] == ["2", "1"]
+    stats = ledger.stats("111")
+    assert (stats.total, stats.aprovados, stats.rejeitados) == (2, 1, 1)
+    assert ledger.stats("111", since="2025-01-01T00:00:02Z").total == 1
+    ledger.close()
+
+
+def test_rotation_keeps_index_across_segments(path: Path):
+    ledger = make_ledger(path, max_bytes=200)
+    for i in range(30):
+        ledger.append(row("111" if i % 2 else "222", i))
+        ledger.flush()
+
+    segments = ledger.segments()
+    assert len(segments) > 2  # noqa: PLR2004
+    assert all(_index_path(segment).exists() for segment in segments)
+    assert ledger.stats("111").total == 15  # noqa: PLR2004
+    assert [r["valor"] for r in ledger.recent("222", 3)] == ["28", "26", "24"]
+    assert sum(1 for _ in ledger) == 30  # noqa: PLR2004
+    ledger.close()
+
+
+def test_reload_rebuilds_missing_index(path: Path):
+    ledger = make_ledger(path)
+    for i in range(5):
+        ledger.append(row("111", i))
+    ledger.close()
+    _index_path(path).unlink()
+
+    reloaded = make_ledger(path)
+    assert reloaded.stats("111").total == 5  # noqa: PLR2004
+    assert reloaded.recent("111", 1)[0]["valor"] == "4"
+    assert _index_path(path).read_bytes().count(b"\n") == 5  # noqa: PLR2004
+    reloaded.close()
+
+
+def test_reload_drops_partial_tail_and_repairs_complete_one(path: Path):
+    ledger = make_ledger(path)
+    ledger.append(row("111", 1))
+    ledger.close()
+
+    with open(path, "ab") as f:
+        f.write(b"111,2025-01-01T00:00:02Z,2,aprovado")  # registro completo sem "\n"
+    reloaded = make_ledger(path)
+    assert reloaded.stats("111").total == 2  # noqa: PLR2004
+    reloaded.close()
+    assert path.read_bytes().endswith(b"aprovado\n")
+
+    with open(path, "ab") as f:
+        f.write(b"111,2025-01-01T00:00:03Z")  # escrita interrompida
+    reloaded = make_ledger(path)
+    assert reloaded.stats("111").total == 2  # noqa: PLR2004
+    reloaded.close()
+    assert path.read_bytes().endswith(b"aprovado\n")
+
+
+def test_reads_do_not_wait_for_the_write(path: Path, monkeypatch: pytest.MonkeyPatch):
+    ledger = make_ledger(path, flush_interval=60)
+    writing, release = threading.Event(), threading.Event()
+    original = ledger._write  # noqa: SLF001
+
+    def slow_write(batch: list[dict[str, object]]) -> object:
+        writing.set()
+        release.wait(5)
+        return original(batch)
+
+    monkeypatch.setattr(ledger, "_write", slow_write)
+    ledger.append(row("111", 1))
+    flusher = threading.Thread(target=ledger.flush)
+    flusher.start()
+    assert writing.wait(5)
+
+    # Com a gravação parada no meio, leituras e novos appends seguem
+    ledger.append(row("111", 2))
+    assert ledger.stats("111").total == 2  # noqa: PLR2004
+    release.set()
+    flusher.join()
+    ledger.close()
+    assert make_ledger(path).stats("111").total == 2  # noqa: PLR2004
+
+
+def _write_rows(path: Path, cpf: str, count: int) -> None:
+    ledger = make_ledger(path, max_bytes=2_000)
+    for i in range(count):
+        ledger.append(row(cpf, i % 60))
+        if i % 7 == 0:
+            ledger.flush()
+    ledger.close()
+
+
+def test_concurrent_processes_share_the_ledger(path: Path):
+    context = multiprocessing.get_context("spawn")
+    writers = [
+        context.Process(target=_write_rows, args=(path, cpf, 200)) for cpf in ("111", "222")
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(60)
+        assert writer.exitcode == 0
+
+    ledger = make_ledger(path)
+    assert len(ledger.segments()) > 1
+    for cpf in ("111", "222"):
+        assert ledger.stats(cpf).total == 200  # noqa: PLR2004
+        assert {r["cpf"] for r in ledger.recent(cpf, 50)} == {cpf}
+    assert sum(1 for _ in ledger) == 400  # noqa: PLR2004
+    ledger.close()
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from llm_scheduler import (
+    LLMQueueRejected,
+    LLMScheduler,
+    Priority,
+    SchedulerConfig,
+    classify_request,
+)
+
+
+def wait_queued(scheduler: LLMScheduler, depth: int) -> None:
+    deadline = time.monotonic() + 5
+    while scheduler.snapshot()["queue_depth"] < depth:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def admission_order(
+    scheduler: LLMScheduler, requests: list[tuple[str, Priority]]
+) -> list[tuple[str, Priority]]:
+    """Enfileira `requests` com a única vaga ocupada e devolve a ordem de saída."""
+    order: list[tuple[str, Priority]] = []
+
+    def call(thread_id: str, priority: Priority) -> None:
+        with scheduler.slot(thread_id, priority):
+            order.append((thread_id, priority))
+
+    with scheduler.slot("ocupada"):
+        threads = []
+        for i, request in enumerate(requests, start=1):
+            thread = threading.Thread(target=call, args=request)
+            thread.start()
+            threads.append(thread)
+            wait_queued(scheduler, i)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_higher_priority_leaves_the_queue_first():
+    scheduler = LLMScheduler(SchedulerConfig(max_in_flight=1, queue_timeout=5))
+    requests = [
+        ("a", Priority.NEW_SESSION),
+        ("b", Priority.TURN),
+        ("c", Priority.FOLLOW_UP),
+    ]
+
+    assert admission_order(scheduler, requests) == requests[::-1]
+    assert scheduler.snapshot()["in_flight"] == 0
+
+
+def test_conversations_take_turns_within_a_priority():
+    scheduler = LLMScheduler(SchedulerConfig(max_in_flight=1, queue_timeout=5))
+    requests = [("a", Priority.TURN)] * 3 + [("b", Priority.TURN), ("c", Priority.TURN)]
+
+    order = admission_order(scheduler, requests)
+
+    assert [thread_id for thread_id, _ in order] == ["a", "b", "c", "a", "a"]
+
+
+def test_requests_past_the_deadline_are_rejected():
+    scheduler = LLMScheduler(SchedulerConfig(max_in_flight=1, queue_timeout=0.05))
+
+    with scheduler.slot("a"), pytest.raises(LLMQueueRejected) as error:
+        with scheduler.slot("b"):
+            pass
+
+    assert error.value.reason == "prazo vencido"
+    assert error.value.waited >= 0.05  # noqa: PLR2004
+    snapshot = scheduler.snapshot()
+    assert (snapshot["rejected_timeout"], snapshot["queue_depth"]) == (1, 0)
+    # A vaga volta a ficar livre depois da recusa
+    with scheduler.slot("b") as waited:
+        assert waited == 0.0
+
+
+def test_full_queue_rejects_immediately():
+    scheduler = LLMScheduler(
+        SchedulerConfig(max_in_flight=1, queue_timeout=5, max_queue=1)
+    )
+
+    def queued() -> None:
+        with scheduler.slot("b"):
+            pass
+
+    with scheduler.slot("a"):
+        thread = threading.Thread(target=queued)
+        thread.start()
+        wait_queued(scheduler, 1)
+        with pytest.raises(LLMQueueRejected, match="fila cheia"):
+            scheduler.slot("c").__enter__()
+    thread.join()
+
+    assert scheduler.stats.rejected_full == 1
+    assert scheduler.stats.admitted == 2  # noqa: PLR2004
+
+
+def test_requests_are_classified_by_conversation_state():
+    call = AIMessage("", tool_calls=[{"name": "triagem", "args": {}, "id": "c1"}])
+
+    assert classify_request([HumanMessage("oi")]) == Priority.NEW_SESSION
+    assert classify_request(
+        [HumanMessage("oi"), AIMessage("olá"), HumanMessage("USD")]
+    ) == Priority.TURN
+    assert classify_request(
+        [HumanMessage("oi"), call, ToolMessage("{}", tool_call_id="c1")]
+    ) == Priority.FOLLOW_UP
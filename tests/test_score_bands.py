@@ -0,0 +1,77 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import bench
+from score_bands import ScoreBandError, ScoreBandIndex, ScoreBandTable
+from storage import CsvStorage
+
+
+def band(min_score: int, max_score: int, limit: float) -> dict[str, str]:
+    return {
+        "min_score": str(min_score),
+        "max_score": str(max_score),
+        "max_allowed_limit": str(limit),
+    }
+
+
+BANDS = [
+    band(600, 749, 15000),
+    band(0, 399, 1000),
+    band(400, 599, 5000),
+    band(750, 999, 50000),
+]
+
+
+def test_lookup_respects_band_boundaries():
+    index = ScoreBandIndex.from_rows(BANDS)
+
+    assert len(index) == 4  # noqa: PLR2004
+    assert index.lookup(0) == 1000.0  # noqa: PLR2004
+    assert index.lookup(399) == 1000.0  # noqa: PLR2004
+    assert index.lookup(400) == 5000.0  # noqa: PLR2004
+    assert index.lookup(749) == 15000.0  # noqa: PLR2004
+    assert index.lookup(999) == 50000.0  # noqa: PLR2004
+    assert index.lookup(-1) is None
+    assert index.lookup(1000) is None
+    assert index.limits_for([1000, 750, 0]) == [None, 50000.0, 1000.0]
+
+
+@pytest.mark.parametrize(
+    ("rows", "message"),
+    [
+        (
+            [band(0, 399, 1000), band(401, 999, 5000)],
+            "Lacuna entre os scores 399 e 401",
+        ),
+        ([band(0, 399, 1000), band(399, 999, 5000)], "sobrepõe"),
+        ([band(0, 399, 1000), band(100, 200, 5000)], "sobrepõe"),
+        ([band(500, 400, 1000)], "maior que max_score"),
+        (
+            [{"min_score": "0", "max_score": "x", "max_allowed_limit": "1"}],
+            "malformada",
+        ),
+        ([{"min_score": "0", "max_score": "399"}], "malformada"),
+    ],
+)
+def test_invalid_tables_are_rejected(rows: list[dict[str, str]], message: str):
+    with pytest.raises(ScoreBandError, match=message):
+        ScoreBandIndex.from_rows(rows)
+
+
+def test_table_reloads_when_the_source_changes(tmp_path: Path):
+    bench.write_database(tmp_path, bench.synthetic_customers(1))
+    table = ScoreBandTable(CsvStorage(tmp_path))
+    first = table.index()
+    assert table.index() is first
+
+    path = tmp_path / "score_limite.csv"
+    path.write_text(
+        "min_score,max_score,max_allowed_limit\n0,999,2000.0\n", encoding="utf-8"
+    )
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert table.index() is not first
+    assert table.lookup(750) == 2000.0  # noqa: PLR2004
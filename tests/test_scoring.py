@@ -0,0 +1,89 @@
+import csv
+from pathlib import Path
+
+import pytest
+
+import bench
+from scoring import (
+    ScoreInputError,
+    compute_score,
+    compute_scores,
+    rescore,
+    synthetic_columns,
+)
+from storage import CsvStorage
+
+pytest.importorskip("numpy")
+
+
+def test_vectorized_scores_match_the_formula():
+    columns = synthetic_columns(2_000, seed=7)
+
+    scores, valid = compute_scores(columns)
+
+    expected = [
+        compute_score(*row)
+        for row in zip(
+            columns["renda_mensal"],
+            columns["tipo_emprego"],
+            columns["despesas_fixas"],
+            columns["num_dependentes"],
+            columns["tem_dividas"],
+            strict=True,
+        )
+    ]
+    assert valid.all()
+    assert scores.tolist() == expected
+
+
+def test_invalid_cells_are_flagged_instead_of_raising():
+    columns = {
+        "renda_mensal": ["5000", "", "abc", "5000", "5000", "5000"],
+        "tipo_emprego": ["formal", "formal", "formal", "pirata", " Formal ", "formal"],
+        "despesas_fixas": ["1000", "1000", "1000", "1000", "1000", "1000"],
+        "num_dependentes": ["1", "1", "1", "1", "1", "1.5"],
+        "tem_dividas": ["não", "não", "não", "não", "NÃO", "não"],
+    }
+
+    scores, valid = compute_scores(columns)
+
+    assert valid.tolist() == [True, False, False, False, True, False]
+    assert scores[0] == scores[4] == compute_score(5000, "formal", 1000, 1, "não")
+    assert (scores[~valid] == -1).all()
+    with pytest.raises(ScoreInputError):
+        compute_score(5000, "pirata", 1000, 1, "não")
+
+
+def test_rescore_updates_base_and_writes_report(tmp_path: Path):
+    customers = bench.synthetic_customers(3)
+    bench.write_database(tmp_path, customers)
+    storage = CsvStorage(tmp_path)
+    cpfs = [customer["cpf"] for customer in customers]
+    columns = {
+        "cpf": [cpfs[0], cpfs[1], cpfs[2], "00000000000"],
+        "renda_mensal": ["0", "5000", "", "5000"],
+        "tipo_emprego": ["desempregado", "formal", "formal", "formal"],
+        "despesas_fixas": ["0", "1000", "0", "0"],
+        "num_dependentes": ["3", "0", "0", "0"],
+        "tem_dividas": ["sim", "não", "não", "não"],
+    }
+    storage.update_user(cpfs[0], limite_atual="9000.00")
+
+    summary = rescore(storage, columns, cap_limits=True, report_path=tmp_path / "r.csv")
+
+    assert (summary.updated, summary.invalid, summary.not_found) == (2, 1, 1)
+    assert summary.limits_capped == 1
+    assert storage.get_user(cpfs[0])["score"] == "0"  # type: ignore[index]
+    assert storage.get_user(cpfs[0])["limite_atual"] == "1000.00"  # type: ignore[index]
+    assert storage.get_user(cpfs[1])["score"] == "649"  # type: ignore[index]
+    with open(tmp_path / "r.csv", encoding="utf-8") as f:
+        report = list(csv.DictReader(f))
+    assert [row["status"] for row in report] == [
+        "limite_reduzido",
+        "atualizado",
+        "dados_invalidos",
+        "cpf_nao_encontrado",
+    ]
+    assert report[0]["limite_atual"] == "9000.00"
+    assert report[0]["limite_maximo"] == "1000.00"
+    assert report[3]["novo_score"] != ""
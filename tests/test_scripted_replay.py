@@ -0,0 +1,47 @@
+import asyncio
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import bench
+import graph
+import utils
+from storage import CsvStorage, set_storage
+
+
+@pytest.fixture
+def customer(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[bench.Row]:
+    monkeypatch.setenv("BANK_LLM_PROVIDER", "scripted")
+    monkeypatch.setenv("BANK_FAKE_SCRIPT", str(bench.CONVERSATIONS_PATH))
+    monkeypatch.setenv("BANK_CHECKPOINT_PATH", "")
+    monkeypatch.setattr(utils, "_bound_llms", {})
+    # Sem o fast path, a triagem passa pelo roteiro do modelo
+    monkeypatch.setattr(graph, "FAST_PATH_ENABLED", False)
+
+    customers = bench.synthetic_customers(3)
+    bench.write_database(tmp_path / "db", customers)
+    set_storage(CsvStorage(tmp_path / "db"))
+    yield customers[1]
+    set_storage(None)
+
+
+def test_scripted_replay_fills_placeholders_without_fast_path(customer: bench.Row):
+    conversation = next(
+        item for item in bench.load_conversations() if item["id"] == "entrevista_credito"
+    )
+    app = graph.build_graph()
+    result = bench.BenchResult(customers=3, sessions=1, storage="csv")
+
+    asyncio.run(bench.replay(app, "replay-sem-fast-path", conversation, customer, result))
+
+    assert result.errors == 0
+    state = app.get_state({"configurable": {"thread_id": "replay-sem-fast-path"}})
+    replies = [
+        message.text
+        for message in state.values["messages"]
+        if isinstance(message, AIMessage) and message.text
+    ]
+    assert f"Olá, {customer['nome']}! ✅ Como posso ajudar?" in replies
+    assert not [reply for reply in replies if "{" in reply]
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any
+
+from server import ChatServer
+
+
+class SlowServer(ChatServer):
+    """Turnos simulados que demoram `delay` segundos, sem rodar o grafo."""
+
+    delay = 0.3
+
+    async def _stream_turn(self, thread_id: str, text: str, emit: Any) -> tuple[str, None, None]:
+        await asyncio.sleep(self.delay)
+        return f"{thread_id}:{text}", None, None
+
+
+def test_busy_session_does_not_hold_a_turn_slot():
+    server = SlowServer(graph=object(), max_active_turns=2, queue_timeout=0.2)  # type: ignore[arg-type]
+    events: list[dict[str, Any]] = []
+
+    async def emit(event: dict[str, Any]) -> None:
+        events.append(event)
+
+    async def main() -> None:
+        first = asyncio.create_task(server.run_turn("a", "1", emit))
+        await asyncio.sleep(0.01)
+        # Segunda mensagem da sessão "a" espera a primeira, sem ocupar vaga
+        second = asyncio.create_task(server.run_turn("a", "2", emit))
+        await asyncio.sleep(0.01)
+        await server.run_turn("b", "1", emit)
+        await asyncio.gather(first, second)
+
+    asyncio.run(main())
+
+    assert server.stats["rejected"] == 0
+    assert [event["content"] for event in events if event["type"] == "done"] == [
+        "a:1",
+        "b:1",
+        "a:2",
+    ]
+
+
+def test_turns_beyond_the_slots_are_rejected_after_queue_timeout():
+    server = SlowServer(graph=object(), max_active_turns=1, queue_timeout=0.05)  # type: ignore[arg-type]
+    events: list[dict[str, Any]] = []
+
+    async def emit(event: dict[str, Any]) -> None:
+        events.append(event)
+
+    async def main() -> None:
+        await asyncio.gather(server.run_turn("a", "1", emit), server.run_turn("b", "1", emit))
+
+    asyncio.run(main())
+
+    assert server.stats["rejected"] == 1
+    assert server.stats["turns"] == 1
+    assert [event["type"] for event in events] == ["error", "done"]
@@ -0,0 +1,93 @@
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+import bench
+import graph
+from shaping import SHAPING_STATS, project, shape_tool_result
+from storage import CsvStorage, set_storage
+
+AUTHENTICATED = {
+    "sucesso": True,
+    "mensagem": "Autenticação realizada com sucesso",
+    "usuario": {"cpf": "12345678901", "nome": "Ana", "data_nascimento": "1990-01-01"},
+}
+
+
+@pytest.fixture
+def customer(tmp_path: Path) -> Iterator[bench.Row]:
+    customers = bench.synthetic_customers(2)
+    bench.write_database(tmp_path, customers)
+    set_storage(CsvStorage(tmp_path))
+    yield customers[0]
+    set_storage(None)
+
+
+def test_projection_keeps_only_the_listed_fields_in_order():
+    quote = {
+        "success": True,
+        "rate": 5.1,
+        "to": "BRL",
+        "from": "USD",
+        "stale": False,
+        "raw": {"bid": "5.1"},
+        "timestamp": "x",
+    }
+
+    assert list(project("quote_currency", quote)) == [
+        "success",
+        "from",
+        "to",
+        "rate",
+        "stale",
+    ]
+    assert project("triagem", AUTHENTICATED) == {"sucesso": True, "nome": "Ana"}
+
+
+def test_failures_keep_the_message_for_the_model():
+    failed = {"sucesso": False, "mensagem": "CPF ou data de nascimento inválidos"}
+    assert project("triagem", failed) == failed
+
+    rejected = {
+        "success": False,
+        "message": "limite inválido",
+        "status_pedido": "rejeitado",
+    }
+    assert project("solicitar_aumento_limite", rejected) == rejected
+
+
+def test_unknown_tools_only_lose_the_dropped_fields():
+    result = {"success": True, "valor": 1, "raw": "...", "closing_message": "tchau"}
+    assert project("outra_tool", result) == {"success": True, "valor": 1}
+
+
+def test_shaped_result_is_compact_json_and_counted():
+    before = SHAPING_STATS.results
+
+    shaped = shape_tool_result("triagem", AUTHENTICATED)
+
+    assert shaped == '{"sucesso":true,"nome":"Ana"}'
+    assert json.loads(shaped) == {"sucesso": True, "nome": "Ana"}
+    assert shape_tool_result("triagem", "texto") == "texto"
+    assert SHAPING_STATS.results == before + 1
+    assert SHAPING_STATS.tokens_saved > 0
+
+
+def test_tool_message_keeps_the_full_result_as_artifact(customer: bench.Row):
+    call = {
+        "name": "triagem",
+        "args": {
+            "cpf": customer["cpf"],
+            "data_nascimento": customer["data_nascimento"],
+        },
+        "id": "c1",
+        "type": "tool_call",
+    }
+
+    message = graph.run_tool_call(call)  # type: ignore[arg-type]
+
+    assert json.loads(message.text) == {"sucesso": True, "nome": customer["nome"]}
+    assert message.artifact["usuario"]["cpf"] == customer["cpf"]
+    assert message.status == "success"
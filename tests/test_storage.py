@@ -0,0 +1,104 @@
+import csv
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+import bench
+import customers
+from limits import LimitRequest, process_chunks
+from storage import CsvStorage, Row, SqliteStorage, import_csv
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> Iterator[CsvStorage]:
+    bench.write_database(tmp_path, bench.synthetic_customers(4))
+    storage = CsvStorage(tmp_path)
+    yield storage
+    storage.ledger.close()
+
+
+def on_disk(storage: CsvStorage) -> dict[str, Row]:
+    with open(storage.users_path, encoding="utf-8") as f:
+        return {row["cpf"]: row for row in csv.DictReader(f)}
+
+
+def test_transaction_reads_its_own_writes(storage: CsvStorage):
+    cpf = next(iter(on_disk(storage)))
+
+    with storage.transaction():
+        storage.update_user(cpf, limite_atual="123.00")
+        assert storage.get_user(cpf)["limite_atual"] == "123.00"  # type: ignore[index]
+        assert storage.customers.get(cpf)["limite_atual"] != "123.00"  # type: ignore[index]
+
+    assert storage.get_user(cpf)["limite_atual"] == "123.00"  # type: ignore[index]
+    assert on_disk(storage)[cpf]["limite_atual"] == "123.00"
+
+
+def test_failed_users_write_rolls_back_the_whole_chunk(
+    storage: CsvStorage, monkeypatch: pytest.MonkeyPatch
+):
+    before = on_disk(storage)
+    cpfs = list(before)
+    chunk = [LimitRequest(i + 2, cpf, 1.0) for i, cpf in enumerate(cpfs)]
+    original = customers.atomic_write
+
+    def failing_write(*args: object) -> None:
+        msg = "disco cheio"
+        raise OSError(msg)
+
+    monkeypatch.setattr(customers, "atomic_write", failing_write)
+    [report] = process_chunks(storage, [chunk])
+
+    assert {row["status_pedido"] for row in report} == {"erro"}
+    assert all("disco cheio" in row["mensagem"] for row in report)
+    assert on_disk(storage) == before
+    assert all(storage.get_user(cpf) == before[cpf] for cpf in cpfs)
+    storage.ledger.flush()
+    assert all(storage.limit_request_stats(cpf)["total"] == 0 for cpf in cpfs)
+
+    # A próxima gravação não leva junto as alterações do lote que falhou
+    monkeypatch.setattr(customers, "atomic_write", original)
+    storage.update_user(cpfs[0], score="1")
+    after = on_disk(storage)
+    assert after[cpfs[0]] == before[cpfs[0]] | {"score": "1"}
+    assert all(after[cpf] == before[cpf] for cpf in cpfs[1:])
+
+
+def test_successful_chunk_writes_users_and_ledger(storage: CsvStorage):
+    cpfs = list(on_disk(storage))
+    chunk = [LimitRequest(i + 2, cpf, 1.0) for i, cpf in enumerate(cpfs)]
+
+    [report] = process_chunks(storage, [chunk])
+
+    assert {row["status_pedido"] for row in report} == {"aprovado"}
+    assert {row["limite_atual"] for row in on_disk(storage).values()} == {"1.00"}
+    storage.ledger.flush()
+    assert all(storage.limit_request_stats(cpf)["total"] == 1 for cpf in cpfs)
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_update_users_counts_each_updated_customer(tmp_path: Path, backend: str):
+    bench.write_database(tmp_path, bench.synthetic_customers(4))
+    if backend == "sqlite":
+        import_csv(tmp_path, tmp_path / "bank.sqlite3")
+        storage: CsvStorage | SqliteStorage = SqliteStorage(tmp_path / "bank.sqlite3")
+    else:
+        storage = CsvStorage(tmp_path)
+    cpfs = [row["cpf"] for row in storage.iter_users()]
+
+    updated = storage.update_users(
+        {
+            cpfs[0]: {"score": "10", "limite_atual": "100.00"},
+            cpfs[1]: {"limite_atual": "200.00"},
+            cpfs[2]: {"score": "30"},
+            cpfs[3]: {"score": "40"},
+            "00000000000": {"score": "50"},
+        }
+    )
+
+    assert updated == 4  # noqa: PLR2004
+    first = storage.get_user(cpfs[0])
+    assert first is not None
+    assert (str(first["score"]), float(first["limite_atual"])) == ("10", 100.0)
+    assert str(storage.get_user(cpfs[3])["score"]) == "40"  # type: ignore[index]
@@ -0,0 +1,143 @@
+import threading
+import time
+from pathlib import Path
+from typing import TextIO
+
+import pytest
+
+from customers import CustomerRepository
+from write_coordinator import FileLock, KeyLocks, WriteCoordinator, atomic_write
+
+
+def run_threads(target: object, count: int) -> None:
+    threads = [threading.Thread(target=target) for _ in range(count)]  # type: ignore[arg-type]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_key_locks_serialize_same_key_and_are_released():
+    locks = KeyLocks()
+    inside = 0
+    overlap = 0
+    guard = threading.Lock()
+
+    def work() -> None:
+        nonlocal inside, overlap
+        with locks.hold("111"):
+            with guard:
+                inside += 1
+                overlap = max(overlap, inside)
+            time.sleep(0.005)
+            with guard:
+                inside -= 1
+
+    run_threads(work, 8)
+
+    assert overlap == 1
+    assert len(locks) == 0
+
+
+def test_key_locks_do_not_block_other_keys():
+    locks = KeyLocks()
+    entered = threading.Event()
+
+    def other() -> None:
+        with locks.hold("222"):
+            entered.set()
+
+    with locks.hold("111"):
+        thread = threading.Thread(target=other)
+        thread.start()
+        assert entered.wait(1)
+    thread.join()
+
+
+def test_coordinator_coalesces_concurrent_requests():
+    flushes = []
+    coordinator = WriteCoordinator(lambda: flushes.append(1), window=0.05)
+
+    run_threads(coordinator.request, 10)
+
+    assert 1 <= len(flushes) < 10  # noqa: PLR2004
+    assert coordinator.stats.requests == 10  # noqa: PLR2004
+    coordinator.close()
+
+
+def test_coordinator_reports_flush_errors_to_waiters():
+    def flush() -> None:
+        msg = "disco cheio"
+        raise OSError(msg)
+
+    coordinator = WriteCoordinator(flush, window=0)
+    with pytest.raises(RuntimeError) as error:
+        coordinator.request()
+    assert isinstance(error.value.__cause__, OSError)
+    assert coordinator.stats.errors == 1
+    coordinator.close()
+
+
+def test_closed_coordinator_flushes_inline_and_raises():
+    calls = []
+    coordinator = WriteCoordinator(lambda: calls.append(1), window=0)
+    coordinator.close()
+    coordinator.request()
+    assert calls == [1]
+
+    def flush() -> None:
+        msg = "disco cheio"
+        raise OSError(msg)
+
+    coordinator.flush = flush
+    with pytest.raises(RuntimeError):
+        coordinator.request()
+
+
+def test_atomic_write_keeps_old_file_on_failure(tmp_path: Path):
+    path = tmp_path / "users.csv"
+    path.write_text("antigo\n", encoding="utf-8")
+
+    def write(f: TextIO) -> None:
+        f.write("novo")
+        msg = "falhou no meio"
+        raise OSError(msg)
+
+    with pytest.raises(OSError, match="falhou no meio"):
+        atomic_write(path, write)
+    assert path.read_text(encoding="utf-8") == "antigo\n"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_file_lock_times_out_while_held(tmp_path: Path):
+    path = tmp_path / "users.csv"
+    with FileLock(path), pytest.raises(TimeoutError):
+        FileLock(path, timeout=0.05).__enter__()
+
+
+def test_repository_concurrent_updates_are_all_written(tmp_path: Path):
+    path = tmp_path / "users.csv"
+    path.write_text(
+        "cpf,data_nascimento,nome,limite_atual,score\n"
+        + "".join(f"{i:011d},2000-01-01,Cliente {i},0.00,500\n" for i in range(20)),
+        encoding="utf-8",
+    )
+    repository = CustomerRepository(path, flush_window=0.01)
+    repository.load()
+    threads = [
+        threading.Thread(
+            target=repository.update, args=(f"{i:011d}",), kwargs={"limite_atual": f"{i}.00"}
+        )
+        for i in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert repository.writer.stats.flushes < 20  # noqa: PLR2004
+    reloaded = CustomerRepository(path)
+    reloaded.load()
+    assert [row["limite_atual"] for row in reloaded.rows()] == [f"{i}.00" for i in range(20)]
+    repository.close()
+    reloaded.close()